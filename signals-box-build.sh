@@ -5,7 +5,7 @@ sudo apt update
 sudo apt install -y git curl vim htop net-tools python3-pip python3-setuptools virtualenvwrapper docker.io docker-compose 
 sudo apt install gpsd gpsd-clients gpsd-tools
 # dbus-python build
-sudo apt install libglib2.0-dev libdbus-1-dev
+sudo apt install libglib2.0-dev libdbus-1-dev libgirepository1.0-dev libcairo2-dev
 # Rpi
 sudo apt-get install lightdm
 
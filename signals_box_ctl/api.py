@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+    Versioned JSON API for the Signals Box control app.
+
+    Every GET resource carries a weak ETag built from the SignalsManager state
+    versions it depends on, so a poller sending If-None-Match gets a bodiless
+    304 whenever nothing changed.
+"""
+
+import logging
+import time
+from flask import Blueprint, Response, current_app, jsonify, request, url_for
+from backends import BackendUnavailable
+from sdralloc import SdrConflict
+from gpstrack import dump_geojson, to_gpx
+
+logger = logging.getLogger(__name__)
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Service config keys exposed over the API (runtime objects are left out)
+_SERVICE_FIELDS = (
+    'description', 'type', 'link', 'require_sdr', 'multi_sdr', 'freq_input',
+    'system_ctl_name', 'container_name', 'sdr_count', 'sdr_models', 'freq_range',
+)
+
+# Longest ?wait= honoured on job requests, in seconds
+_MAX_JOB_WAIT = 60
+
+
+def _manager():
+    return current_app.config['SIGNALS_MANAGER']
+
+
+def _conditional(etag, build):
+    """
+    Return 304 if the client already holds *etag*, otherwise the JSON body
+    produced by *build()*.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _error(status, message):
+    response = jsonify({'error': message})
+    response.status_code = status
+    return response
+
+
+def _job_response(job):
+    """
+    202 with the job and its URL, or its final state if ``?wait=<seconds>``
+    was given and the job finished in time.
+    """
+    wait = request.args.get('wait', 0, type=float)
+    if wait > 0:
+        job.wait(min(wait, _MAX_JOB_WAIT))
+    response = jsonify(job.to_dict())
+    response.status_code = 202 if job.state in ('queued', 'running') else 200
+    response.headers['Location'] = url_for('api.get_job', job_id=job.id)
+    return response
+
+
+def _service_json(manager, service_id, snapshot):
+    svc = manager.services[service_id]
+    data = {'id': service_id, 'status': snapshot.services.get(service_id, 'unknown'),
+            'health': snapshot.health.get(service_id)}
+    data.update({key: getattr(svc, key) for key in _SERVICE_FIELDS if key in svc.raw})
+    selected = manager.service_state[service_id].selected_sdr
+    data['selected_sdr'] = [selected] if isinstance(selected, str) else selected
+    return data
+
+
+@api.route('/services', methods=['GET'])
+def list_services():
+    """All services with their current status."""
+    manager = _manager()
+    snapshot = manager.snapshot
+    return _conditional(
+        manager.state_etag('services', snapshot=snapshot),
+        lambda: {'services': [_service_json(manager, i, snapshot) for i in snapshot.services]},
+    )
+
+
+@api.route('/services/<service_id>', methods=['GET'])
+def get_service(service_id):
+    """One service with its current status."""
+    manager = _manager()
+    snapshot = manager.snapshot
+    if service_id not in snapshot.services:
+        return _error(404, f"Unknown service '{service_id}'")
+    return _conditional(
+        manager.state_etag(f"service:{service_id}", snapshot=snapshot),
+        lambda: _service_json(manager, service_id, snapshot),
+    )
+
+
+@api.route('/services/<service_id>/<action>', methods=['POST'])
+def service_action(service_id, action):
+    """
+    Queue a start or stop of a service and return the job (202), or run
+    set_radio and return the service's new state.
+    """
+    manager = _manager()
+    if service_id not in manager.services:
+        return _error(404, f"Unknown service '{service_id}'")
+
+    logger.debug("API %s for service %s", action, service_id)
+    if action in ('start', 'stop'):
+        return _job_response(manager.submit_service_action(service_id, action))
+    try:
+        if action == 'set_radio':
+            body = request.get_json(silent=True) or {}
+            sdrs = body.get('sdrs', [])
+            if isinstance(sdrs, str):
+                sdrs = [sdrs]
+            manager.set_service_radio(service_id, sdrs)
+        else:
+            return _error(404, f"Unknown action '{action}'")
+    except BackendUnavailable as e:
+        logger.error("API %s of service %s failed: %s", action, service_id, e)
+        return _error(503, str(e))
+    except SdrConflict as e:
+        logger.error("API %s of service %s failed: %s", action, service_id, e)
+        response = jsonify({'error': str(e), 'conflicts': e.conflicts})
+        response.status_code = 409
+        return response
+    except RuntimeError as e:
+        logger.error("API %s of service %s failed: %s", action, service_id, e)
+        return _error(500, str(e))
+
+    snapshot = manager.snapshot
+    response = jsonify(_service_json(manager, service_id, snapshot))
+    response.set_etag(manager.state_etag(f"service:{service_id}", snapshot=snapshot), weak=True)
+    return response
+
+
+@api.route('/services/<service_id>/output', methods=['GET'])
+def service_output(service_id):
+    """
+    Tail of a cli or pipeline service's captured output.  ``?lines=`` caps the count
+    (default 100), ``?since=`` returns only lines after that sequence
+    number, and ``?format=text`` returns plain text.
+    """
+    manager = _manager()
+    if service_id not in manager.services:
+        return _error(404, f"Unknown service '{service_id}'")
+    lines = request.args.get('lines', 100, type=int)
+    since = request.args.get('since', 0, type=int)
+    result = manager.get_service_output(service_id, lines=lines, since=since)
+    if result is None:
+        return _error(404, f"Service '{service_id}' has no captured output")
+
+    output, last_seq = result
+    if request.args.get('format') == 'text':
+        body = ''.join(f"{line.text}\n" for line in output)
+        return Response(body, mimetype='text/plain', headers={'Cache-Control': 'no-cache'})
+    return jsonify({'id': service_id, 'last_seq': last_seq, 'lines': [line.to_dict() for line in output]})
+
+
+@api.route('/services/<service_id>/stats', methods=['GET'])
+def service_stats(service_id):
+    """Bytes/s between stages and decodes/s of a pipeline service."""
+    manager = _manager()
+    if service_id not in manager.services:
+        return _error(404, f"Unknown service '{service_id}'")
+    stats = manager.get_pipeline_stats(service_id)
+    if stats is None:
+        return _error(404, f"Service '{service_id}' is not a pipeline")
+    return jsonify(dict(stats, id=service_id))
+
+
+def _profile_json(manager, profile):
+    return dict(profile.to_dict(), active=manager.active_profile == profile.name,
+                last_report=manager.profile_reports.get(profile.name))
+
+
+@api.route('/profiles', methods=['GET'])
+def list_profiles():
+    """Configured profiles with the report of each one's last up/down."""
+    manager = _manager()
+    snapshot = manager.snapshot
+    return _conditional(
+        manager.state_etag('profiles', snapshot=snapshot),
+        lambda: {'active': manager.active_profile,
+                 'profiles': [_profile_json(manager, profile) for profile in manager.profiles.values()]},
+    )
+
+
+@api.route('/profiles/<name>', methods=['GET'])
+def get_profile(name):
+    """One profile."""
+    manager = _manager()
+    profile = manager.profiles.get(name)
+    if profile is None:
+        return _error(404, f"Unknown profile '{name}'")
+    return _conditional(manager.state_etag('profiles', snapshot=manager.snapshot),
+                        lambda: _profile_json(manager, profile))
+
+
+@api.route('/profiles/<name>/<action>', methods=['POST'])
+def profile_action(name, action):
+    """
+    Queue bringing a profile ``up`` or ``down`` and return the job; its
+    result is the per-step report.  ``{"exclusive": true}`` with ``up``
+    first stops services of other profiles.
+    """
+    manager = _manager()
+    if name not in manager.profiles:
+        return _error(404, f"Unknown profile '{name}'")
+    if action not in ('up', 'down'):
+        return _error(404, f"Unknown action '{action}'")
+
+    logger.debug("API %s for profile %s", action, name)
+    body = request.get_json(silent=True) or {}
+    exclusive = bool(body.get('exclusive', request.args.get('exclusive', type=int)))
+    return _job_response(manager.submit_profile_action(name, action, exclusive=exclusive))
+
+
+@api.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Recent jobs, newest first; ``?service=<id>`` and ``?limit=<n>`` narrow the list."""
+    manager = _manager()
+    service_id = request.args.get('service')
+    key = f"service:{service_id}" if service_id else None
+    limit = request.args.get('limit', 50, type=int)
+    return _conditional(manager.state_etag('jobs', snapshot=manager.snapshot),
+                        lambda: {'jobs': [job.to_dict() for job in manager.jobs.list(key=key, limit=limit)]})
+
+
+@api.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """One job; ``?wait=<seconds>`` blocks until it has finished or the time is up."""
+    job = _manager().jobs.get(job_id)
+    if job is None:
+        return _error(404, f"Unknown job {job_id}")
+    wait = request.args.get('wait', 0, type=float)
+    if wait > 0:
+        job.wait(min(wait, _MAX_JOB_WAIT))
+    return jsonify(job.to_dict())
+
+
+@api.route('/backends', methods=['GET'])
+def list_backends():
+    """Whether each service backend is loaded, unavailable (with the reason) or not used yet."""
+    return jsonify({'backends': _manager().backends.status()})
+
+
+@api.route('/sdrs', methods=['GET'])
+def list_sdrs():
+    """Detected SDRs and which service is using each."""
+    manager = _manager()
+    snapshot = manager.snapshot
+    return _conditional(
+        manager.state_etag('sdrs', snapshot=snapshot),
+        lambda: {'sdrs': [device.to_dict() for device in snapshot.sdrs]},
+    )
+
+
+@api.route('/gps', methods=['GET'])
+def gps_status():
+    """
+    Current GPS fix.  The body has the fix's ``fix_time`` rather than a
+    live age, so it stays the same for as long as its ETag does.
+    """
+    manager = _manager()
+    snapshot = manager.snapshot
+    return _conditional(manager.state_etag('gps', snapshot=snapshot), lambda: dict(snapshot.gps))
+
+
+@api.route('/gps/history', methods=['GET'])
+def gps_history():
+    """
+    Recent fixes from the in-memory ring buffer as parallel columns.
+    ``?since=<epoch>`` and ``?last=<n>`` narrow the window.
+    """
+    since = request.args.get('since', type=float)
+    last = request.args.get('last', type=int)
+    return jsonify(_manager().get_gps_history(since=since, last=last))
+
+
+@api.route('/gps/track', methods=['GET'])
+def gps_track():
+    """
+    Recorded track between ``?start=`` and ``?end=`` (epoch seconds, default
+    the last hour) as GeoJSON, or GPX with ``?format=gpx``.
+    """
+    track = _manager().gps_track
+    if track is None:
+        return _error(404, "GPS track recording is disabled")
+    end = request.args.get('end', time.time(), type=float)
+    start = request.args.get('start', end - 3600, type=float)
+    if request.args.get('format', 'geojson') == 'gpx':
+        return Response(to_gpx(track.points(start, end)), mimetype='application/gpx+xml',
+                        headers={'Content-Disposition': 'attachment; filename="track.gpx"'})
+    return Response(dump_geojson(track.points(start, end)), mimetype='application/geo+json')
+
+
+@api.route('/gps/position', methods=['GET'])
+def gps_position():
+    """Recorded (interpolated) position at ``?time=`` epoch seconds."""
+    track = _manager().gps_track
+    if track is None:
+        return _error(404, "GPS track recording is disabled")
+    when = request.args.get('time', type=float)
+    if when is None:
+        return _error(400, "Missing 'time' parameter")
+    position = track.position_at(when)
+    if position is None:
+        return _error(404, "No recorded fix near that time")
+    return jsonify(position)
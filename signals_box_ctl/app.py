@@ -17,9 +17,15 @@ import logging.config
 import subprocess
 import yaml
 from flask import Flask, request, render_template
+from markupsafe import Markup
 from signalsmanager import SignalsManager
+from api import api
+from eventstream import SseServer
+from fragments import FragmentCache
 
 app = Flask(__name__)
+app.jinja_env.trim_blocks = True
+app.jinja_env.lstrip_blocks = True
 
 with open("logging.yml", "r", encoding="utf-8") as f:
     config = yaml.safe_load(f)
@@ -28,158 +34,129 @@ logging.config.dictConfig(config)
 logger = logging.getLogger(__name__)
 
 ######## HTML Rendered
-def render_sdr_list(usb_dev_list):
+STATUS_COLORS = {
+    "unavailable"   : "#2727F5", # blue
+    'unknown'       : "#2727F5", # blue
+    'running'       : "#27F527", # green
+    'stopping'      : "grey",
+    'stopped'       : "#F52727", # red #f8d7da
+    'restarting'    : "#F5A527", # amber
+    'failed'        : "#8B0000", # dark red
+    'unhealthy'     : "#F5A527", # amber, a running container failing its healthcheck
+}
+
+# Recent jobs listed on the page
+_JOBS_SHOWN = 10
+
+# Fragments are keyed on the snapshot versions they were rendered from
+fragments = FragmentCache()
+
+def render_sdr_list(snapshot):
     """
     Render HTML table of Detected SDR Devices
 
-    :param usb_dev_list: Description
-    :return: Description
-    :rtype: Any
+    :param snapshot: StateSnapshot whose SDRs are listed
+    :return: table rows, re-rendered only when an SDR or its claim changed
+    :rtype: Markup
     """
+    return fragments.get(('sdr_list', snapshot.versions.get('sdrs', 0)),
+        lambda: render_template('_sdr_list.html', sdrs=snapshot.sdrs))
 
-    logger.debug("Render SDR Information")
-    table_rows = [
-        """<tr>
-            <th>Manufacturer</th>
-            <th>Product</th>
-            <th>Serial Number</th>
-            <th>Rtl Sdr ID</th>
-            <th>Status</th>
-        </tr>"""
-    ]
-
-    for sdr_entry in usb_dev_list:
-        row = f"""
-        <tr>
-            <td>{sdr_entry['Manufacturer']}</td>
-            <td>{sdr_entry['Product']}</td>
-            <td>{sdr_entry['Serial']}</td>
-            <td>{sdr_entry['Rtl Id']}</td>
-            <td>{sdr_entry['status']}</td>
-        </tr>
-        """
-        table_rows.append(row)
-
-    return ''.join(table_rows)
-
-def render_sdr_drop_list(usb_dev_list, name, select_default=None, multi=False):
+def render_sdr_drop_list(snapshot, select_default=None):
     """
-    Render HTML select list of SDR detected on the system.
-    multi=True renders a multi-select listbox; multi=False renders a single-select dropdown.
+    SDR <option> list with the serials in *select_default* marked selected,
+    cached per device-set version and selection.  Claims are not shown in
+    the list so status changes do not invalidate it.
     """
-    logger.debug("Rendering SDR Drop for Service")
-
-    if multi:
-        size = max(2, len(usb_dev_list))
-        selection = f'<select name="sdr_{name}" multiple size="{size}">\n'
-    else:
-        selection = f'<select name="sdr_{name}">\n'
-        selection += '<option value="">Select SDR</option>\n'
-
     if select_default is None:
-        defaults = set()
+        defaults = ()
     elif isinstance(select_default, list):
-        defaults = {str(s) for s in select_default}
+        defaults = tuple(str(serial) for serial in select_default)
     else:
-        defaults = {str(select_default)}
-
-    for sdr_entry in usb_dev_list:
-        selected = ' selected' if sdr_entry['Serial'] in defaults else ''
-        selection += f'<option value="{sdr_entry["Serial"]}"{selected}>{sdr_entry["Manufacturer"]} {sdr_entry["Product"]} {sdr_entry["Serial"]}</option>\n'
-
-    selection += "</select>"
+        defaults = (str(select_default),)
 
-    return selection
+    return fragments.get(('sdr_options', snapshot.versions.get('sdr_devices', 0), defaults),
+        lambda: render_template('_sdr_options.html', sdrs=snapshot.sdrs, selected=defaults))
 
 def render_service_toggles(render_manager):
     """
     Docstring for render_service_toggles
 
-    :param render_manager: Description
+    :param render_manager: SignalsManager whose latest snapshot is rendered
     """
 
     logger.debug("Rendering Service Toggles")
 
-    statuses = {
-        "unavailable"   : "#2727F5", # blue
-        'unknown'       : "#2727F5", # blue
-        'running'       : "#27F527", # green
-        'stopping'      : "grey",
-        'stopped'       : "#F52727", # red #f8d7da
-    }
-
-    # Update all current_status values first so get_all_sdrs/update_sdr_status
-    # sees fresh data when annotating which SDR each service is using.
-    service_statuses = {}
-    for service_id in render_manager.services:
-        status, _ = render_manager.get_single_service_status(service_id)
-        render_manager.services[service_id]['current_status'] = status
-        service_statuses[service_id] = status
-
-    usb_dev_list = render_manager.get_all_sdrs()
-
-    table_rows = ["<tr><th>Service</th><th>Status</th><th>Select SDR</th><th>Freq</th><th>Link</th><th>Actions</th></tr>"]
-    for _, service_id in enumerate(render_manager.services):
-
-        set_radio_button = ""
-        freq_input = ""
-        link = ""
-        sdr_selection = ""
-
-        status = service_statuses[service_id]
-        color = statuses.get(status, "#2727F5")
-
-        description = render_manager.services[service_id].get('description', service_id)
-
-        if render_manager.services[service_id].get('link'):
-            link = f"<a href=\"{render_manager.services[service_id]['link']}\" target=\"_blank\">{description}</a>"
-
-        if render_manager.services[service_id].get('require_sdr', False):
-            multi = render_manager.services[service_id].get('multi_sdr', False)
-            if 'default_sdr' in render_manager.services[service_id]:
-                sdr_selection = render_sdr_drop_list(usb_dev_list, service_id,
-                    select_default=render_manager.services[service_id]['selected_sdr'],
-                    multi=multi)
-            else:
-                sdr_selection = render_sdr_drop_list(usb_dev_list, service_id, multi=multi)
-
-            if 'freq_input' in render_manager.services[service_id]:
-                freq_value = render_manager.services[service_id]['freq_input']
-                freq_input = f"<input type=\"text\" name=\"freq_{service_id}\" value=\"{freq_value}\" size=\"11\">"
-
-            set_radio_button = f"<button type=\"submit\" name=\"set_radio\" value=\"{service_id}\" class=\"btn btn-neutral\">Set Radio</button>"
-
-        # Build Row HTML
-        row = f"""
-        <tr>
-            <td style="border-left:4px solid {color};padding-left:12px;"><strong>{description}</strong></td>
-            <td>{status}</td>
-            <td>{sdr_selection}</td>
-            <td>{freq_input}</td>
-            <td>{link}</td>
-            <td align="right">
-                <button type="submit" name="start" value="{service_id}" class="btn btn-start">Start</button>
-                <button type="submit" name="stop" value="{service_id}" class="btn btn-stop">Stop</button>
-                {set_radio_button}
-            </td>
-        </tr>
-        """
-        table_rows.append(row)
-
-    return ''.join(table_rows)
-
-def render_buttons(buttons):
+    # Statuses and SDRs come from one snapshot so the table is self-consistent
+    snapshot = render_manager.snapshot
+    versions = snapshot.versions
+    config_version = versions.get('config', 0)
+    devices_version = versions.get('sdr_devices', 0)
+
+    table_rows = [Markup("<tr><th>Service</th><th>Status</th><th>Select SDR</th><th>Freq</th><th>Link</th><th>Actions</th></tr>")]
+    for service_id, svc in render_manager.services.items():
+        state = render_manager.service_state[service_id]
+        key = ('service_row', service_id, versions.get(f"service:{service_id}", 0),
+               devices_version, config_version)
+        table_rows.append(fragments.get(key,
+            lambda service_id=service_id, svc=svc, state=state:
+                render_service_row(snapshot, service_id, svc, state.selected_sdr)))
+
+    return Markup('').join(table_rows)
+
+def render_service_row(snapshot, service_id, svc, selected_sdr):
+    """Render one service's table row."""
+    status = snapshot.services.get(service_id, 'unknown')
+    health = snapshot.health.get(service_id)
+    sdr_options = ""
+    if svc.require_sdr:
+        selected = selected_sdr if 'default_sdr' in svc.raw else None
+        sdr_options = render_sdr_drop_list(snapshot, selected)
+
+    return render_template('_service_row.html', service_id=service_id, svc=svc,
+        status=status, health=health,
+        color=STATUS_COLORS.get('unhealthy' if health == 'unhealthy' else status, "#2727F5"),
+        description=svc.description or service_id,
+        sdr_options=sdr_options, sdr_count=len(snapshot.sdrs))
+
+def render_buttons(render_manager):
     '''
-        Generate HTML for buttons
+        Generate HTML for buttons, cached until the config is reloaded
     '''
-
-    logger.debug("Rendering Buttons")
-    button_text = ""
-    for button_name in buttons:
-        button_text += f"<button {buttons[button_name]['html_command']} name={buttons[button_name]['name']} class=\"btn btn-neutral\">{buttons[button_name]['text']}</button>\n"
-    button_text += "</p>\n"
-
-    return button_text
+    return fragments.get(('buttons', render_manager.get_version('config')),
+        lambda: render_template('_buttons.html', buttons=render_manager.buttons))
+
+def render_links(render_manager):
+    """Generate HTML for the service links, cached until the config is reloaded."""
+    return fragments.get(('links', render_manager.get_version('config')),
+        lambda: render_template('_links.html', links=render_manager.links))
+
+def render_profiles(render_manager):
+    """Generate HTML for the profile rows, cached until the config or a profile changes."""
+    key = ('profiles', render_manager.get_version('config'), render_manager.get_version('profiles'))
+    return fragments.get(key,
+        lambda: render_template('_profiles.html', profiles=render_manager.profiles.values(),
+                                active=render_manager.active_profile))
+
+def profile_summary(report):
+    """One line describing a profile up/down report."""
+    steps = ', '.join(f"{step['node']} {step['result']} {step['elapsed']:.1f}s" for step in report['steps'])
+    result = "done" if report['ok'] else "incomplete"
+    return f"{result} in {report['elapsed']:.1f}s ({steps or 'nothing to do'})"
+
+def job_summary(job):
+    """Outcome of a finished job in a few words."""
+    if job.error:
+        return job.error
+    if isinstance(job.result, dict) and 'steps' in job.result:
+        return profile_summary(job.result)
+    return job.result or ""
+
+def render_jobs(render_manager):
+    """Generate HTML for the most recent jobs, cached until a job changes state."""
+    return fragments.get(('jobs', render_manager.get_version('jobs')),
+        lambda: render_template('_jobs.html', jobs=[(job, job_summary(job))
+                                                    for job in render_manager.jobs.list(limit=_JOBS_SHOWN)]))
 
 
 def render_gps_status(gps_data):
@@ -205,15 +182,30 @@ def render_gps_status(gps_data):
     else:
         lines = [f'<span style="color:{color}"><strong>Unavailable</strong></span>']
 
+    if state != 'unavailable':
+        if gps_data.get('sats') is not None:
+            lines.append(f'Sats: <strong>{gps_data.get("sats_used") or 0}/{gps_data["sats"]}</strong>')
+        if gps_data.get('hdop') is not None:
+            lines.append(f'HDOP: <strong>{gps_data["hdop"]:.1f}</strong>')
+        if gps_data.get('fix_age') is not None:
+            lines.append(f'Age: <strong>{gps_data["fix_age"]:.0f}s</strong>')
+
     body = '<br>'.join(lines)
     return (
-        '<div class="gps-box">'
-        f'<strong class="gps-label">GPS</strong><br>{body}'
+        '<div class="gps-box" id="gps-box">'
+        f'<strong class="gps-label">GPS</strong><br><span class="gps-body">{body}</span>'
         '</div>'
     )
 
 
 manager = SignalsManager()
+app.config['SIGNALS_MANAGER'] = manager
+app.register_blueprint(api)
+
+# Live updates are served from their own selector thread, not WSGI workers
+event_server = SseServer(manager.events, port=manager.event_stream_port)
+if not (manager.event_stream_port and event_server.start()):
+    manager.event_stream_port = 0
 
 # --------------------------------------------------------------------
 # Flask view – handles GET (show page) and POST (handle actions)
@@ -229,24 +221,33 @@ def index():
     if request.method == "POST":
         logger.debug("POST received %s", request.form)
 
-        if "stop" in request.form:
-            output += f"Stopping {request.form['stop']}"
+        if "stop" in request.form or "start" in request.form:
+            action = "stop" if "stop" in request.form else "start"
+            service_id = request.form[action]
+            output += f"{'Stopping' if action == 'stop' else 'Starting'} {service_id}"
             try:
-                manager.stop_service(request.form['stop'])
-            except RuntimeError as e:
-                logger.error("Failed to stop service %s: %s", request.form['stop'], e)
-                output += f" — Error: {e}"
-        elif "start" in request.form:
-            output += f"Starting {request.form['start']}"
-            try:
-                manager.start_service(request.form['start'])
-            except RuntimeError as e:
-                logger.error("Failed to start service %s: %s", request.form['start'], e)
-                output += f" — Error: {e}"
+                job = manager.submit_service_action(service_id, action)
+                output += f" — job {job.id} {job.state}"
+            except KeyError:
+                output += " — Error: unknown service"
         elif "set_radio" in request.form:
             service_id = request.form['set_radio']
             sdr_key = f'sdr_{service_id}'
-            manager.set_service_radio(service_id, request.form.getlist(sdr_key))
+            try:
+                manager.set_service_radio(service_id, request.form.getlist(sdr_key))
+            except RuntimeError as e:
+                logger.error("Failed to set SDR for service %s: %s", service_id, e)
+                output += f"Set Radio {service_id} — Error: {e}"
+        elif "profile_up" in request.form or "profile_switch" in request.form or "profile_down" in request.form:
+            action = next(key for key in ("profile_up", "profile_switch", "profile_down") if key in request.form)
+            name = request.form[action]
+            output += f"{action.split('_')[1].capitalize()} profile {name}"
+            try:
+                job = manager.submit_profile_action(name, "down" if action == "profile_down" else "up",
+                                                    exclusive=action == "profile_switch")
+                output += f" — job {job.id} {job.state}"
+            except KeyError:
+                output += " — Error: unknown profile"
         elif "reload_config" in request.form:
             output += "Reloading Config File"
             manager.load_config()
@@ -263,22 +264,19 @@ def index():
                 logger.error("Reboot command failed: %s", e)
                 output += f"Reboot failed: {e}"
 
-    links_table = ""
-    links_table = '<p name="links">\n'
-    for _, link_data in enumerate(manager.links):
-        links_table += f"<a href=\"{link_data['url']}\" target=\"_blank\">{link_data['name']}</a><br>\n"
-    links_table += "</p>\n"
-
+    snapshot = manager.snapshot
+    links_table = render_links(manager)
     service_rows = render_service_toggles(manager)
-    usb_dev_list = manager.get_all_sdrs()
-    sdrlist = render_sdr_list(usb_dev_list)
-    button_text = render_buttons(manager.buttons)
+    sdrlist = render_sdr_list(snapshot)
+    button_text = render_buttons(manager)
+    profile_rows = render_profiles(manager)
+    job_rows = render_jobs(manager)
     gps_data = manager.get_gps_status()
     gps_status = render_gps_status(gps_data)
 
     return render_template('index.html', cmd_output=output, sdrlist=sdrlist, \
-        service_rows=service_rows, links_table=links_table, buttons=button_text, \
-        gps_status=gps_status)
+        service_rows=service_rows, profile_rows=profile_rows, job_rows=job_rows, links_table=links_table, buttons=button_text, \
+        gps_status=gps_status, event_stream_port=manager.event_stream_port)
 
 if __name__ == "__main__":
     # Run with:  sudo python3 app.py
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Lazy registry of service backends.
+
+Each service type that needs a client (systemd over D-Bus, Docker, ...)
+is registered by module and class name.  The module is imported and the
+client constructed on first use, so startup does not pay for libraries or
+connections nobody asked for, and a missing library or daemon makes only
+that backend ``unavailable`` instead of stopping the app.
+"""
+
+from typing import Any, Callable, Dict, Optional
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BackendUnavailable(RuntimeError):
+    """The backend for a service type cannot be loaded or connected."""
+
+
+class _Entry:
+    __slots__ = ('module', 'attr', 'setup', 'client', 'error', 'failed_at', 'lock')
+
+    def __init__(self, module: str, attr: str, setup: Optional[Callable[[Any], None]]) -> None:
+        self.module = module
+        self.attr = attr
+        self.setup = setup
+        self.client = None
+        self.error: Optional[str] = None
+        self.failed_at = 0.0
+        self.lock = threading.Lock()  # one slow backend must not hold up the others
+
+
+class BackendRegistry:
+    """
+    Creates each registered backend client on first ``get()`` and keeps it.
+    A backend that failed to load is retried at most every
+    ``RETRY_INTERVAL`` seconds, e.g. after the Docker daemon comes up.
+    """
+
+    RETRY_INTERVAL = 30  # seconds
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, module: str, attr: str,
+                 setup: Optional[Callable[[Any], None]] = None) -> None:
+        """
+        Register backend *name* as ``module.attr()``.  *setup(client)* runs
+        once after the client is created, e.g. to subscribe to units.
+        """
+        with self._lock:
+            self._entries[name] = _Entry(module, attr, setup)
+
+    def get(self, name: str) -> Any:
+        """
+        The client of backend *name*, created on first use.
+
+        :raises BackendUnavailable: if the backend is unknown, its library is
+            missing or the client could not be created
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            raise BackendUnavailable(f"No backend registered for '{name}'")
+        if entry.client is not None:
+            return entry.client
+
+        with entry.lock:
+            if entry.client is not None:
+                return entry.client
+            if entry.error is not None and time.monotonic() - entry.failed_at < self.RETRY_INTERVAL:
+                raise BackendUnavailable(entry.error)
+
+            started = time.monotonic()
+            try:
+                factory = getattr(importlib.import_module(entry.module), entry.attr)
+                client = factory()
+                if entry.setup is not None:
+                    entry.setup(client)
+            except Exception as e:
+                entry.error = f"{name} backend unavailable: {e}"
+                entry.failed_at = time.monotonic()
+                logger.warning("%s", entry.error)
+                raise BackendUnavailable(entry.error) from e
+
+            entry.client = client
+            entry.error = None
+            logger.info("Loaded %s backend in %.0f ms", name, (time.monotonic() - started) * 1000)
+            return client
+
+    def peek(self, name: str) -> Any:
+        """The client of backend *name* if it has been created, else None."""
+        entry = self._entries.get(name)
+        return entry.client if entry is not None else None
+
+    def status(self) -> Dict[str, Dict[str, Optional[str]]]:
+        """
+        State of every registered backend: ``loaded``, ``unavailable`` (with
+        the error) or ``idle`` (not used yet).
+        """
+        result = {}
+        for name, entry in self._entries.items():
+            if entry.client is not None:
+                result[name] = {'state': 'loaded', 'error': None}
+            elif entry.error is not None:
+                result[name] = {'state': 'unavailable', 'error': entry.error}
+            else:
+                result[name] = {'state': 'idle', 'error': None}
+        return result
+
+    def close(self) -> None:
+        """Close every created client."""
+        with self._lock:
+            entries = list(self._entries.items())
+        for name, entry in entries:
+            with entry.lock:
+                if entry.client is not None and hasattr(entry.client, 'close'):
+                    try:
+                        entry.client.close()
+                    except Exception:
+                        logger.exception("Failed to close %s backend", name)
+                entry.client = None
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Watching and caching the YAML config files.
+
+``ConfigWatcher`` notices edits to config.yml/creds.yml through inotify
+(via ctypes, no extra dependency) and falls back to polling file mtimes
+where inotify is unavailable.  ``YamlFileCache`` keeps the parsed content
+of each file keyed on its stat and content hash, so loading an unchanged
+file costs one ``stat()``.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+import ctypes
+import ctypes.util
+import hashlib
+import logging
+import os
+import select
+import struct
+import threading
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+
+class YamlFileCache:
+    """
+    Parsed YAML files, re-read only when the file's (mtime, size, inode)
+    changes and re-parsed only when its SHA-256 changes.  The returned
+    objects are shared between calls and must not be modified.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, Tuple[Tuple[int, int, int], str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat_key(path: str) -> Tuple[int, int, int]:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def load(self, path: str) -> Tuple[Any, str]:
+        """
+        Return ``(data, digest)`` for *path*.
+
+        :raises FileNotFoundError: if the file does not exist
+        :raises yaml.YAMLError: if the file is not valid YAML
+        """
+        stat_key = self._stat_key(path)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry[0] == stat_key:
+            return entry[2], entry[1]
+
+        with open(path, 'rb') as handle:
+            content = handle.read()
+        digest = hashlib.sha256(content).hexdigest()
+        if entry is not None and entry[1] == digest:
+            data = entry[2]  # touched but not changed
+        else:
+            data = yaml.safe_load(content)
+        with self._lock:
+            self._entries[path] = (stat_key, digest, data)
+        return data, digest
+
+
+# <sys/inotify.h>
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = os.O_CLOEXEC
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class ConfigWatcher:
+    """
+    Call ``callback(paths)`` with the set of changed *paths* shortly after
+    any of them is written, replaced or deleted.
+
+    The parent directories are watched rather than the files, so editors
+    and deploy scripts that save by writing a temporary file and renaming
+    it over the original are seen too.  Bursts of events are coalesced for
+    ``DEBOUNCE`` seconds before the callback runs.
+    """
+
+    DEBOUNCE = 0.5         # seconds to wait for an edit to settle
+    POLL_INTERVAL = 2      # seconds between stat() checks in fallback mode
+    _MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+    def __init__(self, paths: Iterable[str], callback: Callable[[Set[str]], None]) -> None:
+        self.paths = {os.path.abspath(path) for path in paths}
+        self.callback = callback
+        self.mode: Optional[str] = None
+        self._fd: Optional[int] = None
+        self._dirs: Dict[int, str] = {}  # watch descriptor -> directory
+        self._closing = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        """True while the watcher thread is delivering events."""
+        return self.mode is not None and not self._closing.is_set()
+
+    def start(self) -> None:
+        """Set up inotify (or fall back to polling) and start watching."""
+        try:
+            self._open_inotify()
+            self.mode = "inotify"
+            target = self._watch_inotify
+        except OSError as exc:
+            logger.warning("inotify unavailable (%s); polling config files every %ss", exc, self.POLL_INTERVAL)
+            self._close_fd()
+            self.mode = "poll"
+            target = self._watch_poll
+
+        logger.info("Watching %s via %s", ', '.join(sorted(self.paths)), self.mode)
+        threading.Thread(target=target, name="config-watch", daemon=True).start()
+
+    def close(self) -> None:
+        """Stop watching."""
+        self._closing.set()
+
+    # inotify
+    def _open_inotify(self) -> None:
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("libc has no inotify_init1")
+
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self._fd = fd
+        for directory in {os.path.dirname(path) for path in self.paths}:
+            wd = libc.inotify_add_watch(fd, os.fsencode(directory), self._MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, f"{os.strerror(errno)}: {directory}")
+            self._dirs[wd] = directory
+
+    def _close_fd(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _read_events(self) -> Set[str]:
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, _mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                path = os.path.join(self._dirs.get(wd, ''), os.fsdecode(name))
+                if path in self.paths:
+                    changed.add(path)
+
+    def _watch_inotify(self) -> None:
+        try:
+            while not self._closing.is_set():
+                ready, _, _ = select.select([self._fd], [], [], 1.0)
+                if not ready:
+                    continue
+                changed = self._read_events()
+                # Let the writer finish, then pick up whatever else arrived
+                while changed and not self._closing.wait(self.DEBOUNCE):
+                    more, _, _ = select.select([self._fd], [], [], 0)
+                    if not more:
+                        break
+                    changed |= self._read_events()
+                if changed:
+                    self._dispatch(changed)
+        except OSError as exc:
+            if not self._closing.is_set():
+                logger.error("Config watcher failed: %s", exc)
+        finally:
+            self.mode = None
+            self._close_fd()
+
+    # polling fallback
+    def _stat_all(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        stats = {}
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                stats[path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                stats[path] = None
+        return stats
+
+    def _watch_poll(self) -> None:
+        known = self._stat_all()
+        while not self._closing.wait(self.POLL_INTERVAL):
+            current = self._stat_all()
+            changed = {path for path in self.paths if current[path] != known[path]}
+            known = current
+            if changed:
+                self._dispatch(changed)
+        self.mode = None
+
+    def _dispatch(self, changed: Set[str]) -> None:
+        logger.info("Config file changed: %s", ', '.join(sorted(changed)))
+        try:
+            self.callback(changed)
+        except Exception:
+            logger.exception("Config change callback failed")
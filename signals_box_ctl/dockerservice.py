@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Docker backend: starts, stops and watches containers through the Docker API.
+
+Imported on first use through the backend registry, so a host without the
+docker package still runs the other service types.
+"""
+
+from typing import Optional
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    import docker
+    import docker.errors
+except ImportError as e:
+    raise ImportError("docker API not installed on system") from e
+
+
+class DockerService:
+    """
+    Manage Services that are hosted in Docker
+
+    A single ``containers.list(all=True)`` snapshot is taken at startup and
+    then kept current from the Docker event stream on a background thread, so
+    status reads are served from memory and actions reuse the cached
+    container objects.  If the event stream drops, the cache is rebuilt from a
+    fresh snapshot once the stream is reopened; until then reads fall back to
+    inspecting the container.
+    """
+
+    _RECONNECT_DELAY = 5  # seconds before re-opening a dropped event stream
+    _WATCHED_EVENTS = [
+        'create', 'destroy', 'rename', 'start', 'restart', 'die', 'stop',
+        'pause', 'unpause', 'health_status',
+    ]
+    # Health shown in a container list entry's Status, e.g. "Up 3 hours (unhealthy)"
+    _LISTED_HEALTH = re.compile(r'\((?:health: )?(starting|healthy|unhealthy)\)')
+
+    def __init__(self, watch_events: bool = True):
+        self.docker_client = docker.DockerClient(base_url='unix://var/run/docker.sock')
+
+        self._containers = {}   # container name -> Container
+        self._states = {}       # container name -> State.Status
+        self._health = {}       # container name -> health status, for containers with a healthcheck
+        self._cache_lock = threading.Lock()
+        self._cache_ok = False
+        self._events = None
+        self._closing = threading.Event()
+
+        if watch_events:
+            threading.Thread(target=self._watch_events, name="docker-events", daemon=True).start()
+
+    # Event driven cache
+    def _snapshot(self) -> None:
+        """Rebuild the name -> container cache from one list call."""
+        containers = self.docker_client.containers.list(all=True, sparse=True)
+        cache = {}
+        for container in containers:
+            for name in container.attrs.get('Names') or []:
+                cache[name.lstrip('/')] = container
+
+        with self._cache_lock:
+            # Health only changes by event, so keep what the events already told
+            # us unless the listing itself shows a health status
+            health = {name: status for name, status in self._health.items() if name in cache}
+            for name, container in cache.items():
+                listed = self._LISTED_HEALTH.search(str(container.attrs.get('Status') or ''))
+                if listed:
+                    health[name] = listed.group(1)
+            self._containers = cache
+            self._states = {name: c.status for name, c in cache.items()}
+            self._health = health
+        logger.debug("Docker snapshot holds %d containers", len(cache))
+
+    def _watch_events(self) -> None:
+        """Background thread: snapshot, then apply container events until closed."""
+        while not self._closing.is_set():
+            try:
+                # Events since the snapshot started are replayed, so nothing
+                # that happens while listing is lost.
+                since = int(time.time())
+                self._snapshot()
+                self._events = self.docker_client.events(
+                    since=since, decode=True,
+                    filters={'type': 'container', 'event': self._WATCHED_EVENTS},
+                )
+                self._cache_ok = True
+                logger.info("Watching Docker container events")
+
+                for event in self._events:
+                    self._apply_event(event)
+            except Exception as exc:
+                if not self._closing.is_set():
+                    logger.warning("Docker event stream failed: %s", exc)
+
+            self._cache_ok = False
+            if not self._closing.is_set():
+                logger.warning("Docker event stream closed, resnapshotting in %ss", self._RECONNECT_DELAY)
+                self._closing.wait(self._RECONNECT_DELAY)
+
+    def _apply_event(self, event: dict) -> None:
+        """Update the cache from one container event."""
+        action = event.get('Action', '')
+        attributes = event.get('Actor', {}).get('Attributes', {})
+        name = attributes.get('name')
+        if not name:
+            return
+
+        logger.debug("Docker event %s for %s", action, name)
+
+        if action.startswith('health_status'):
+            with self._cache_lock:
+                self._health[name] = action.split(':', 1)[-1].strip()
+            return
+
+        if action == 'create':
+            try:
+                container = self.docker_client.containers.get(name)
+            except docker.errors.NotFound:
+                return
+            with self._cache_lock:
+                self._containers[name] = container
+                self._states[name] = container.status
+            return
+
+        with self._cache_lock:
+            if action == 'destroy':
+                self._containers.pop(name, None)
+                self._states.pop(name, None)
+                self._health.pop(name, None)
+            elif action == 'rename':
+                old_name = attributes.get('oldName', '').lstrip('/')
+                if old_name in self._containers:
+                    self._containers[name] = self._containers.pop(old_name)
+                    self._states[name] = self._states.pop(old_name, None)
+                    if old_name in self._health:
+                        self._health[name] = self._health.pop(old_name)
+            elif action in ('start', 'restart', 'unpause'):
+                self._states[name] = 'running'
+            elif action in ('die', 'stop'):
+                self._states[name] = 'exited'
+                self._health.pop(name, None)  # reported afresh once the container runs again
+            elif action == 'pause':
+                self._states[name] = 'paused'
+
+    def _get_container(self, container_name: str, refresh: bool = False):
+        """Return the container object, from the cache unless *refresh* is set."""
+        if not refresh:
+            with self._cache_lock:
+                container = self._containers.get(container_name)
+            if container is not None:
+                return container
+
+        container = self.docker_client.containers.get(container_name)
+        with self._cache_lock:
+            self._containers[container_name] = container
+        return container
+
+    def _container_action(self, container_name: str, action: str):
+        """Run *action* on the container, refreshing a stale cached object once."""
+        try:
+            try:
+                return getattr(self._get_container(container_name), action)()
+            except docker.errors.NotFound:
+                # Cached object may point at a container that was recreated
+                return getattr(self._get_container(container_name, refresh=True), action)()
+        except docker.errors.NotFound:
+            logger.error("Container %s not found", container_name)
+            return False
+
+    def close(self) -> None:
+        """Stop watching Docker events."""
+        self._closing.set()
+        if self._events is not None:
+            self._events.close()
+
+    def start_service(self, container_name: str) -> None:
+        """Start the container with the given name."""
+        return self._container_action(container_name, 'start')
+
+    def stop_service(self, container_name: str) -> None:
+        """Stop the container."""
+        return self._container_action(container_name, 'stop')
+
+    def restart_service(self, container_name: str) -> None:
+        """Restart the container."""
+        return self._container_action(container_name, 'restart')
+
+    def status_service(self, container_name: str) -> None:
+        """Return the container's State.Status, or False if it does not exist."""
+        if self._cache_ok:
+            with self._cache_lock:
+                return self._states.get(container_name, False)
+
+        status = None
+
+        try:
+            container = self._get_container(container_name, refresh=True)
+
+            container_state = container.attrs['State']
+
+            status = container_state['Status']
+        except docker.errors.NotFound:
+            logger.error("Container %s not found", container_name)
+            status = False
+
+        return status
+
+    def health_service(self, container_name: str) -> Optional[str]:
+        """Return the last health status reported for the container, if any."""
+        with self._cache_lock:
+            return self._health.get(container_name)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events fan-out for live status updates.
+
+``EventBroker`` collects change notifications from ``SignalsManager``.
+``SseServer`` streams them to browsers from a single selector-driven
+thread, so idle subscribers cost a socket and a buffer rather than a WSGI
+worker thread each.
+"""
+
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import selectors
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class EventBroker:
+    """
+    Publish/subscribe hub for change events.  Every event gets a sequence
+    number and the most recent ones are kept so reconnecting clients can
+    resume from ``Last-Event-ID``.
+    """
+
+    def __init__(self, history: int = 64) -> None:
+        self._listeners: List[Callable[[int, bytes], None]] = []
+        self._history: Deque[Tuple[int, bytes]] = deque(maxlen=history)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def publish(self, event: str, data) -> None:
+        """Encode *data* as an SSE frame of type *event* and hand it to every listener."""
+        payload = json.dumps(data, separators=(',', ':'), default=str)
+        with self._lock:
+            self._seq += 1
+            frame = f"id: {self._seq}\nevent: {event}\ndata: {payload}\n\n".encode()
+            self._history.append((self._seq, frame))
+            listeners = list(self._listeners)
+            seq = self._seq
+
+        for listener in listeners:
+            try:
+                listener(seq, frame)
+            except Exception:
+                logger.exception("Event listener failed")
+
+    def add_listener(self, listener: Callable[[int, bytes], None]) -> None:
+        """Call *listener(seq, frame)* for every published event."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[int, bytes], None]) -> None:
+        """Stop calling *listener*."""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def frames_since(self, last_id: int) -> List[bytes]:
+        """Frames published after sequence number *last_id* that are still in history."""
+        with self._lock:
+            return [frame for seq, frame in self._history if seq > last_id]
+
+
+class _SseClient:
+    __slots__ = ('sock', 'addr', 'inbuf', 'outbuf', 'streaming')
+
+    def __init__(self, sock: socket.socket, addr) -> None:
+        self.sock = sock
+        self.addr = addr
+        self.inbuf = bytearray()
+        self.outbuf = bytearray()
+        self.streaming = False
+
+
+class SseServer:
+    """
+    Minimal HTTP server that only speaks ``text/event-stream`` on *path*.
+    All clients are multiplexed on one thread with ``selectors``; clients
+    that fall more than ``MAX_BUFFER`` bytes behind are dropped.
+    """
+
+    HEARTBEAT = 15  # seconds between keep-alive comments
+    MAX_REQUEST = 8192
+    MAX_BUFFER = 256 * 1024
+    RETRY_MS = 3000
+
+    def __init__(self, broker: EventBroker, host: str = "0.0.0.0", port: int = 8082,
+                 path: str = "/api/v1/events") -> None:
+        self.broker = broker
+        self.host = host
+        self.port = port
+        self.path = path
+        self._selector = selectors.DefaultSelector()
+        self._clients: Dict[int, _SseClient] = {}
+        self._pending: Deque[bytes] = deque()
+        self._wake_r, self._wake_w = os.pipe()
+        self._listener: Optional[socket.socket] = None
+        self._last_heartbeat = 0.0
+
+    @property
+    def subscriber_count(self) -> int:
+        """Number of clients currently streaming."""
+        return sum(1 for c in list(self._clients.values()) if c.streaming)
+
+    def start(self) -> bool:
+        """Bind and start the server thread.  Returns False if the port is unavailable."""
+        try:
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind((self.host, self.port))
+            listener.listen(64)
+            listener.setblocking(False)
+        except OSError as exc:
+            logger.warning("Event stream disabled, cannot listen on %s:%s: %s", self.host, self.port, exc)
+            return False
+
+        self._listener = listener
+        self.port = listener.getsockname()[1]  # the port picked by the OS if 0 was asked for
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._selector.register(listener, selectors.EVENT_READ, 'accept')
+        self._selector.register(self._wake_r, selectors.EVENT_READ, 'wake')
+        self.broker.add_listener(self._on_event)
+
+        threading.Thread(target=self._run, name="sse-server", daemon=True).start()
+        logger.info("Event stream listening on %s:%s%s", self.host, self.port, self.path)
+        return True
+
+    def _on_event(self, _seq: int, frame: bytes) -> None:
+        """Broker listener, runs on the publishing thread: queue and wake the loop."""
+        self._pending.append(frame)
+        try:
+            os.write(self._wake_w, b'\0')
+        except BlockingIOError:
+            pass  # loop already has a wake-up pending
+
+    def _run(self) -> None:
+        while True:
+            for key, mask in self._selector.select(timeout=self.HEARTBEAT):
+                if key.data == 'accept':
+                    self._accept()
+                elif key.data == 'wake':
+                    try:
+                        while os.read(self._wake_r, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                else:
+                    client = key.data
+                    if mask & selectors.EVENT_READ:
+                        self._read(client)
+                    if mask & selectors.EVENT_WRITE and client.sock.fileno() in self._clients:
+                        self._flush(client)
+
+            self._broadcast_pending()
+            if time.monotonic() - self._last_heartbeat >= self.HEARTBEAT:
+                self._last_heartbeat = time.monotonic()
+                self._send_all(b": keepalive\n\n")
+
+    def _accept(self) -> None:
+        try:
+            sock, addr = self._listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        client = _SseClient(sock, addr)
+        self._clients[sock.fileno()] = client
+        self._selector.register(sock, selectors.EVENT_READ, client)
+
+    def _read(self, client: _SseClient) -> None:
+        try:
+            data = client.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._drop(client)
+            return
+        if client.streaming:
+            return  # ignore anything a streaming client sends
+
+        client.inbuf += data
+        if b"\r\n\r\n" in client.inbuf:
+            self._handshake(client)
+        elif len(client.inbuf) > self.MAX_REQUEST:
+            self._drop(client)
+
+    def _handshake(self, client: _SseClient) -> None:
+        head = bytes(client.inbuf).split(b"\r\n\r\n", 1)[0].decode('latin-1')
+        lines = head.split("\r\n")
+        parts = lines[0].split()
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if len(parts) < 2 or parts[0] != "GET" or parts[1].split('?', 1)[0] != self.path:
+            client.outbuf += b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+            self._flush(client)
+            self._drop(client)
+            return
+
+        client.streaming = True
+        client.inbuf.clear()
+        client.outbuf += (
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: keep-alive\r\n"
+            b"Access-Control-Allow-Origin: *\r\n\r\n"
+        )
+        client.outbuf += f"retry: {self.RETRY_MS}\n\n".encode()
+
+        last_id = headers.get('last-event-id', '')
+        if last_id.isdigit():
+            for frame in self.broker.frames_since(int(last_id)):
+                client.outbuf += frame
+
+        logger.debug("Event stream client connected from %s", client.addr)
+        self._flush(client)
+
+    def _broadcast_pending(self) -> None:
+        while self._pending:
+            self._send_all(self._pending.popleft())
+
+    def _send_all(self, frame: bytes) -> None:
+        for client in list(self._clients.values()):
+            if not client.streaming:
+                continue
+            client.outbuf += frame
+            if len(client.outbuf) > self.MAX_BUFFER:
+                logger.warning("Dropping slow event stream client %s", client.addr)
+                self._drop(client)
+            else:
+                self._flush(client)
+
+    def _flush(self, client: _SseClient) -> None:
+        try:
+            sent = client.sock.send(client.outbuf)
+            del client.outbuf[:sent]
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            self._drop(client)
+            return
+
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.outbuf else 0)
+        try:
+            self._selector.modify(client.sock, events, client)
+        except (KeyError, ValueError):
+            pass
+
+    def _drop(self, client: _SseClient) -> None:
+        fileno = client.sock.fileno()
+        if self._clients.pop(fileno, None) is None:
+            return
+        try:
+            self._selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+"""
+Cache of rendered HTML fragments keyed on the state versions they depend on
+"""
+
+from collections import OrderedDict
+from typing import Callable, Hashable
+import logging
+import threading
+
+from markupsafe import Markup
+
+logger = logging.getLogger(__name__)
+
+
+class FragmentCache:
+    """
+    Small LRU of rendered fragments.  Keys carry the state versions the
+    fragment was built from, so a version bump is a cache miss and the stale
+    entry simply ages out.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Markup]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, render: Callable[[], str]) -> Markup:
+        """Return the fragment cached under *key*, calling *render()* on a miss."""
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fragment
+
+        fragment = Markup(render())
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = fragment
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fragment
+
+    def clear(self) -> None:
+        """Drop every cached fragment."""
+        with self._lock:
+            self._entries.clear()
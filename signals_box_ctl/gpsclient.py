@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+"""
+Streaming gpsd client with a fixed-size history of recent fixes
+"""
+
+from array import array
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import json
+import logging
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_time(value) -> Optional[float]:
+    """gpsd ISO-8601 timestamp ("2024-01-01T12:00:00.000Z") to epoch seconds."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class GpsFixHistory:
+    """
+    Ring buffer of recent fixes stored column-wise in ``array`` buffers,
+    so a day of 1 Hz fixes costs a few megabytes and no per-fix objects.
+    Missing values are stored as NaN.
+    """
+
+    COLUMNS = ('time', 'lat', 'lon', 'alt', 'speed')
+
+    def __init__(self, capacity: int = 3600) -> None:
+        self.capacity = capacity
+        self._columns = {name: array('d', bytes(8 * capacity)) for name in self.COLUMNS}
+        self._mode = array('b', bytes(capacity))
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, fix_time: float, lat: float, lon: float, alt: Optional[float],
+               speed: Optional[float], mode: int) -> None:
+        """Add one fix, overwriting the oldest once full."""
+        nan = float('nan')
+        values = (fix_time, lat, lon, nan if alt is None else alt, nan if speed is None else speed)
+        with self._lock:
+            slot = self._next
+            for name, value in zip(self.COLUMNS, values):
+                self._columns[name][slot] = value
+            self._mode[slot] = mode
+            self._next = (slot + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def _order(self, last: Optional[int]) -> List[int]:
+        count = self._count if last is None else min(last, self._count)
+        start = (self._next - count) % self.capacity
+        return [(start + i) % self.capacity for i in range(count)]
+
+    def columns(self, since: Optional[float] = None, last: Optional[int] = None) -> Dict[str, List]:
+        """
+        Fixes oldest first as ``{column: [values]}``, optionally only the
+        *last* N and/or those newer than epoch *since*.
+        """
+        with self._lock:
+            slots = self._order(last)
+            if since is not None:
+                times = self._columns['time']
+                slots = [s for s in slots if times[s] > since]
+            result = {name: [self._columns[name][s] for s in slots] for name in self.COLUMNS}
+            result['mode'] = [self._mode[s] for s in slots]
+        for name in ('alt', 'speed'):
+            result[name] = [None if v != v else v for v in result[name]]
+        return result
+
+
+class GpsdClient:
+    """
+    Long-lived gpsd connection in ``WATCH`` mode on a background thread.
+    Keeps the latest TPV and SKY reports and a ``GpsFixHistory`` of fixes,
+    and reconnects with backoff whenever gpsd goes away.  ``on_fix`` is
+    called with the same arguments as ``GpsFixHistory.append``.
+
+    A quiet gpsd (receiver unplugged or not reporting) is not a lost
+    connection: after ``READ_TIMEOUT`` without data the reports are
+    dropped as stale, so the status reads ``no_fix``, and the connection
+    is kept.
+    """
+
+    RECONNECT_MIN = 1
+    RECONNECT_MAX = 30
+    READ_TIMEOUT = 10  # gpsd sends TPV at least once a second while a receiver reports
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 2947, history: int = 3600,
+                 on_fix: Optional[Callable[..., None]] = None) -> None:
+        self.host = host
+        self.port = port
+        self.history = GpsFixHistory(history)
+        self.on_fix = on_fix
+        self.tpv: Dict[str, Any] = {}
+        self.sky: Dict[str, Any] = {}
+        self._last_fix_time: Optional[float] = None
+        self._connected = False
+        self._sock: Optional[socket.socket] = None
+        self._closing = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def connected(self) -> bool:
+        """True while a gpsd connection is up."""
+        return self._connected
+
+    def start(self) -> None:
+        """Start the reader thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="gpsd-watch", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """Stop the reader thread and drop the connection."""
+        self._closing.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def status(self) -> Dict[str, Any]:
+        """Latest fix and sky view as a flat dict (see ``_GPS_UNAVAILABLE`` in signalsmanager)."""
+        if not self._connected:
+            return {'state': 'unavailable', 'lat': None, 'lon': None, 'mode': None,
+                    'alt': None, 'speed': None, 'sats': None, 'sats_used': None,
+                    'hdop': None, 'fix_time': self._last_fix_time}
+
+        tpv, sky = self.tpv, self.sky
+        mode = tpv.get('mode', 0)
+        satellites = sky.get('satellites') or []
+        result = {
+            'state': 'no_fix',
+            'lat': None,
+            'lon': None,
+            'mode': mode,
+            'alt': None,
+            'speed': None,
+            'sats': sky.get('nSat', len(satellites)) if sky else None,
+            'sats_used': sky.get('uSat', sum(1 for s in satellites if s.get('used'))) if sky else None,
+            'hdop': sky.get('hdop'),
+            'fix_time': self._last_fix_time,
+        }
+        if mode >= 2 and 'lat' in tpv and 'lon' in tpv:
+            result.update({
+                'state': 'fix_3d' if mode == 3 else 'fix_2d',
+                'lat': tpv['lat'],
+                'lon': tpv['lon'],
+                'alt': tpv.get('altHAE', tpv.get('alt')) if mode == 3 else None,
+                'speed': tpv.get('speed'),
+            })
+        return result
+
+    def _run(self) -> None:
+        delay = self.RECONNECT_MIN
+        while not self._closing.is_set():
+            try:
+                self._watch()
+                delay = self.RECONNECT_MIN
+            except OSError as e:
+                logger.warning("gpsd connection to %s:%s lost: %s", self.host, self.port, e)
+            finally:
+                self._connected = False
+                self._sock = None
+            if self._closing.wait(delay):
+                break
+            delay = min(delay * 2, self.RECONNECT_MAX)
+
+    def _watch(self) -> None:
+        with socket.create_connection((self.host, self.port), timeout=self.READ_TIMEOUT) as sock:
+            self._sock = sock
+            sock.sendall(b'?WATCH={"enable":true,"json":true};\n')
+            self.tpv, self.sky = {}, {}  # reports from a previous connection are stale
+            self._connected = True
+            logger.info("Watching gpsd on %s:%s", self.host, self.port)
+            pending = b''
+            while True:
+                try:
+                    data = sock.recv(65536)
+                except socket.timeout:
+                    data = None
+                if self._closing.is_set():
+                    return
+                if data is None:
+                    if self.tpv or self.sky:
+                        logger.info("No reports from gpsd for %ss", self.READ_TIMEOUT)
+                        self.tpv, self.sky = {}, {}
+                    continue
+                if not data:
+                    raise ConnectionError("gpsd closed the connection")
+                *lines, pending = (pending + data).split(b'\n')
+                for line in lines:
+                    if line.strip():
+                        self._handle(line)
+
+    def _handle(self, line: bytes) -> None:
+        try:
+            report = json.loads(line)
+        except ValueError:
+            logger.debug("Ignoring malformed gpsd line: %r", line[:80])
+            return
+
+        kind = report.get('class')
+        if kind == 'SKY':
+            self.sky = report
+        elif kind == 'TPV':
+            self.tpv = report
+            mode = report.get('mode', 0)
+            if mode >= 2 and 'lat' in report and 'lon' in report:
+                fix_time = _parse_time(report.get('time')) or time.time()
+                self._last_fix_time = fix_time
+                fix = (fix_time, report['lat'], report['lon'],
+                       report.get('altHAE', report.get('alt')) if mode == 3 else None,
+                       report.get('speed'), mode)
+                self.history.append(*fix)
+                if self.on_fix is not None:
+                    try:
+                        self.on_fix(*fix)
+                    except Exception:
+                        logger.exception("GPS fix callback failed")
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+"""
+On-disk GPS track: append-only binary day files, an mmap reader and
+GPX / GeoJSON export
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+from xml.sax.saxutils import escape
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SBTRK01\n"
+# time (epoch s), lat, lon as doubles; alt and speed as floats (NaN if unknown); fix mode
+RECORD = struct.Struct("<dddffB3x")
+_TIME = struct.Struct("<d")
+
+
+class TrackPoint(NamedTuple):
+    """One recorded fix."""
+    time: float
+    lat: float
+    lon: float
+    alt: Optional[float]
+    speed: Optional[float]
+    mode: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict for JSON output."""
+        return self._asdict()
+
+
+def _unpack(buf, offset: int) -> TrackPoint:
+    t, lat, lon, alt, speed, mode = RECORD.unpack_from(buf, offset)
+    return TrackPoint(t, lat, lon, None if alt != alt else alt, None if speed != speed else speed, mode)
+
+
+def _day(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y%m%d")
+
+
+class TrackFile:
+    """
+    Read-only view of one day file.  The file is memory-mapped and, since
+    records are written in time order, looked up by binary search.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._mm = None
+        self.count = 0
+        with open(path, "rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if size < len(MAGIC) + RECORD.size:
+                return
+            self._mm = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            logger.warning("Ignoring %s: not a track file", path)
+            self.close()
+            return
+        self.count = (size - len(MAGIC)) // RECORD.size
+
+    def close(self) -> None:
+        """Release the mapping."""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self.count = 0
+
+    def __enter__(self) -> "TrackFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _offset(self, index: int) -> int:
+        return len(MAGIC) + index * RECORD.size
+
+    def time_at(self, index: int) -> float:
+        """Timestamp of record *index*."""
+        return _TIME.unpack_from(self._mm, self._offset(index))[0]
+
+    def __getitem__(self, index: int) -> TrackPoint:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return _unpack(self._mm, self._offset(index))
+
+    def bisect(self, when: float) -> int:
+        """Index of the first record with time > *when* (like ``bisect_right``)."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.time_at(mid) <= when:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def between(self, start: float, end: float) -> Iterator[TrackPoint]:
+        """Records with start <= time <= end."""
+        index = self.bisect(start)
+        while index > 0 and self.time_at(index - 1) >= start:
+            index -= 1
+        while index < self.count:
+            point = self[index]
+            if point.time > end:
+                break
+            yield point
+            index += 1
+
+
+class TrackRecorder:
+    """
+    Appends fixes to ``<directory>/track-YYYYMMDD.sbt`` (one file per UTC
+    day).  Fixes are packed into a memory buffer and written by a
+    background thread every ``flush_interval`` seconds; ``fsync`` only
+    happens every ``fsync_interval`` seconds so a moving box does not
+    rewrite flash blocks once a second.
+    """
+
+    def __init__(self, directory: str, min_interval: float = 1.0, flush_interval: float = 5.0,
+                 fsync_interval: float = 60.0, max_gap: float = 30.0) -> None:
+        self.directory = directory
+        self.min_interval = min_interval
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.max_gap = max_gap
+        self._pending: List[bytes] = []
+        self._pending_day: Optional[str] = None
+        self._last_time = 0.0
+        self._handle = None
+        self._handle_day: Optional[str] = None
+        self._last_fsync = time.monotonic()
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._closing = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Create the directory and start the flush thread."""
+        os.makedirs(self.directory, exist_ok=True)
+        today = self.path_for(_day(time.time()))
+        if os.path.exists(today):
+            with TrackFile(today) as track:
+                if track.count:
+                    self._last_time = track.time_at(track.count - 1)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="gps-track", daemon=True)
+            self._thread.start()
+        logger.info("Recording GPS track to %s", self.directory)
+
+    def close(self) -> None:
+        """Flush, fsync and stop the flush thread."""
+        self._closing.set()
+        self.flush(sync=True)
+        with self._io_lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+    def record(self, fix_time: float, lat: float, lon: float, alt: Optional[float] = None,
+               speed: Optional[float] = None, mode: int = 2) -> bool:
+        """
+        Queue one fix.  Fixes closer than ``min_interval`` to the previous
+        one, or going back in time, are dropped so each day file stays sorted.
+        """
+        if fix_time < self._last_time + self.min_interval:
+            return False
+        nan = float('nan')
+        packed = RECORD.pack(fix_time, lat, lon, nan if alt is None else alt,
+                             nan if speed is None else speed, mode)
+        day = _day(fix_time)
+        with self._lock:
+            if self._pending_day not in (None, day):
+                self._write_pending()
+            self._pending_day = day
+            self._pending.append(packed)
+            self._last_time = fix_time
+        return True
+
+    def flush(self, sync: bool = False) -> None:
+        """Write queued fixes; fsync if *sync* or the fsync interval has passed."""
+        with self._lock:
+            self._write_pending()
+        with self._io_lock:
+            if self._handle is not None and (sync or time.monotonic() - self._last_fsync >= self.fsync_interval):
+                os.fsync(self._handle.fileno())
+                self._last_fsync = time.monotonic()
+
+    def _write_pending(self) -> None:
+        """Write the pending batch to its day file.  Caller holds ``_lock``."""
+        if not self._pending:
+            return
+        data = b"".join(self._pending)
+        day = self._pending_day
+        self._pending = []
+        with self._io_lock:
+            try:
+                if self._handle_day != day:
+                    if self._handle is not None:
+                        os.fsync(self._handle.fileno())
+                        self._handle.close()
+                    path = self.path_for(day)
+                    self._handle = open(path, "ab")
+                    size = self._handle.tell()
+                    if size == 0:
+                        self._handle.write(MAGIC)
+                    elif (size - len(MAGIC)) % RECORD.size:
+                        # drop a record torn by a crash so later ones stay aligned
+                        self._handle.truncate(size - (size - len(MAGIC)) % RECORD.size)
+                    self._handle_day = day
+                self._handle.write(data)
+                self._handle.flush()
+            except OSError as e:
+                logger.error("Failed to write GPS track: %s", e)
+                self._handle = None
+                self._handle_day = None
+
+    def _run(self) -> None:
+        while not self._closing.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError as e:
+                logger.error("Failed to flush GPS track: %s", e)
+
+    def path_for(self, day: str) -> str:
+        """Path of the day file for a ``YYYYMMDD`` string."""
+        return os.path.join(self.directory, f"track-{day}.sbt")
+
+    def _files(self, start: float, end: float) -> Iterator[str]:
+        day = datetime.fromtimestamp(start, timezone.utc).date()
+        last = datetime.fromtimestamp(end, timezone.utc).date()
+        while day <= last:
+            path = self.path_for(day.strftime("%Y%m%d"))
+            if os.path.exists(path):
+                yield path
+            day += timedelta(days=1)
+
+    def points(self, start: float, end: float) -> Iterator[TrackPoint]:
+        """Recorded fixes with start <= time <= end, oldest first."""
+        self.flush()
+        for path in self._files(start, end):
+            with TrackFile(path) as track:
+                yield from track.between(start, end)
+
+    def position_at(self, when: float) -> Optional[Dict[str, Any]]:
+        """
+        Where the box was at epoch *when*: the fixes either side are found by
+        binary search and interpolated.  None if there is no fix within
+        ``max_gap`` seconds.
+        """
+        self.flush()
+        before = after = None
+        for path in self._files(when - self.max_gap, when + self.max_gap):
+            with TrackFile(path) as track:
+                index = track.bisect(when)
+                if index > 0:
+                    before = track[index - 1]
+                if index < track.count and after is None:
+                    after = track[index]
+
+        if before is not None and when - before.time > self.max_gap:
+            before = None
+        if after is not None and after.time - when > self.max_gap:
+            after = None
+        if before is None and after is None:
+            return None
+        if before is None or after is None or after.time == before.time:
+            point = before or after
+            return dict(point.to_dict(), time=when, interpolated=False)
+
+        ratio = (when - before.time) / (after.time - before.time)
+        return {
+            'time': when,
+            'lat': before.lat + (after.lat - before.lat) * ratio,
+            'lon': before.lon + (after.lon - before.lon) * ratio,
+            'alt': before.alt if after.alt is None or before.alt is None
+                   else before.alt + (after.alt - before.alt) * ratio,
+            'speed': before.speed,
+            'mode': min(before.mode, after.mode),
+            'interpolated': True,
+        }
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def to_gpx(points, name: str = "Signals Box track") -> Iterator[str]:
+    """GPX 1.1 document for *points*, produced in chunks for streaming."""
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<gpx version="1.1" creator="signals_box_ctl" xmlns="http://www.topografix.com/GPX/1/1">\n'
+           f'<trk><name>{escape(name)}</name><trkseg>\n')
+    for point in points:
+        ele = f"<ele>{point.alt:.1f}</ele>" if point.alt is not None else ""
+        yield (f'<trkpt lat="{point.lat:.7f}" lon="{point.lon:.7f}">{ele}'
+               f'<time>{_iso(point.time)}</time></trkpt>\n')
+    yield '</trkseg></trk>\n</gpx>\n'
+
+
+def to_geojson(points, name: str = "Signals Box track") -> Dict[str, Any]:
+    """GeoJSON Feature with a LineString of *points* and their timestamps."""
+    coordinates = []
+    times = []
+    for point in points:
+        coordinates.append([point.lon, point.lat] if point.alt is None else [point.lon, point.lat, point.alt])
+        times.append(_iso(point.time))
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'LineString', 'coordinates': coordinates},
+        'properties': {'name': name, 'times': times},
+    }
+
+
+def dump_geojson(points, name: str = "Signals Box track") -> str:
+    """``to_geojson`` serialised compactly."""
+    return json.dumps(to_geojson(points, name), separators=(',', ':'))
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Background job queue for service actions.
+
+Start/stop requests are submitted as jobs and run on a worker pool, so a
+slow systemd job, Docker call or process shutdown no longer holds up the
+web request.  Jobs sharing a key (one per service) run one at a time in
+submission order; jobs for different keys run in parallel.
+"""
+
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """One submitted action and its lifecycle: queued, running, done or failed."""
+
+    __slots__ = ('id', 'key', 'action', 'state', 'created', 'started', 'finished', 'result', 'error', '_done')
+
+    def __init__(self, job_id: int, key: str, action: str) -> None:
+        self.id = job_id
+        self.key = key
+        self.action = action
+        self.state = 'queued'
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self._done = threading.Event()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job has finished; False if *timeout* ran out first."""
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict for JSON output."""
+        elapsed = None
+        if self.started is not None:
+            elapsed = round((self.finished or time.time()) - self.started, 3)
+        return {
+            'id': self.id, 'key': self.key, 'action': self.action, 'state': self.state,
+            'created': self.created, 'started': self.started, 'finished': self.finished,
+            'elapsed': elapsed, 'result': self.result, 'error': self.error,
+        }
+
+    def __repr__(self) -> str:
+        return f"<Job {self.id} {self.key} {self.action} {self.state}>"
+
+
+class JobQueue:
+    """
+    Runs submitted callables on ``workers`` threads, serialized per key.
+
+    A job submitted while the last one queued for its key has the same
+    action is merged into it, so repeated clicks do not pile up; merging
+    with an earlier one would reorder it past a different action queued
+    since (start, stop, start must still end started).  The last
+    ``HISTORY`` jobs are kept for lookup.
+    """
+
+    HISTORY = 200
+
+    def __init__(self, workers: int, on_change: Optional[Callable[[Job], None]] = None) -> None:
+        self.on_change = on_change
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._ids = itertools.count(1)
+        self._jobs: "OrderedDict[int, Job]" = OrderedDict()
+        self._waiting: Dict[str, Deque[Tuple[Job, Callable[..., Any], tuple]]] = {}
+        self._active: Set[str] = set()  # keys with a worker draining them
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, action: str, func: Callable[..., Any], *args: Any) -> Job:
+        """Queue ``func(*args)`` behind the other jobs for *key* and return its Job."""
+        with self._lock:
+            waiting = self._waiting.get(key)
+            if waiting and waiting[-1][0].action == action:
+                return waiting[-1][0]
+
+            job = Job(next(self._ids), key, action)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.HISTORY:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.state in ('queued', 'running'):
+                    break
+                self._jobs.popitem(last=False)
+
+            self._waiting.setdefault(key, deque()).append((job, func, args))
+            if key not in self._active:
+                self._active.add(key)
+                self._pool.submit(self._drain, key)
+        logger.debug("Queued %r", job)
+        self._notify(job)
+        return job
+
+    def get(self, job_id: int) -> Optional[Job]:
+        """Job with the given id, or None if unknown or expired."""
+        return self._jobs.get(job_id)
+
+    def list(self, key: Optional[str] = None, limit: Optional[int] = None) -> List[Job]:
+        """Known jobs, newest first, optionally only those for *key*."""
+        with self._lock:
+            jobs = [job for job in reversed(self._jobs.values()) if key is None or job.key == key]
+        return jobs[:limit] if limit is not None else jobs
+
+    def close(self) -> None:
+        """Drop queued jobs and wait for running ones."""
+        with self._lock:
+            dropped = [job for queue in self._waiting.values() for job, _func, _args in queue]
+            self._waiting.clear()
+        for job in dropped:
+            job.state, job.error, job.finished = 'failed', "Shut down before it ran", time.time()
+            job._done.set()
+        self._pool.shutdown(wait=True)
+
+    def _drain(self, key: str) -> None:
+        while True:
+            with self._lock:
+                queue = self._waiting.get(key)
+                if not queue:
+                    self._waiting.pop(key, None)
+                    self._active.discard(key)
+                    return
+                job, func, args = queue.popleft()
+                job.state = 'running'
+                job.started = time.time()
+            self._notify(job)
+            self._run(job, func, args)
+
+    def _run(self, job: Job, func: Callable[..., Any], args: tuple) -> None:
+        try:
+            job.result = func(*args)
+            job.state = 'done'
+        except RuntimeError as e:
+            logger.error("Job %s (%s %s) failed: %s", job.id, job.action, job.key, e)
+            job.state, job.error = 'failed', str(e)
+        except Exception as e:
+            logger.exception("Job %s (%s %s) failed", job.id, job.action, job.key)
+            job.state, job.error = 'failed', str(e)
+        finally:
+            job.finished = time.time()
+            job._done.set()
+        logger.info("Job %s (%s %s) %s in %.2fs", job.id, job.action, job.key, job.state,
+                    job.finished - job.started)
+        self._notify(job)
+
+    def _notify(self, job: Job) -> None:
+        if self.on_change is None:
+            return
+        try:
+            self.on_change(job)
+        except Exception:
+            logger.exception("Job change callback failed")
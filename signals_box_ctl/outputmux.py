@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Output capture for CLI service processes.
+
+``OutputMultiplexer`` reads the stdout/stderr pipes of every CLI service
+from one selector-driven thread, keeps the most recent lines of each
+service in an ``OutputBuffer`` and forwards them to ``logging`` through a
+per-service rate limit, so a chatty decoder cannot flood the log handlers.
+"""
+
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+import logging
+import os
+import selectors
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class OutputLine(NamedTuple):
+    """One captured line of output."""
+    seq: int
+    time: float
+    stream: str
+    text: str
+
+    def to_dict(self) -> Dict[str, object]:
+        """Plain dict for JSON output."""
+        return self._asdict()
+
+
+class OutputBuffer:
+    """Bounded ring of the most recent lines written by one service."""
+
+    def __init__(self, max_lines: int = 500) -> None:
+        self._lines: Deque[OutputLine] = deque(maxlen=max_lines)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def append(self, stream: str, text: str) -> OutputLine:
+        """Store one line and return it."""
+        with self._lock:
+            self._seq += 1
+            line = OutputLine(self._seq, time.time(), stream, text)
+            self._lines.append(line)
+        return line
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest line (0 if none)."""
+        return self._seq
+
+    def tail(self, lines: int = 100, since: int = 0) -> List[OutputLine]:
+        """The newest *lines* lines with a sequence number above *since*."""
+        with self._lock:
+            result = [line for line in self._lines if line.seq > since]
+        return result[-lines:] if lines > 0 else []
+
+
+class _RateLimit:
+    """Token bucket deciding which lines reach ``logging``."""
+    __slots__ = ('rate', 'burst', 'tokens', 'stamp', 'dropped')
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self.dropped = 0
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.dropped += 1
+        return False
+
+
+class _Pipe:
+    __slots__ = ('svc_id', 'stream', 'level', 'fd', 'partial')
+
+    def __init__(self, svc_id: str, stream: str, level: int, fd: int) -> None:
+        self.svc_id = svc_id
+        self.stream = stream
+        self.level = level
+        self.fd = fd
+        self.partial = b''
+
+
+class OutputMultiplexer:
+    """
+    One reader thread for the output pipes of all CLI services.  Pipes are
+    made non-blocking and registered with a selector; partial lines are
+    reassembled per pipe, and a pipe is dropped when it reaches EOF.
+    """
+
+    MAX_LINE = 4096          # longer lines are split
+    LOG_RATE = 10.0          # lines per second forwarded to logging, per service
+    LOG_BURST = 50
+    DEFAULT_LINES = 500
+
+    def __init__(self) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._buffers: Dict[str, OutputBuffer] = {}
+        self._limits: Dict[str, _RateLimit] = {}
+        self._pending: Deque[_Pipe] = deque()
+        self._lock = threading.Lock()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._thread: Optional[threading.Thread] = None
+
+    def buffer(self, svc_id: str, max_lines: Optional[int] = None) -> OutputBuffer:
+        """The output buffer of *svc_id*, created on first use."""
+        with self._lock:
+            buf = self._buffers.get(svc_id)
+            if buf is None:
+                buf = self._buffers[svc_id] = OutputBuffer(max_lines or self.DEFAULT_LINES)
+            return buf
+
+    def unregister(self, svc_id: str) -> None:
+        """
+        Forget the buffered output and log rate limit of *svc_id*, e.g. once
+        it is removed from the config.  Lines still arriving on its pipes
+        are dropped.
+        """
+        with self._lock:
+            self._buffers.pop(svc_id, None)
+            self._limits.pop(svc_id, None)
+
+    def attach(self, svc_id: str, stdout=None, stderr=None, max_lines: Optional[int] = None) -> None:
+        """
+        Start reading the given pipe file objects for *svc_id*.  The
+        multiplexer takes ownership of their file descriptors and closes
+        them at EOF.
+        """
+        self.buffer(svc_id, max_lines)
+        for pipe, stream, level in ((stdout, 'stdout', logging.INFO), (stderr, 'stderr', logging.ERROR)):
+            if pipe is None:
+                continue
+            fd = os.dup(pipe.fileno())
+            pipe.close()
+            os.set_blocking(fd, False)
+            self._pending.append(_Pipe(svc_id, stream, level, fd))
+        self._start()
+        self._wake()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="cli-output", daemon=True)
+                self._thread.start()
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_w, b'\0')
+        except BlockingIOError:
+            pass  # a wake-up is already pending
+
+    def _run(self) -> None:
+        while True:
+            while self._pending:
+                pipe = self._pending.popleft()
+                self._selector.register(pipe.fd, selectors.EVENT_READ, pipe)
+
+            for key, _ in self._selector.select():
+                pipe = key.data
+                if pipe is None:
+                    try:
+                        while os.read(self._wake_r, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                self._read(pipe)
+
+    def _read(self, pipe: _Pipe) -> None:
+        try:
+            data = os.read(pipe.fd, 65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+
+        if not data:
+            if pipe.partial:
+                self._emit(pipe, pipe.partial)
+                pipe.partial = b''
+            self._selector.unregister(pipe.fd)
+            os.close(pipe.fd)
+            return
+
+        chunk = pipe.partial + data
+        *lines, pipe.partial = chunk.split(b'\n')
+        for line in lines:
+            for start in range(0, max(len(line), 1), self.MAX_LINE):
+                self._emit(pipe, line[start:start + self.MAX_LINE])
+        while len(pipe.partial) > self.MAX_LINE:
+            self._emit(pipe, pipe.partial[:self.MAX_LINE])
+            pipe.partial = pipe.partial[self.MAX_LINE:]
+
+    def _emit(self, pipe: _Pipe, raw: bytes) -> None:
+        text = raw.decode('utf-8', errors='replace').rstrip('\r')
+        with self._lock:
+            buf = self._buffers.get(pipe.svc_id)
+            if buf is None:
+                return  # unregistered
+            limit = self._limits.get(pipe.svc_id)
+            if limit is None:
+                limit = self._limits[pipe.svc_id] = _RateLimit(self.LOG_RATE, self.LOG_BURST)
+        buf.append(pipe.stream, text)
+
+        if limit.allow():
+            if limit.dropped:
+                logger.warning("[%s] %d output lines not logged (rate limit)", pipe.svc_id, limit.dropped)
+                limit.dropped = 0
+            logger.log(pipe.level, "[%s] %s", pipe.svc_id, text)
+
+    def tail(self, svc_id: str, lines: int = 100, since: int = 0) -> Tuple[List[OutputLine], int]:
+        """The newest lines of *svc_id* and the sequence number of the last one."""
+        buf = self._buffers.get(svc_id)
+        if buf is None:
+            return [], 0
+        return buf.tail(lines, since), buf.last_seq
+
+
+# Shared by every CliService
+output_mux = OutputMultiplexer()
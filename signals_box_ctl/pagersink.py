@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Pipeline sink stage for multimon-ng: parses POCSAG, FLEX and EAS decodes
+from stdin, drops repeated transmissions and delivers the messages to a
+Pagermon server.
+
+Messages are sent in batches over one keep-alive HTTP connection.  While
+the server is unreachable they are kept in a bounded NDJSON spool file
+and replayed, oldest first, once it is back.
+
+Usage as the last stage of a ``type: pipeline`` service::
+
+    python3 /opt/signals_box_ctl/pagersink.py --creds /opt/signals_box_ctl/creds.yml
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+import argparse
+import http.client
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PagerMessage(NamedTuple):
+    """One decoded page or alert."""
+    protocol: str
+    address: str
+    message: str
+    time: float
+
+    def to_pagermon(self, source: str) -> Dict[str, Any]:
+        """Body of a Pagermon ``POST /api/messages`` request."""
+        return {
+            'address': self.address,
+            'message': self.message,
+            'datetime': int(self.time),
+            'source': source,
+        }
+
+
+# POCSAG1200: Address: 1234567  Function: 3  Alpha:   Some text
+_POCSAG = re.compile(r'^(POCSAG\d+):\s+Address:\s*(\d+)\s+Function:\s*(\d+)\s+(?:Alpha|Numeric|Skyper):\s*(.*)$')
+# FLEX|2024-01-01 12:00:00|1600/2/K/A|05.120|001234567|ALN|Some text   (also FLEX_NEXT)
+_FLEX_PIPE = re.compile(r'^(FLEX(?:_NEXT)?)\|(?:[^|]*\|)?[^|]*\|[^|]*\|\s*([\d ]+?)\s*\|(\w+)\|(.*)$')
+# FLEX: 2024-01-01 12:00:00 1600/2/A 05.120 [001234567] ALN Some text
+_FLEX_OLD = re.compile(r'^(FLEX):\s+\S+\s+\S+\s+\S+\s+\S+\s+\[(\d+)\]\s+(\w+)\s+(.*)$')
+# EAS: ZCZC-WXR-TOR-029037+0030-1051700-KEAX/NWS-
+_EAS = re.compile(r'^(EAS):\s+(ZCZC-([A-Z]{3})-[A-Z]{3}-.*)$')
+# multimon-ng spells out control characters, e.g. <NUL> <EOT> <ETX>
+_CONTROL = re.compile(r'<(?:NUL|SOH|STX|ETX|EOT|ENQ|ACK|BEL|BS|HT|LF|VT|FF|CR|SO|SI|DLE|ESC|DEL)>|\x00')
+
+
+def parse_line(line: str, now: Optional[float] = None) -> Optional[PagerMessage]:
+    """Parse one line of multimon-ng output; None for anything that is not a decode."""
+    line = _CONTROL.sub('', line.rstrip('\r\n'))
+    now = time.time() if now is None else now
+
+    match = _POCSAG.match(line)
+    if match:
+        protocol, address, _function, text = match.groups()
+        return PagerMessage(protocol, address, text.strip(), now)
+
+    match = _FLEX_PIPE.match(line) or _FLEX_OLD.match(line)
+    if match:
+        protocol, address, kind, text = match.groups()
+        if kind not in ('ALN', 'NUM', 'BIN', 'TON', 'UNK'):
+            return None
+        return PagerMessage(protocol, address.split()[0].lstrip('0') or '0', text.strip(), now)
+
+    match = _EAS.match(line)
+    if match:
+        protocol, header, originator = match.groups()
+        return PagerMessage(protocol, originator, header, now)
+
+    return None
+
+
+class Deduplicator:
+    """
+    Remembers (protocol, address, message) for *window* seconds so a page
+    that is transmitted several times, or received on several frequencies,
+    is only delivered once.
+    """
+
+    def __init__(self, window: float = 30.0) -> None:
+        self.window = window
+        self._seen: "OrderedDict[tuple, float]" = OrderedDict()
+
+    def is_duplicate(self, msg: PagerMessage) -> bool:
+        """True if the same message was seen within the window (and remember it)."""
+        while self._seen:
+            key, stamp = next(iter(self._seen.items()))
+            if msg.time - stamp <= self.window:
+                break
+            del self._seen[key]
+
+        key = (msg.protocol.rstrip('0123456789'), msg.address, msg.message)
+        if key in self._seen:
+            return True
+        self._seen[key] = msg.time
+        return False
+
+
+class Spool:
+    """
+    Bounded NDJSON file of undelivered messages.  When it grows past
+    *max_bytes* the oldest half is dropped.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 4 * 1024 * 1024) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def append(self, items: Iterable[Dict[str, Any]]) -> None:
+        """Add messages to the end of the spool."""
+        data = ''.join(json.dumps(item, separators=(',', ':')) + '\n' for item in items)
+        if not data:
+            return
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        if os.path.getsize(self.path) > self.max_bytes:
+            self._trim()
+
+    def _trim(self) -> None:
+        lines = self._read_lines()
+        keep = lines[len(lines) // 2:]
+        logger.warning("Spool %s full, dropping %d oldest messages", self.path, len(lines) - len(keep))
+        self._rewrite(keep)
+
+    def _read_lines(self) -> List[str]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as handle:
+                return [line for line in handle if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _rewrite(self, lines: List[str]) -> None:
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as handle:
+            handle.writelines(lines)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp, self.path)
+
+    def peek(self, limit: int) -> List[Dict[str, Any]]:
+        """Up to *limit* of the oldest spooled messages."""
+        items = []
+        for line in self._read_lines()[:limit]:
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                logger.warning("Dropping corrupt spool line: %r", line[:80])
+        return items
+
+    def drop(self, count: int) -> None:
+        """Remove the *count* oldest messages."""
+        lines = self._read_lines()[count:]
+        if lines:
+            self._rewrite(lines)
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __len__(self) -> int:
+        return len(self._read_lines())
+
+
+class DeliveryError(Exception):
+    """A message could not be delivered; *retry* says whether it is worth trying again."""
+
+    def __init__(self, message: str, retry: bool = True) -> None:
+        super().__init__(message)
+        self.retry = retry
+
+
+class PagermonClient:
+    """Pagermon ``/api/messages`` client reusing one keep-alive connection."""
+
+    TIMEOUT = 10
+
+    def __init__(self, url: str, apikey: str) -> None:
+        parts = urlsplit(url)
+        self.scheme = parts.scheme or 'http'
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port
+        self.path = (parts.path.rstrip('/') or '') + '/api/messages'
+        self.apikey = apikey
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            conn_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            self._conn = conn_class(self.host, self.port, timeout=self.TIMEOUT)
+        return self._conn
+
+    def close(self) -> None:
+        """Drop the connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def post(self, body: Dict[str, Any]) -> None:
+        """
+        Deliver one message.  A stale keep-alive connection is retried once
+        on a fresh one.
+
+        :raises DeliveryError: on network errors and non-2xx answers.
+        """
+        payload = json.dumps(body).encode()
+        headers = {'Content-Type': 'application/json', 'apikey': self.apikey, 'Connection': 'keep-alive'}
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request('POST', self.path, body=payload, headers=headers)
+                response = conn.getresponse()
+                response.read()
+            except (http.client.HTTPException, OSError) as e:
+                self.close()
+                if attempt == 0 and isinstance(e, (http.client.RemoteDisconnected, BrokenPipeError,
+                                                   ConnectionResetError)):
+                    continue  # server closed the idle connection, try a new one
+                raise DeliveryError(f"Pagermon unreachable: {e}") from e
+            if response.will_close:
+                self.close()
+            if 200 <= response.status < 300:
+                return
+            retry = response.status >= 500 or response.status == 429
+            raise DeliveryError(f"Pagermon answered HTTP {response.status}", retry=retry)
+
+
+class PagerSink:
+    """
+    Reads decodes from a stream, deduplicates them and hands them to a
+    sender thread that delivers batches, spooling whatever fails.
+    """
+
+    RETRY_MIN = 2
+    RETRY_MAX = 120
+
+    def __init__(self, client: PagermonClient, spool: Spool, source: str = "signals_box",
+                 dedup_window: float = 30.0, batch_size: int = 20, batch_interval: float = 1.0) -> None:
+        self.client = client
+        self.spool = spool
+        self.source = source
+        self.dedup = Deduplicator(dedup_window)
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._retry_delay = self.RETRY_MIN
+        self._retry_at = 0.0
+        self.delivered = 0
+
+    def feed(self, stream, echo=None) -> None:
+        """Consume *stream* until EOF, queueing parsed, non-duplicate messages."""
+        try:
+            for line in stream:
+                msg = parse_line(line)
+                if msg is None or self.dedup.is_duplicate(msg):
+                    continue
+                self._queue.put(msg.to_pagermon(self.source))
+                if echo is not None:
+                    echo.write(f"{msg.protocol} {msg.address}: {msg.message}\n")
+                    echo.flush()
+        finally:
+            self._queue.put(None)  # let the sender finish even if reading failed
+
+    def run_sender(self) -> None:
+        """Deliver batches until ``feed`` reaches EOF and everything is sent or spooled."""
+        finished = False
+        while not finished:
+            batch, finished = self._collect()
+            self._deliver(batch)
+        self.client.close()
+
+    def _collect(self):
+        batch = []
+        deadline = time.monotonic() + self.batch_interval
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _deliver(self, batch: List[Dict[str, Any]]) -> None:
+        if time.monotonic() < self._retry_at:
+            self.spool.append(batch)
+            return
+
+        unsent = batch
+        try:
+            # Spooled messages go first so Pagermon sees them in order
+            while True:
+                spooled = self.spool.peek(self.batch_size)
+                if not spooled:
+                    break
+                sent = self._send(spooled)
+                self.spool.drop(sent)
+                if sent < len(spooled):
+                    raise DeliveryError(f"spool replay interrupted after {sent} of {len(spooled)} messages")
+            sent = self._send(batch)
+            if sent < len(batch):
+                unsent = batch[sent:]
+                raise DeliveryError(f"delivery interrupted after {sent} of {len(batch)} messages")
+        except DeliveryError as e:
+            self.spool.append(unsent)
+            self._retry_at = time.monotonic() + self._retry_delay
+            logger.warning("%s; %d messages spooled, retrying in %ss", e, len(self.spool), self._retry_delay)
+            self._retry_delay = min(self._retry_delay * 2, self.RETRY_MAX)
+            return
+        self._retry_delay = self.RETRY_MIN
+
+    def _send(self, items: List[Dict[str, Any]]) -> int:
+        """
+        Post *items* in order over the shared connection.  Returns how many
+        were handled; messages rejected as invalid are logged and dropped.
+        """
+        for index, item in enumerate(items):
+            try:
+                self.client.post(item)
+                self.delivered += 1
+            except DeliveryError as e:
+                if e.retry:
+                    if index:
+                        return index
+                    raise
+                logger.error("Pagermon rejected message for %s: %s", item.get('address'), e)
+        return len(items)
+
+
+def _load_creds(path: Optional[str]) -> Dict[str, Any]:
+    if not path:
+        return {}
+    import yaml  # pylint: disable=import-outside-toplevel
+    with open(path, 'r', encoding='utf-8') as handle:
+        return (yaml.safe_load(handle) or {}).get('pagermon', {}) or {}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', 1)[0])
+    parser.add_argument('--url', help="Pagermon server URL (default from creds, else http://localhost:3000)")
+    parser.add_argument('--apikey', help="Pagermon API key (default from creds or $PAGERMON_APIKEY)")
+    parser.add_argument('--creds', help="creds.yml to read pagermon.url and pagermon.apikey from")
+    parser.add_argument('--source', default='signals_box', help="Source name shown in Pagermon")
+    parser.add_argument('--spool', default='pagersink.spool', help="Spool file for undelivered messages")
+    parser.add_argument('--spool-max-bytes', type=int, default=4 * 1024 * 1024)
+    parser.add_argument('--dedup-window', type=float, default=30.0, help="Seconds to suppress repeats")
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--batch-interval', type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format="%(levelname)s %(name)s: %(message)s")
+
+    creds = _load_creds(args.creds)
+    url = args.url or creds.get('url') or 'http://localhost:3000'
+    apikey = args.apikey or creds.get('apikey') or os.environ.get('PAGERMON_APIKEY', '')
+    if not apikey:
+        logger.warning("No Pagermon API key configured")
+
+    sink = PagerSink(PagermonClient(url, apikey), Spool(args.spool, args.spool_max_bytes),
+                     source=args.source, dedup_window=args.dedup_window,
+                     batch_size=args.batch_size, batch_interval=args.batch_interval)
+    sender = threading.Thread(target=sink.run_sender, name="pagermon-sender")
+    sender.start()
+    stdin = open(sys.stdin.fileno(), 'r', encoding='utf-8', errors='replace', closefd=False)
+    try:
+        sink.feed(stdin, echo=sys.stdout)
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    sender.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
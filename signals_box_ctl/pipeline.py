@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Decode pipelines: chains such as ``rtl_fm | multimon-ng | reader`` run as
+separate processes whose pipes are owned by the controller.
+
+Owning the pipes lets the controller count the bytes and lines flowing
+between stages, notice a stage that has stopped producing output, and
+restart just that chain.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import os
+import selectors
+import signal
+import subprocess
+import threading
+import time
+
+from outputmux import output_mux
+from services import CliService, _parse_command, _substitute_placeholders
+from supervisor import signal_group, supervisor
+
+logger = logging.getLogger(__name__)
+
+
+class _Link:
+    """Relay state for the pipe between two adjacent stages."""
+    __slots__ = ('src', 'dst', 'src_name', 'dst_name', 'stall_timeout', 'buf', 'bytes', 'lines',
+                 'last_data', 'src_open', 'dst_open', 'stalled', 'rate_bytes', 'rate_lines',
+                 '_mark_bytes', '_mark_lines')
+
+    def __init__(self, src: int, dst: int, src_name: str, dst_name: str, stall_timeout: float) -> None:
+        self.src = src
+        self.dst = dst
+        self.src_name = src_name
+        self.dst_name = dst_name
+        self.stall_timeout = stall_timeout
+        self.buf = bytearray()
+        self.bytes = 0
+        self.lines = 0
+        self.last_data = time.monotonic()
+        self.src_open = True
+        self.dst_open = True
+        self.stalled = False
+        self.rate_bytes = 0.0
+        self.rate_lines = 0.0
+        self._mark_bytes = 0
+        self._mark_lines = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Counters for the API."""
+        return {
+            'from': self.src_name,
+            'to': self.dst_name,
+            'bytes': self.bytes,
+            'lines': self.lines,
+            'bytes_per_s': round(self.rate_bytes, 1),
+            'lines_per_s': round(self.rate_lines, 2),
+            'idle_s': round(time.monotonic() - self.last_data, 1),
+            'buffered': len(self.buf),
+        }
+
+
+class PipelineRelay:
+    """
+    Copies data between the stages of one pipeline on a single selector
+    thread.  A full downstream pipe stops reads from upstream (so
+    backpressure reaches the source) rather than buffering without bound.
+    """
+
+    MAX_BUFFER = 1 << 20
+    TICK = 1.0          # seconds between stall checks
+    RATE_WINDOW = 5.0   # seconds over which rates are measured
+
+    def __init__(self, name: str, links: List[_Link], on_stall: Callable[[_Link], None]) -> None:
+        self.name = name
+        self.links = links
+        self.on_stall = on_stall
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = os.pipe()
+        self._wake_lock = threading.Lock()  # _close() may run while stop() writes the wake pipe
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start relaying."""
+        for link in self.links:
+            os.set_blocking(link.src, False)
+            os.set_blocking(link.dst, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        for link in self.links:
+            self._selector.register(link.src, selectors.EVENT_READ, (link, 'r'))
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop relaying and close every pipe end."""
+        self._stopping = True
+        with self._wake_lock:
+            if self._wake_w is None:
+                return  # relay thread already finished and closed it
+            try:
+                os.write(self._wake_w, b'\0')
+            except OSError:
+                pass
+
+    def _run(self) -> None:
+        mark = time.monotonic()
+        try:
+            while not self._stopping:
+                for key, _ in self._selector.select(self.TICK):
+                    if key.data is None:
+                        continue
+                    link, direction = key.data
+                    if direction == 'r':
+                        self._read(link)
+                    else:
+                        self._write(link)
+
+                now = time.monotonic()
+                if now - mark >= self.RATE_WINDOW:
+                    self._update_rates(now - mark)
+                    mark = now
+                self._check_stalls(now)
+        finally:
+            self._close()
+
+    def _read(self, link: _Link) -> None:
+        try:
+            data = os.read(link.src, 65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+
+        if not data:
+            self._close_src(link)
+            if not link.buf:
+                self._close_dst(link)
+            return
+
+        link.bytes += len(data)
+        link.lines += data.count(b'\n')
+        link.last_data = time.monotonic()
+        link.stalled = False
+        if not link.dst_open:
+            return  # downstream is gone, discard
+        link.buf += data
+        self._write(link)
+        if len(link.buf) >= self.MAX_BUFFER and link.src_open:
+            self._selector.unregister(link.src)  # backpressure until drained
+
+    def _write(self, link: _Link) -> None:
+        if not link.dst_open:
+            return
+        try:
+            sent = os.write(link.dst, link.buf)
+            del link.buf[:sent]
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            link.buf.clear()
+            self._close_dst(link)
+            return
+
+        self._set_write_interest(link)
+        if not link.buf and not link.src_open:
+            self._close_dst(link)
+        elif link.src_open and len(link.buf) < self.MAX_BUFFER:
+            self._ensure_registered(link.src, selectors.EVENT_READ, (link, 'r'))
+
+    def _set_write_interest(self, link: _Link) -> None:
+        if link.buf:
+            self._ensure_registered(link.dst, selectors.EVENT_WRITE, (link, 'w'))
+        else:
+            try:
+                self._selector.unregister(link.dst)
+            except (KeyError, ValueError):
+                pass
+
+    def _ensure_registered(self, fd: int, events: int, data) -> None:
+        try:
+            self._selector.get_key(fd)
+        except KeyError:
+            self._selector.register(fd, events, data)
+
+    def _close_src(self, link: _Link) -> None:
+        if link.src_open:
+            link.src_open = False
+            try:
+                self._selector.unregister(link.src)
+            except (KeyError, ValueError):
+                pass
+            os.close(link.src)
+
+    def _close_dst(self, link: _Link) -> None:
+        if link.dst_open:
+            link.dst_open = False
+            try:
+                self._selector.unregister(link.dst)
+            except (KeyError, ValueError):
+                pass
+            os.close(link.dst)
+
+    def _close(self) -> None:
+        for link in self.links:
+            self._close_src(link)
+            self._close_dst(link)
+        self._selector.close()
+        with self._wake_lock:
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self._wake_r = self._wake_w = None
+
+    def _update_rates(self, elapsed: float) -> None:
+        for link in self.links:
+            link.rate_bytes = (link.bytes - link._mark_bytes) / elapsed
+            link.rate_lines = (link.lines - link._mark_lines) / elapsed
+            link._mark_bytes, link._mark_lines = link.bytes, link.lines
+
+    def _check_stalls(self, now: float) -> None:
+        for link in self.links:
+            if link.stall_timeout and not link.stalled and link.src_open and \
+                    now - link.last_data >= link.stall_timeout:
+                link.stalled = True
+                try:
+                    self.on_stall(link)
+                except Exception:
+                    logger.exception("Stall handler for %s failed", self.name)
+
+
+class PipelineService(CliService):
+    """
+    ``type: pipeline`` service: each entry of ``stages`` is started as its
+    own process, stdout of one stage is relayed to stdin of the next by a
+    ``PipelineRelay``, and the last stage's output goes to the shared
+    output buffer like a cli service.
+
+    Any stage exiting tears down the whole chain, which is then handled by
+    the restart policy inherited from ``CliService``.  A stage with
+    ``stall_timeout`` set that produces no output for that many seconds
+    gets the chain restarted regardless of policy.
+    """
+
+    REQUIRED_KEYS = ("type", "description", "stages")
+
+    def __init__(self, svc_id, config: Dict[str, Any],
+                 on_change: Optional[Callable[[], None]] = None) -> None:
+        super().__init__(svc_id, config, on_change)
+        self.stages: List[Dict[str, Any]] = []
+        for index, stage in enumerate(config["stages"] or []):
+            if not isinstance(stage, dict) or 'cmd_line' not in stage:
+                raise ValueError(f"Stage {index} of pipeline '{svc_id}' needs a cmd_line")
+            self.stages.append(dict(stage, name=stage.get('name', f"stage{index}")))
+        if not self.stages:
+            raise ValueError(f"Pipeline '{svc_id}' has no stages")
+        self.cmd_line = " | ".join(stage['cmd_line'] for stage in self.stages)
+        self.params.pop("stages", None)
+        self._procs: List[subprocess.Popen] = []
+        self._relay: Optional[PipelineRelay] = None
+        self._generation = 0
+
+    def _spawn(self) -> None:
+        """Start every stage and the relay.  Caller holds ``_lock``."""
+        params = dict(self.params, **self._extra_params)
+        self._generation += 1
+        generation = self._generation
+        procs: List[subprocess.Popen] = []
+
+        try:
+            for index, stage in enumerate(self.stages):
+                cmd_parts = _parse_command(_substitute_placeholders(stage['cmd_line'], params))
+                logger.info("Starting pipeline '%s' stage '%s': %s", self.svc_id, stage['name'], cmd_parts)
+                procs.append(subprocess.Popen(
+                    cmd_parts,
+                    cwd=stage.get('working_dir', self.cwd),
+                    stdin=subprocess.DEVNULL if index == 0 else subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    start_new_session=True,
+                ))
+        except Exception as exc:
+            for proc in procs:
+                signal_group(proc, signal.SIGKILL)
+                proc.wait()
+            self._proc = None
+            self.state = "stopped"
+            logger.exception("Failed to start pipeline '%s'", self.svc_id)
+            raise RuntimeError(f"Could not start service '{self.svc_id}': {exc}") from exc
+
+        links = []
+        for index in range(len(procs) - 1):
+            src = os.dup(procs[index].stdout.fileno())
+            dst = os.dup(procs[index + 1].stdin.fileno())
+            procs[index].stdout.close()
+            procs[index + 1].stdin.close()
+            links.append(_Link(src, dst, self.stages[index]['name'], self.stages[index + 1]['name'],
+                               float(self.stages[index].get('stall_timeout', 0) or 0)))
+
+        self._procs = procs
+        self._proc = procs[0]
+        self.state = "running"
+        self._started_at = time.monotonic()
+        self._starts.append(self._started_at)
+
+        output_mux.attach(self.svc_id, stdout=procs[-1].stdout, max_lines=self.output_lines)
+        for proc in procs:
+            output_mux.attach(self.svc_id, stderr=proc.stderr)
+
+        self._relay = PipelineRelay(self.svc_id, links,
+                                    lambda link: self._on_stall(generation, link))
+        self._relay.start()
+
+        supervisor.register_service(self)
+        for stage, proc in zip(self.stages, procs):
+            supervisor.watch(proc, lambda returncode, name=stage['name']:
+                             self._on_stage_exit(generation, name, returncode))
+
+    def _teardown(self) -> List[subprocess.Popen]:
+        """Detach the running chain and stop the relay.  Caller holds ``_lock``."""
+        self._generation += 1
+        procs, self._procs = self._procs, []
+        self._proc = None
+        if self._relay is not None:
+            self._relay.stop()
+            self._relay = None
+        return procs
+
+    def _on_stage_exit(self, generation: int, name: str, returncode: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return  # chain already torn down
+            for proc in self._teardown():
+                signal_group(proc, signal.SIGKILL)
+            self._exited(returncode, f"stage '{name}' {self._exit_reason(returncode)}")
+        self._notify()
+
+    def _on_stall(self, generation: int, link: _Link) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            logger.warning("Pipeline '%s' stalled: no output from stage '%s' for %ss, restarting",
+                           self.svc_id, link.src_name, int(link.stall_timeout))
+            for proc in self._teardown():
+                signal_group(proc, signal.SIGKILL)
+            self.last_exit = None
+            self._schedule_restart(f"stage '{link.src_name}' stalled")
+        self._notify()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """
+        Stop every stage (SIGTERM, then SIGKILL after *timeout* seconds) and
+        cancel any pending restart.
+        """
+        with self._lock:
+            supervisor.cancel(self._restart_handle)
+            self._restart_handle = None
+            procs = self._teardown()
+            if not procs:
+                if self.state in ("restarting", "failed"):
+                    self.state = "stopped"
+                    supervisor.unregister_service(self)
+                    return
+                raise RuntimeError(f"Service '{self.svc_id}' is not running")
+            self.state = "stopped"
+
+        logger.info("Stopping pipeline '%s'", self.svc_id)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for proc in procs:
+            signal_group(proc, signal.SIGTERM)
+        for proc in procs:
+            try:
+                proc.wait(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                logger.warning("Pipeline '%s' stage pid %s did not terminate – killing", self.svc_id, proc.pid)
+                signal_group(proc, signal.SIGKILL)
+                proc.wait()
+        for proc in procs:
+            signal_group(proc, signal.SIGKILL)
+        supervisor.unregister_service(self)
+        logger.info("Pipeline '%s' stopped", self.svc_id)
+
+    def is_running(self) -> bool:
+        """``True`` while every stage is running."""
+        with self._lock:
+            return bool(self._procs) and all(proc.poll() is None for proc in self._procs)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Flow counters for each link between stages.  ``decodes_per_s`` is
+        the line rate into the last stage, i.e. decoder output.
+        """
+        relay = self._relay
+        links = [link.to_dict() for link in relay.links] if relay is not None else []
+        return {
+            'state': self.state,
+            'stages': [stage['name'] for stage in self.stages],
+            'links': links,
+            'decodes_per_s': links[-1]['lines_per_s'] if links else None,
+        }
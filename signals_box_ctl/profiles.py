@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Named service profiles ("missions").
+
+A profile from the ``profiles`` section of config.yml lists services to
+run together, SDRs to assign to them and start-order dependencies.
+``compile_profiles()`` validates them against the compiled services once
+per config load; ``run_graph()`` executes one step per service on a thread
+pool, starting each step as soon as the steps it depends on are done, and
+times every step.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from types import MappingProxyType
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Tuple
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Profile:
+    """One validated, immutable profile."""
+
+    __slots__ = ('name', 'description', 'services', 'sdrs', 'depends')
+
+    def __init__(self, name: str, description: str, services: Tuple[str, ...],
+                 sdrs: Mapping[str, Tuple[str, ...]], depends: Mapping[str, FrozenSet[str]]) -> None:
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'description', description)
+        object.__setattr__(self, 'services', services)
+        object.__setattr__(self, 'sdrs', sdrs)
+        object.__setattr__(self, 'depends', depends)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Profile is immutable")
+
+    def __repr__(self) -> str:
+        return f"Profile({self.name!r})"
+
+    def reverse_depends(self) -> Dict[str, FrozenSet[str]]:
+        """Dependencies for bringing the profile down: dependents stop first."""
+        dependents: Dict[str, set] = {svc_id: set() for svc_id in self.services}
+        for svc_id, needs in self.depends.items():
+            for need in needs:
+                dependents[need].add(svc_id)
+        return {svc_id: frozenset(deps) for svc_id, deps in dependents.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict for JSON output."""
+        return {
+            'name': self.name,
+            'description': self.description,
+            'services': list(self.services),
+            'sdrs': {svc_id: list(serials) for svc_id, serials in self.sdrs.items()},
+            'depends': {svc_id: sorted(needs) for svc_id, needs in self.depends.items() if needs},
+        }
+
+
+def find_cycle(depends: Mapping[str, FrozenSet[str]]) -> Optional[List[str]]:
+    """A dependency cycle as a list of service ids, or None (Kahn's algorithm)."""
+    remaining = {svc_id: set(needs) for svc_id, needs in depends.items()}
+    ready = [svc_id for svc_id, needs in remaining.items() if not needs]
+    while ready:
+        done = ready.pop()
+        del remaining[done]
+        for svc_id, needs in remaining.items():
+            if done in needs:
+                needs.discard(done)
+                if not needs:
+                    ready.append(svc_id)
+    return sorted(remaining) or None
+
+
+def compile_profiles(raw_profiles: Optional[Mapping[str, Any]], services: Mapping[str, Any]) -> Dict[str, Profile]:
+    """
+    Validate the ``profiles`` section of config.yml against the compiled
+    *services*.  Broken profiles are logged and skipped; unknown services,
+    SDR assignments for services that take no SDR and dependencies outside
+    the profile are logged and dropped from an otherwise valid profile.
+    """
+    profiles = {}
+    for name, raw in (raw_profiles or {}).items():
+        if not isinstance(raw, dict) or not isinstance(raw.get('services'), list):
+            logger.error("Profile '%s' needs a 'services' list; skipping", name)
+            continue
+
+        members = []
+        for svc_id in raw['services']:
+            if svc_id not in services:
+                logger.error("Profile '%s' lists unknown service '%s'; ignoring it", name, svc_id)
+            elif svc_id not in members:
+                members.append(svc_id)
+
+        sdrs = {}
+        for svc_id, serials in (raw.get('sdrs') or {}).items():
+            if svc_id not in members or not services[svc_id].require_sdr:
+                logger.error("Profile '%s' assigns SDRs to '%s', which is not an SDR service in the profile; ignoring",
+                             name, svc_id)
+                continue
+            serials = [serials] if isinstance(serials, (str, int)) else list(serials or [])
+            sdrs[svc_id] = tuple(str(serial) for serial in serials)
+
+        depends = {svc_id: set() for svc_id in members}
+        for svc_id, needs in (raw.get('depends') or {}).items():
+            needs = [needs] if isinstance(needs, str) else list(needs or [])
+            for need in needs:
+                if svc_id not in depends or need not in depends or need == svc_id:
+                    logger.error("Profile '%s' dependency %s -> %s is not between two of its services; ignoring",
+                                 name, svc_id, need)
+                    continue
+                depends[svc_id].add(need)
+        depends = {svc_id: frozenset(needs) for svc_id, needs in depends.items()}
+
+        cycle = find_cycle(depends)
+        if cycle:
+            logger.error("Profile '%s' has a dependency cycle among %s; skipping", name, ', '.join(cycle))
+            continue
+
+        profiles[name] = Profile(name, str(raw.get('description', name)), tuple(members),
+                                 MappingProxyType(sdrs), MappingProxyType(depends))
+    return profiles
+
+
+def run_graph(pool: Executor, depends: Mapping[str, FrozenSet[str]],
+              step: Callable[[str], Dict[str, Any]], stop_on_failure: bool = True) -> List[Dict[str, Any]]:
+    """
+    Run ``step(node)`` for every node of *depends* on *pool*, each as soon
+    as all the nodes it depends on have finished.
+
+    *step* returns a dict with at least ``result`` (``done``, ``skipped`` or
+    ``failed``); ``node``, ``waited`` (seconds from the start of the run
+    until the step could start) and ``elapsed`` are added here.  With
+    *stop_on_failure*, steps whose dependencies failed are not run and
+    report ``result: blocked``.
+
+    :return: step reports in completion order
+    """
+    started = time.monotonic()
+    finished: Dict[str, Dict[str, Any]] = {}
+    pending = dict(depends)
+    running = {}
+
+    def timed(node):
+        begin = time.monotonic()
+        try:
+            report = step(node)
+        except RuntimeError as e:
+            logger.error("Step %s failed: %s", node, e)
+            report = {'result': 'failed', 'error': str(e)}
+        except Exception as e:
+            logger.exception("Step %s failed", node)
+            report = {'result': 'failed', 'error': str(e)}
+        report['elapsed'] = round(time.monotonic() - begin, 3)
+        report['waited'] = round(begin - started, 3)
+        return report
+
+    reports = []
+    while pending or running:
+        for node, needs in list(pending.items()):
+            if not needs <= finished.keys():
+                continue
+            del pending[node]
+            if stop_on_failure and any(finished[need]['result'] in ('failed', 'blocked') for need in needs):
+                blocked = [need for need in sorted(needs) if finished[need]['result'] in ('failed', 'blocked')]
+                report = {'node': node, 'result': 'blocked', 'error': f"depends on {', '.join(blocked)}",
+                          'elapsed': 0.0, 'waited': round(time.monotonic() - started, 3)}
+                finished[node] = report
+                reports.append(report)
+                continue
+            running[pool.submit(timed, node)] = node
+
+        if not running:
+            if pending and not any(needs <= finished.keys() for needs in pending.values()):
+                raise ValueError(f"Unsatisfiable dependencies among {', '.join(sorted(pending))}")
+            continue  # only blocked nodes were released; look again
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            node = running.pop(future)
+            report = dict(future.result(), node=node)
+            finished[node] = report
+            reports.append(report)
+    return reports
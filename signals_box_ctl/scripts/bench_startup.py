@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: how long a fresh process takes to import the app and
+to serve its first page.
+
+Each run starts a new interpreter in *workdir* (which must hold config.yml
+and creds.yml, like /opt/signals_box_ctl) so import caches do not carry
+over.  Run it on two checkouts to compare before and after a change:
+
+    python3 scripts/bench_startup.py --app-dir . --workdir /opt/signals_box_ctl
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+_PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+response = app.app.test_client().get('/')
+t2 = time.perf_counter()
+backends = app.manager.backends.status() if hasattr(app.manager, 'backends') else {}
+print(json.dumps({'import': t1 - t0, 'first_page': t2 - t1, 'status': response.status_code,
+                  'backends': {k: v['state'] for k, v in backends.items()}}))
+sys.stdout.flush()
+import os
+os._exit(0)
+"""
+
+
+def run_once(app_dir, workdir):
+    """Time one cold start; returns the probe's result dict."""
+    path = os.pathsep.join(filter(None, [os.path.abspath(app_dir), os.environ.get('PYTHONPATH')]))
+    env = dict(os.environ, PYTHONPATH=path, PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run([sys.executable, '-c', _PROBE], cwd=workdir, env=env,
+                            capture_output=True, text=True, timeout=120, check=False)
+    lines = [line for line in result.stdout.splitlines() if line.startswith('{')]
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(f"probe failed (exit {result.returncode}): {result.stderr.strip()[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', 1)[0])
+    parser.add_argument('--app-dir', default=os.path.join(os.path.dirname(__file__), '..'),
+                        help="Directory holding app.py (default: this checkout)")
+    parser.add_argument('--workdir', default='.', help="Directory with config.yml and creds.yml")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [run_once(args.app_dir, args.workdir) for _ in range(args.runs)]
+    for key in ('import', 'first_page'):
+        values = [run[key] * 1000 for run in runs]
+        print(f"{key:>10}: median {statistics.median(values):7.1f} ms  "
+              f"min {min(values):7.1f} ms  max {max(values):7.1f} ms")
+    print(f"{'status':>10}: {runs[-1]['status']}  backends: {runs[-1]['backends'] or 'n/a'}")
+
+
+if __name__ == "__main__":
+    main()
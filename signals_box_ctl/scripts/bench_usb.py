@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+USB enumeration benchmark: listing SDRs from sysfs against the old pyusb path.
+
+Both paths run over the same fake bus of 4 and 8 dongles (plus a root hub,
+a keyboard and the dongles' interface directories), so no hardware is
+needed.  The pyusb path goes through a stand-in for usb.core/usb.util whose
+string descriptor reads sleep --transfer-ms each, the cost of the control
+transfer libusb makes per descriptor; use --transfer-ms 0 to compare only
+the Python side:
+
+    python3 scripts/bench_usb.py --runs 50 --transfer-ms 1
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+RTL_V4 = (0x0bda, 0x2838)
+SDR_IDS = {RTL_V4: "RTLSDRBlog v4"}
+_OTHER = [("usb1", "1d6b", "0002", 1, 1), ("1-9", "046d", "c52b", 1, 20)]
+
+
+def _serial(n):
+    return f"{n + 1:08d}"
+
+
+def make_sysfs(root, count):
+    """Write a sysfs-like tree with *count* RTL-SDRs under *root*."""
+    def device(name, attrs):
+        path = os.path.join(root, name)
+        os.mkdir(path)
+        for attr, value in attrs.items():
+            with open(os.path.join(path, attr), "w", encoding="utf-8") as out:
+                out.write(f"{value}\n")
+
+    for name, vid, pid, bus, devnum in _OTHER:
+        device(name, {"idVendor": vid, "idProduct": pid, "busnum": bus, "devnum": devnum})
+    for n in range(count):
+        port = f"1-{n + 1}"
+        device(port, {"idVendor": "0bda", "idProduct": "2838", "serial": _serial(n),
+                      "manufacturer": "RTLSDRBlog", "product": "Blog V4",
+                      "busnum": 1, "devnum": n + 2, "speed": 480})
+        device(f"{port}:1.0", {"bInterfaceClass": "ff"})
+
+
+class _PyusbDevice:
+    def __init__(self, vid_pid, serial, address, port):
+        self.idVendor, self.idProduct = vid_pid
+        self.iManufacturer, self.iProduct, self.iSerialNumber = 1, 2, 3 if serial else 0
+        self._strings = {1: "RTLSDRBlog", 2: "Blog V4", 3: serial}
+        self.bus, self.address, self.port_numbers = 1, address, [port]
+
+
+def fake_pyusb(count, transfer):
+    """A usb module listing the same bus as make_sysfs()."""
+    devices = [_PyusbDevice((int(vid, 16), int(pid, 16)), "", devnum, None)
+               for _name, vid, pid, _bus, devnum in _OTHER]
+    devices += [_PyusbDevice(RTL_V4, _serial(n), n + 2, n + 1) for n in range(count)]
+
+    def get_string(dev, index):
+        if transfer:
+            time.sleep(transfer)
+        return dev._strings[index]  # pylint: disable=protected-access
+
+    core = types.SimpleNamespace(USBError=OSError, find=lambda find_all: iter(devices))
+    return types.SimpleNamespace(core=core, util=types.SimpleNamespace(get_string=get_string))
+
+
+def time_listing(usb_devices, runs):
+    """Median and minimum milliseconds of list_rtlsdr_devices(), and the last result."""
+    timings = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        devices = usb_devices.list_rtlsdr_devices()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings), min(timings), devices
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', 1)[0])
+    parser.add_argument('--app-dir', default=os.path.join(os.path.dirname(__file__), '..'),
+                        help="Directory holding usbs.py (default: this checkout)")
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--transfer-ms', type=float, default=1.0,
+                        help="Simulated time per USB string descriptor read (default 1 ms)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.app_dir))
+    logging.getLogger("usbs").setLevel(logging.ERROR)  # the pyusb run logs its sysfs fallback each time
+    import usbs  # pylint: disable=import-outside-toplevel
+
+    for count in (4, 8):
+        serials = {_serial(n): n for n in range(count)}
+        with tempfile.TemporaryDirectory() as root:
+            make_sysfs(root, count)
+            sysfs = usbs.UsbDevices(SDR_IDS, sysfs_root=root)
+            sysfs._serial_map = serials  # pylint: disable=protected-access
+            sysfs_median, sysfs_min, sysfs_found = time_listing(sysfs, args.runs)
+
+            usbs.usb = fake_pyusb(count, args.transfer_ms / 1000)
+            usbs._pyusb_available = True  # pylint: disable=protected-access
+            pyusb = usbs.UsbDevices(SDR_IDS, sysfs_root=os.path.join(root, "missing"))
+            pyusb._serial_map = serials  # pylint: disable=protected-access
+            pyusb_median, pyusb_min, pyusb_found = time_listing(pyusb, args.runs)
+
+        if [d["Serial"] for d in sysfs_found] != [d["Serial"] for d in pyusb_found]:
+            raise RuntimeError("sysfs and pyusb listed different devices")
+        print(f"{count} SDRs:  sysfs median {sysfs_median:7.2f} ms  min {sysfs_min:7.2f} ms  |  "
+              f"pyusb median {pyusb_median:7.2f} ms  min {pyusb_min:7.2f} ms  "
+              f"(pyusb/sysfs {pyusb_median / sysfs_median:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+SDR allocation.
+
+Every service that takes an SDR states what it needs: how many devices,
+which models from ``sdr_ids`` will do and the frequency range it tunes.
+``allocate()`` assigns detected devices to the services about to start as
+a bipartite matching (Kuhn's augmenting paths) around the devices already
+held by running services, honouring serials pinned by the user, so a
+conflict is found before anything is started.
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+_FREQUENCY = re.compile(r'^\s*([0-9]*\.?[0-9]+(?:e[0-9]+)?)\s*([kmg]?)(?:hz)?\s*$', re.IGNORECASE)
+_MULTIPLIERS = {'': 1.0, 'k': 1e3, 'm': 1e6, 'g': 1e9}
+
+
+def parse_frequency(value: Any) -> float:
+    """
+    Frequency in Hz from a number or a string such as ``152.592M``,
+    ``24e6`` or ``1.7 GHz``.
+
+    :raises ValueError: if *value* is not a frequency
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    match = _FREQUENCY.match(str(value))
+    if match is None:
+        raise ValueError(f"invalid frequency '{value}'")
+    return float(match.group(1)) * _MULTIPLIERS[match.group(2).lower()]
+
+
+def parse_range(value: Any) -> Tuple[float, float]:
+    """
+    ``(low, high)`` in Hz from ``[low, high]`` or a single frequency.
+
+    :raises ValueError: if *value* is not a frequency or a pair of them
+    """
+    if isinstance(value, (list, tuple)):
+        if len(value) != 2:
+            raise ValueError(f"frequency range needs two values, got {len(value)}")
+        low, high = parse_frequency(value[0]), parse_frequency(value[1])
+        if low > high:
+            raise ValueError(f"frequency range {value[0]}-{value[1]} is reversed")
+        return (low, high)
+    freq = parse_frequency(value)
+    return (freq, freq)
+
+
+def parse_bands(value: Any) -> Tuple[Tuple[float, float], ...]:
+    """
+    Tuning bands of a device model: one range, or a list of ranges such as
+    ``[[9k, 31M], [60M, 260M]]``.
+
+    :raises ValueError: if any band is invalid
+    """
+    if isinstance(value, (list, tuple)) and value and isinstance(value[0], (list, tuple)):
+        return tuple(parse_range(band) for band in value)
+    return (parse_range(value),)
+
+
+def format_range(freq_range: Tuple[float, float]) -> str:
+    """``152.592 MHz`` or ``24-1766 MHz``."""
+    low, high = freq_range
+    if low == high:
+        return f"{low / 1e6:g} MHz"
+    return f"{low / 1e6:g}-{high / 1e6:g} MHz"
+
+
+class SdrConflict(RuntimeError):
+    """
+    Requested SDRs cannot be assigned.  ``conflicts`` maps each service id
+    that could not be satisfied to the reason.
+    """
+
+    def __init__(self, conflicts: Mapping[str, str]) -> None:
+        self.conflicts = dict(conflicts)
+        super().__init__('; '.join(f"{svc_id}: {reason}" for svc_id, reason in sorted(self.conflicts.items())))
+
+
+class SdrRequest(NamedTuple):
+    """What one service about to start needs."""
+    service_id: str
+    count: int                                   # devices wanted, pinned ones included
+    models: Tuple[str, ...] = ()                 # acceptable ``sdr_ids`` names, empty for any
+    freq_range: Optional[Tuple[float, float]] = None
+    pinned: Tuple[str, ...] = ()                 # serials the service must get
+    movable: bool = False                        # pins were picked by the allocator and may be replaced
+
+
+_Bands = Mapping[str, Tuple[Tuple[float, float], ...]]
+
+
+def unfit_reason(request: SdrRequest, device: Any, model_bands: _Bands) -> Optional[str]:
+    """None if *device* can serve *request*, otherwise why not."""
+    if request.models and device.friendly not in request.models:
+        return f"SDR {device.serial} is a {device.friendly}, not {' or '.join(request.models)}"
+    bands = model_bands.get(device.friendly)
+    if request.freq_range is not None and bands is not None and \
+            not any(low <= request.freq_range[0] <= request.freq_range[1] <= high for low, high in bands):
+        tunes = ', '.join(format_range(band) for band in bands)
+        return f"SDR {device.serial} ({device.friendly}, {tunes}) cannot tune {format_range(request.freq_range)}"
+    return None
+
+
+def _describe(request: SdrRequest) -> str:
+    parts = []
+    if request.models:
+        parts.append(' or '.join(request.models))
+    if request.freq_range is not None:
+        parts.append(f"for {format_range(request.freq_range)}")
+    return ' '.join(parts)
+
+
+def allocate(requests: Iterable[SdrRequest], devices: Iterable[Any], busy: Mapping[str, str],
+             model_bands: _Bands) -> Dict[str, Tuple[str, ...]]:
+    """
+    Assign detected *devices* to every request in one matching.
+
+    Pinned serials are checked first (connected, not *busy*, right model
+    and range).  The remaining devices each request wants are then matched
+    to free devices, using devices that fewer requests can use first so the
+    versatile ones stay free.  A movable pin that no longer fits is dropped
+    and replaced instead of failing.
+
+    :param requests: one SdrRequest per service to start
+    :param devices: detected SdrDevice or SdrInfo records
+    :param busy: serial -> id of the running service (or Kismet) holding it
+    :param model_bands: ``sdr_ids`` name -> tuning bands as (low, high) in Hz
+    :return: service id -> assigned serials, pinned ones first
+    :raises SdrConflict: if any request cannot be satisfied; nothing is assigned then
+    """
+    requests = sorted(requests, key=lambda request: request.movable)  # fixed pins win over movable ones
+    devices = list(devices)
+    by_serial = {device.serial: device for device in devices}
+    taken = dict(busy)
+    assigned: Dict[str, List[str]] = {}
+    conflicts: Dict[str, str] = {}
+    slots: List[SdrRequest] = []
+
+    for request in requests:
+        kept = assigned.setdefault(request.service_id, [])
+        for serial in request.pinned:
+            device = by_serial.get(serial)
+            if device is None:
+                reason = f"SDR {serial} is not connected"
+            elif taken.get(serial, request.service_id) != request.service_id:
+                reason = f"SDR {serial} is in use by {taken[serial]}"
+            else:
+                reason = unfit_reason(request, device, model_bands)
+            if reason is None:
+                taken[serial] = request.service_id
+                kept.append(serial)
+            elif request.movable:
+                logger.info("Reassigning %s: %s", request.service_id, reason)
+            else:
+                conflicts.setdefault(request.service_id, reason)
+        slots.extend([request] * max(request.count - len(kept), 0))
+
+    free = [device for device in devices if device.serial not in taken]
+    candidates = [[device.serial for device in free if unfit_reason(request, device, model_bands) is None]
+                  for request in slots]
+    demand = Counter(serial for serials in candidates for serial in serials)
+    for serials in candidates:
+        serials.sort(key=lambda serial: demand[serial])  # stable: enumeration order breaks ties
+
+    match: Dict[str, int] = {}  # serial -> slot
+
+    def augment(slot: int, seen: set) -> bool:
+        for serial in candidates[slot]:
+            if serial in seen:
+                continue
+            seen.add(serial)
+            if serial not in match or augment(match[serial], seen):
+                match[serial] = slot
+                return True
+        return False
+
+    for slot in sorted(range(len(slots)), key=lambda slot: len(candidates[slot])):
+        if not augment(slot, set()):
+            request = slots[slot]
+            in_use = ', '.join(f"{serial} by {owner}" for serial, owner in sorted(busy.items()))
+            conflicts.setdefault(request.service_id, f"no free SDR {_describe(request)}".rstrip()
+                                 + (f" (in use: {in_use})" if in_use else ""))
+
+    if conflicts:
+        raise SdrConflict(conflicts)
+    for serial, slot in sorted(match.items(), key=lambda item: item[1]):
+        assigned[slots[slot].service_id].append(serial)
+    return {svc_id: tuple(serials) for svc_id, serials in assigned.items()}
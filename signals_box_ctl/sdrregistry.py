@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+"""
+Registry of detected SDR devices and the services using them
+"""
+
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SdrInfo(NamedTuple):
+    """Immutable copy of an SdrDevice, as published in state snapshots."""
+    serial: str
+    rtl_index: Optional[int]
+    vid: str
+    pid: str
+    friendly: str
+    manufacturer: str
+    product: str
+    bus: int
+    address: int
+    speed: str
+    port: str
+    status: str
+    owner: Optional[str]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict for JSON output."""
+        return self._asdict()
+
+
+class SdrDevice:
+    """
+    One detected SDR dongle.  ``status`` is the label shown in the UI and
+    ``owner`` the id of whatever currently claims the device.
+    """
+
+    __slots__ = ('serial', 'rtl_index', 'vid', 'pid', 'friendly', 'manufacturer',
+                 'product', 'bus', 'address', 'speed', 'port', 'status', 'owner')
+
+    def __init__(self, serial: str, rtl_index=None, vid: str = "", pid: str = "",
+                 friendly: str = "", manufacturer: str = "", product: str = "",
+                 bus: int = 0, address: int = 0, speed: str = "", port: str = "") -> None:
+        self.serial = serial
+        self.rtl_index = rtl_index
+        self.vid = vid
+        self.pid = pid
+        self.friendly = friendly
+        self.manufacturer = manufacturer
+        self.product = product
+        self.bus = bus
+        self.address = address
+        self.speed = speed
+        self.port = port
+        self.status = ""
+        self.owner = None
+
+    @classmethod
+    def from_usb(cls, info: Dict[str, str]) -> "SdrDevice":
+        """Build a record from a UsbDevices description dict."""
+        rtl_index = info.get("Rtl Id")
+        return cls(
+            serial=str(info.get("Serial", "")),
+            rtl_index=rtl_index if isinstance(rtl_index, int) else None,
+            vid=info.get("VID", ""),
+            pid=info.get("PID", ""),
+            friendly=info.get("Friendly", ""),
+            manufacturer=info.get("Manufacturer", ""),
+            product=info.get("Product", ""),
+            bus=info.get("Bus", 0),
+            address=info.get("Address", 0),
+            speed=info.get("Speed", ""),
+            port=info.get("Port", ""),
+        )
+
+    def to_dict(self) -> Dict[str, object]:
+        """Plain dict for JSON output."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def freeze(self) -> SdrInfo:
+        """Immutable copy of the current record."""
+        return SdrInfo(*(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self) -> str:
+        return f"<SdrDevice serial={self.serial!r} rtl_index={self.rtl_index} owner={self.owner!r}>"
+
+
+class SdrRegistry:
+    """
+    Detected SDRs indexed by serial and RTL-SDR index, plus an
+    owner -> serials reverse map so claim, release and conflict lookups are
+    dictionary operations.
+
+    Dongles often leave the factory with the same serial.  The first one
+    enumerated keeps it; each further one is listed as ``<serial>@<port>``
+    (USB port path, or bus-address) so it stays visible and selectable,
+    and its RTL-SDR index, which librtlsdr can only look up by serial, is
+    left unknown.
+    """
+
+    def __init__(self) -> None:
+        self._devices: Tuple[SdrDevice, ...] = ()
+        self._by_serial: Dict[str, SdrDevice] = {}
+        self._by_index: Dict[int, SdrDevice] = {}
+        self._owned: Dict[str, List[str]] = {}
+        self._duplicates: Tuple[Tuple[str, str], ...] = ()
+        self._lock = threading.RLock()
+
+    def load(self, device_infos: Iterable[Dict[str, str]]) -> None:
+        """
+        Replace the device set with a fresh enumeration.  Claims on devices
+        that are still present are kept.
+        """
+        with self._lock:
+            devices = tuple(SdrDevice.from_usb(info) for info in device_infos)
+            by_serial = {}
+            duplicates = []
+            for device in devices:
+                if device.serial in by_serial:
+                    serial = device.serial
+                    device.serial = f"{serial}@{device.port or f'{device.bus}-{device.address}'}"
+                    device.rtl_index = None
+                    duplicates.append((serial, device.serial))
+                old = self._by_serial.get(device.serial)
+                if old is not None:
+                    device.owner, device.status = old.owner, old.status
+                by_serial.setdefault(device.serial, device)
+
+            duplicates = tuple(duplicates)
+            if duplicates != self._duplicates:
+                for serial, key in duplicates:
+                    logger.warning("SDR serial %s is used by more than one device; listing the one at %s as %s "
+                                   "with no RTL-SDR index.  Give each dongle its own serial (rtl_eeprom -s).",
+                                   serial, key.partition('@')[2], key)
+                self._duplicates = duplicates
+
+            self._devices = devices
+            self._by_serial = by_serial
+            self._by_index = {}
+            for device in devices:
+                if device.rtl_index is None:
+                    continue
+                other = self._by_index.setdefault(device.rtl_index, device)
+                if other is not device:
+                    logger.warning("SDRs %s and %s both report RTL-SDR index %s; keeping %s",
+                                   other.serial, device.serial, device.rtl_index, other.serial)
+            self._owned = {
+                owner: [s for s in serials if s in by_serial]
+                for owner, serials in self._owned.items()
+            }
+
+    def devices(self) -> Tuple[SdrDevice, ...]:
+        """All devices in enumeration order."""
+        return self._devices
+
+    def get(self, serial) -> Optional[SdrDevice]:
+        """Device with the given serial, or None."""
+        return self._by_serial.get(str(serial))
+
+    def by_rtl_index(self, rtl_index: int) -> Optional[SdrDevice]:
+        """Device with the given librtlsdr index, or None."""
+        return self._by_index.get(rtl_index)
+
+    def owner_of(self, serial) -> Optional[str]:
+        """Id of whatever currently claims *serial*."""
+        device = self._by_serial.get(str(serial))
+        return device.owner if device is not None else None
+
+    def devices_of(self, owner: str) -> List[SdrDevice]:
+        """Devices currently claimed by *owner*."""
+        return [self._by_serial[s] for s in self._owned.get(owner, ())]
+
+    def conflicts(self, owner: str, serials: Iterable) -> Dict[str, str]:
+        """Serials in *serials* already claimed by someone other than *owner*, with their owner."""
+        result = {}
+        for serial in serials:
+            current = self.owner_of(serial)
+            if current is not None and current != owner:
+                result[str(serial)] = current
+        return result
+
+    def claim(self, owner: str, serials: Iterable, label: str) -> Dict[str, str]:
+        """
+        Mark *serials* as used by *owner*.  Devices claimed by another owner
+        are left alone and returned as ``{serial: other_owner}``; unknown
+        serials are logged and skipped.
+        """
+        conflicts = {}
+        with self._lock:
+            owned = self._owned.setdefault(owner, [])
+            for serial in serials:
+                serial = str(serial)
+                device = self._by_serial.get(serial)
+                if device is None:
+                    logger.error("Could not find SDR with serial %s for %s", serial, owner)
+                    continue
+                if device.owner not in (None, owner):
+                    conflicts[serial] = device.owner
+                    continue
+                device.owner = owner
+                device.status = label
+                if serial not in owned:
+                    owned.append(serial)
+        return conflicts
+
+    def release(self, owner: str) -> None:
+        """Drop every claim held by *owner*."""
+        with self._lock:
+            for serial in self._owned.pop(owner, ()):
+                device = self._by_serial.get(serial)
+                if device is not None and device.owner == owner:
+                    device.owner = None
+                    device.status = ""
+
+    def release_all(self) -> None:
+        """Drop every claim."""
+        with self._lock:
+            for owner in list(self._owned):
+                self.release(owner)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Compiled service definitions.
+
+``compile_services()`` turns the ``services`` section of config.yml into
+one immutable ``ServiceDef`` per entry, validated once at load time, so the
+rest of the app reads typed attributes instead of looking up YAML keys.
+Runtime state (status, selected SDR, running process) lives separately in
+a ``ServiceState``.
+"""
+
+from copy import deepcopy
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple
+import logging
+
+from sdralloc import parse_range
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigError(ValueError):
+    """A service entry in config.yml is invalid."""
+
+
+class ServiceDef:
+    """
+    Fields common to every service type.  Instances are read-only; a
+    config reload builds new ones and compares them with ``changed_fields``.
+    """
+
+    __slots__ = ('id', 'type', 'description', 'link', 'autostart', 'require_sdr', 'multi_sdr',
+                 'default_sdr', 'freq_input', 'sdr_count', 'sdr_models', 'freq_range', 'raw')
+
+    TYPE = ''
+    PROCESS = False  # True if this app runs the service's processes
+    REQUIRED: Tuple[str, ...] = ('description',)
+    # Fields a running service picks up without being restarted
+    COSMETIC: FrozenSet[str] = frozenset(('description', 'link', 'autostart'))
+    # Fields that decide which SDR a service uses
+    SDR_FIELDS: FrozenSet[str] = frozenset(('default_sdr', 'require_sdr', 'multi_sdr',
+                                            'sdr_count', 'sdr_models', 'freq_range'))
+
+    def __init__(self, svc_id: str, raw: Mapping[str, Any]) -> None:
+        for key in self.REQUIRED:
+            if key not in raw:
+                raise ConfigError(f"missing required field '{key}'")
+        self._set('id', svc_id)
+        self._set('type', self.TYPE)
+        self._set('description', str(raw['description']))
+        self._set('link', raw.get('link'))
+        self._set('autostart', bool(raw.get('autostart', False)))
+        self._set('require_sdr', bool(raw.get('require_sdr', False)))
+        self._set('multi_sdr', bool(raw.get('multi_sdr', False)))
+        self._set('default_sdr', raw.get('default_sdr'))
+        self._set('freq_input', raw.get('freq_input'))
+        self._set_sdr_needs(raw)
+        self._set('raw', MappingProxyType(deepcopy(dict(raw))))
+
+    def _set(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+
+    def _set_sdr_needs(self, raw: Mapping[str, Any]) -> None:
+        count = raw.get('sdr_count', 1)
+        if not isinstance(count, int) or isinstance(count, bool) or count < 1:
+            raise ConfigError("'sdr_count' must be a positive integer")
+        if count > 1 and not self.multi_sdr:
+            raise ConfigError("'sdr_count' above 1 needs 'multi_sdr: true'")
+        self._set('sdr_count', count)
+
+        models = raw.get('sdr_models') or ()
+        self._set('sdr_models', (str(models),) if isinstance(models, str) else tuple(str(m) for m in models))
+
+        # The tuning range defaults to freq_input, when that is a plain frequency
+        freq_range = raw.get('freq_range')
+        try:
+            if freq_range is not None:
+                freq_range = parse_range(freq_range)
+            elif self.freq_input:
+                freq_range = parse_range(self.freq_input)
+        except ValueError as e:
+            if 'freq_range' in raw:
+                raise ConfigError(f"invalid 'freq_range': {e}") from e
+            freq_range = None
+        self._set('freq_range', freq_range)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other: object) -> bool:
+        return type(other) is type(self) and other.id == self.id and other.raw == self.raw
+
+    def __hash__(self) -> int:
+        return hash((self.id, self.type))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.id!r})"
+
+    def changed_fields(self, other: Optional["ServiceDef"]) -> FrozenSet[str]:
+        """Names of the config.yml fields that differ from *other* (all of them if None)."""
+        if other is None:
+            return frozenset(self.raw)
+        return frozenset(key for key in self.raw.keys() | other.raw.keys()
+                         if self.raw.get(key) != other.raw.get(key))
+
+
+class SystemdServiceDef(ServiceDef):
+    """A ``type: systemd`` service."""
+    __slots__ = ('system_ctl_name',)
+    TYPE = 'systemd'
+    REQUIRED = ServiceDef.REQUIRED + ('system_ctl_name',)
+
+    def __init__(self, svc_id: str, raw: Mapping[str, Any]) -> None:
+        super().__init__(svc_id, raw)
+        self._set('system_ctl_name', str(raw['system_ctl_name']))
+
+
+class DockerServiceDef(ServiceDef):
+    """A ``type: docker`` service."""
+    __slots__ = ('container_name',)
+    TYPE = 'docker'
+    REQUIRED = ServiceDef.REQUIRED + ('container_name',)
+
+    def __init__(self, svc_id: str, raw: Mapping[str, Any]) -> None:
+        super().__init__(svc_id, raw)
+        self._set('container_name', str(raw['container_name']))
+
+
+class CliServiceDef(ServiceDef):
+    """A ``type: cli`` service, run by ``CliService``."""
+    __slots__ = ('cmd_line', 'working_dir', 'restart')
+    TYPE = 'cli'
+    PROCESS = True
+    REQUIRED = ServiceDef.REQUIRED + ('cmd_line',)
+    RESTART_POLICIES = ("never", "on-failure", "always")
+
+    def __init__(self, svc_id: str, raw: Mapping[str, Any]) -> None:
+        super().__init__(svc_id, raw)
+        self._set('cmd_line', str(raw.get('cmd_line', '')))
+        self._set('working_dir', raw.get('working_dir'))
+        restart = raw.get('restart', 'never')
+        if restart not in self.RESTART_POLICIES:
+            raise ConfigError(f"invalid restart policy '{restart}'")
+        self._set('restart', restart)
+        for key in ('restart_delay', 'restart_max_delay', 'start_interval', 'start_limit', 'output_lines'):
+            if raw.get(key) is not None and not isinstance(raw[key], (int, float)):
+                raise ConfigError(f"'{key}' must be a number")
+
+    def process_config(self) -> Dict[str, Any]:
+        """A mutable copy of the entry, as ``CliService`` expects it."""
+        return deepcopy(dict(self.raw))
+
+
+class PipelineServiceDef(CliServiceDef):
+    """A ``type: pipeline`` service, run by ``PipelineService``."""
+    __slots__ = ('stages',)
+    TYPE = 'pipeline'
+    REQUIRED = ServiceDef.REQUIRED + ('stages',)
+
+    def __init__(self, svc_id: str, raw: Mapping[str, Any]) -> None:
+        super().__init__(svc_id, raw)
+        stages = raw['stages']
+        if not stages or not isinstance(stages, list):
+            raise ConfigError("missing required field 'stages'")
+        for index, stage in enumerate(stages):
+            if not isinstance(stage, dict) or 'cmd_line' not in stage:
+                raise ConfigError(f"stage {index} has no 'cmd_line'")
+        self._set('stages', tuple(MappingProxyType(dict(stage)) for stage in self.raw['stages']))
+
+
+SERVICE_TYPES = {cls.TYPE: cls for cls in (SystemdServiceDef, DockerServiceDef, CliServiceDef, PipelineServiceDef)}
+
+
+def compile_services(raw_services: Mapping[str, Any]) -> Dict[str, ServiceDef]:
+    """
+    Build a ``ServiceDef`` for every entry of config.yml's ``services``.
+    Invalid entries are logged and skipped rather than crashing the app.
+    """
+    services = {}
+    for svc_id, raw in (raw_services or {}).items():
+        if not isinstance(raw, dict):
+            logger.error("Service '%s' is not a mapping; skipping", svc_id)
+            continue
+        svc_type = raw.get('type')
+        if not svc_type:
+            logger.error("Service '%s' missing required field 'type'; skipping", svc_id)
+            continue
+        def_class = SERVICE_TYPES.get(svc_type)
+        if def_class is None:
+            logger.error("Service '%s' has unknown type '%s'; skipping", svc_id, svc_type)
+            continue
+        try:
+            services[svc_id] = def_class(svc_id, raw)
+        except ConfigError as e:
+            logger.error("Service '%s' (%s) %s; skipping", svc_id, svc_type, e)
+    return services
+
+
+class ServiceState:
+    """Mutable runtime state of one service, kept apart from its definition."""
+
+    __slots__ = ('status', 'health', 'selected_sdr', 'auto_sdr', 'process')
+
+    def __init__(self, selected_sdr=None) -> None:
+        self.status: Optional[str] = None
+        self.health: Optional[str] = None  # healthcheck result of a running container, if it has one
+        self.selected_sdr = selected_sdr
+        self.auto_sdr = False  # selected_sdr was picked by the allocator, not the user
+        self.process = None  # CliService or PipelineService, created on first use
@@ -4,153 +4,29 @@
 This module contains the main class for managing services.
 """
 
-# TODO: Alerts and disabled services with out libraries
-
-from typing import Dict, List, Optional, Any
+from collections import deque
+from typing import Callable, Dict, List, Optional, Any
 import logging
+import signal
 import subprocess
 import shlex
 import threading
-import atexit
+import json
+import time
 
-supported_services = [
-    'cli'
-]
+from outputmux import output_mux
+from supervisor import signal_group, supervisor
 
 logger = logging.getLogger(__name__)
 
+_kismet_available = False
 try:
-    import dbus
-    from dbus.exceptions import DBusException
-    supported_services.append('systemd')
-except ImportError as e:
-    raise Exception ("dbus library not installed on system") from e
-
-try:
-    import docker
-    import docker.errors
-    supported_services.append('docker')
-
-except ImportError as e:
-    raise Exception ("docker API not installed on system") from e
-
-_kismet_rest_available = False
-try:
-    import kismet_rest
-    _kismet_rest_available = True
+    import requests
+    _kismet_available = True
 except ImportError:
-    logger.warning("kismet_rest not installed – Kismet integration disabled")
-
-class SystemdServiceManager:
-    """
-    Manages services using systemd. 
-    """
-
-    def __init__(self):
-        self.bus = self.get_bus(False)
-
-    # D‑Bus helpers
-    @staticmethod
-    def get_bus(is_user: bool) -> dbus.Bus:
-        """Return the correct D‑Bus connection (system or session)."""
-        return dbus.SessionBus() if is_user else dbus.SystemBus()
-
-    def get_manager(self) -> dbus.Interface:
-        """
-        Get the `org.freedesktop.systemd1.Manager` interface.
-        Raises RuntimeError if the interface cannot be reached.
-        """
-        try:
-            obj = self.bus.get_object("org.freedesktop.systemd1",
-                                "/org/freedesktop/systemd1")
-            return dbus.Interface(obj, "org.freedesktop.systemd1.Manager")
-        except DBusException as exc:
-            raise RuntimeError(
-                f"Unable to connect to systemd over D‑Bus: {exc}"
-            ) from exc
-
-    def get_unit_properties(self, unit_name: str) -> dict:
-        """
-        Fetch all properties of a unit via the `org.freedesktop.DBus.Properties`
-        interface. Returns a plain dict with string keys and Python‑friendly
-        values (bytes → str, etc.).
-        """
-        try:
-            unit_obj_path = self.get_manager().GetUnit(unit_name)
-            props_obj = self.bus.get_object("org.freedesktop.systemd1",
-                                    str(unit_obj_path))
-            props_iface = dbus.Interface(props_obj, "org.freedesktop.DBus.Properties")
-            raw_props = props_iface.GetAll("org.freedesktop.systemd1.Unit")
-
-            # Convert D‑Bus types to normal Python types for printing
-            def _convert(value):
-                if isinstance(value, dbus.ByteArray):
-                    return bytes(value).decode()
-                if isinstance(value, dbus.Byte):
-                    return int(value)
-                return value
-
-            return {k: _convert(v) for k, v in raw_props.items()}
-        except DBusException as exc:
-            raise RuntimeError(
-                f"Failed to read properties of unit '{unit_name}': {exc}"
-            ) from exc
-
-    # Service actions
-    def start_service(self, name: str) -> None:
-        """Start the unit with the given name."""
-        manager = self.get_manager()
-        try:
-            manager.StartUnit(name, "replace")  # 'replace' mode starts it immediately
-            logger.info("Started %s", name)
-        except DBusException as exc:
-            raise RuntimeError(f"Failed to start {name}: {exc}") from exc
-
-
-    def stop_service(self, name: str) -> None:
-        """Stop the unit."""
-        manager = self.get_manager()
-        try:
-            manager.StopUnit(name, "replace")
-            logger.info("Stopped %s", name)
-        except DBusException as exc:
-            raise RuntimeError(f"Failed to stop {name}: {exc}") from exc
-
-    def restart_service(self, name: str) -> None:
-        """Restart the unit."""
-        manager = self.get_manager()
-        try:
-            manager.RestartUnit(name, "replace")
-            logger.info("Restarted %s", name)
-        except DBusException as exc:
-            raise RuntimeError(f"Failed to restart {name}: {exc}") from exc
+    logger.warning("requests not installed – Kismet integration disabled")
 
-    def status_service(self, name: str) -> dict:
-        """Return a dict with the unit's ActiveState (single targeted D-Bus Get call)."""
-        try:
-            unit_obj_path = self.get_manager().GetUnit(name)
-            props_obj = self.bus.get_object("org.freedesktop.systemd1", str(unit_obj_path))
-            props_iface = dbus.Interface(props_obj, "org.freedesktop.DBus.Properties")
-            active_state = str(props_iface.Get("org.freedesktop.systemd1.Unit", "ActiveState"))
-            return {'ActiveState': active_state}
-        except (DBusException, RuntimeError) as exc:
-            logger.error("Failed to status %s: %s", name, exc)
-            return None
-
-    def list_services(self) -> None:
-        """List all services, optionally filtering by a glob pattern."""
-        manager = self.get_manager()
-        try:
-            units = manager.ListUnits()  # returns list of tuples
-        except DBusException as exc:
-            raise RuntimeError(f"Failed to list units: {exc}") from exc
-
-        print(f"{'ID':<50} {'Active':<10} {'Sub':<10} {'Description'}")
-        print("-" * 90)
-        for unit in units:
-            print(f"{unit[0]:<50} {unit[3]:<10} {unit[4]:<10} {unit[1]}")
 
-# Systemd Helper functions
 def _substitute_placeholders(cmd_line: str, params: Dict[str, Any]) -> str:
     """
     Replace placeholders of the form <1>, <2>, ... in *cmd_line*
@@ -177,20 +53,34 @@ class CliService:
     """
     Wraps a command‑line program so you can start/stop it from Python.
 
+    The process runs in its own session so stopping it signals the whole
+    process group, including children such as ``rtl_fm`` started by a
+    wrapper script.  Exits are reaped by the shared ``ProcessSupervisor``,
+    which also restarts the process according to its restart policy.
+
     Parameters
     ----------
     config : dict
         A dictionary containing at least the keys listed in the example
         below.  Unknown keys are ignored – they simply become part of
         the *params* namespace for placeholder replacement.
+    on_change : callable or None
+        Called with no arguments, from the supervisor thread, whenever the
+        process exits or is restarted on its own.
     """
 
-    def __init__(self, svc_id, config: Dict[str, Any]) -> None:
+    REQUIRED_KEYS = ("type", "description", "cmd_line")
+    RESTART_POLICIES = ("never", "on-failure", "always")
+    # A process that ran this long before exiting resets the restart backoff
+    STABLE_AFTER = 60.0
+
+    def __init__(self, svc_id, config: Dict[str, Any],
+                 on_change: Optional[Callable[[], None]] = None) -> None:
         if not isinstance(config, dict):
             raise TypeError("config must be a dict")
 
         # Mandatory fields – raise if missing
-        for key in ("type", "description", "cmd_line"):
+        for key in self.REQUIRED_KEYS:
             if key not in config:
                 raise ValueError(f"Missing required config key: {key}")
 
@@ -198,9 +88,20 @@ class CliService:
         self.svc_id: str = svc_id
         self.type: str = config["type"]
         self.description: str = config["description"]
-        self.cmd_line: str = config["cmd_line"]
+        self.cmd_line: str = config.get("cmd_line", "")
         self.require_sdr: bool = config.get("require_sdr", False)
         self.cwd: Optional[str] = config.get("working_dir", None)
+        self.output_lines: Optional[int] = config.get("output_lines", None)
+
+        # Restart policy
+        self.restart: str = config.get("restart", "never")
+        if self.restart not in self.RESTART_POLICIES:
+            raise ValueError(f"Invalid restart policy '{self.restart}', expected one of {self.RESTART_POLICIES}")
+        self.restart_delay: float = float(config.get("restart_delay", 1))
+        self.restart_max_delay: float = float(config.get("restart_max_delay", 60))
+        self.start_limit: int = int(config.get("start_limit", 5))
+        self.start_interval: float = float(config.get("start_interval", 300))
+        self.on_change = on_change
 
         # All remaining keys are treated as optional params for placeholder replacement
         self.params: Dict[str, Any] = {k: v for k, v in config.items()
@@ -211,20 +112,15 @@ class CliService:
         # Internal state
         self._proc: Optional[subprocess.Popen] = None
         self._lock = threading.Lock()  # guard access to _proc
-
-        # Register cleanup on interpreter exit
-        atexit.register(self._cleanup_on_exit)
+        self.state: str = "stopped"  # stopped, running, restarting or failed
+        self.last_exit: Optional[int] = None
+        self._extra_params: Dict[str, Any] = {}
+        self._started_at = 0.0
+        self._starts: deque = deque()
+        self._delay = self.restart_delay
+        self._restart_handle: Optional[int] = None
 
     # Private helpers
-    def _cleanup_on_exit(self) -> None:
-        """
-        Called automatically on program exit to ensure we don't leave
-        orphaned processes around.
-        """
-        if self.is_running():
-            logger.debug("Cleaning up service '%s' on exit", self.svc_id)
-            self.stop()
-
     def _ensure_not_running(self) -> None:
         logger.debug("Checking Process Lock")
         if self.is_running():
@@ -236,71 +132,140 @@ class CliService:
         if not self.is_running():
             raise RuntimeError(f"Service '{self.svc_id}' is not running")
 
+    def _notify(self) -> None:
+        if self.on_change is not None:
+            try:
+                self.on_change()
+            except Exception:
+                logger.exception("State callback for service '%s' failed", self.svc_id)
+
     # Public API
-    def start(self) -> None:
+    def start(self, extra_params: Optional[Dict[str, Any]] = None) -> None:
         """
         Launch the command as a background process.
 
+        Parameters
+        ----------
+        extra_params : dict or None
+            Runtime placeholder values (e.g. ``sdr_index``) that override the
+            ones taken from the service config.  They are reused for
+            automatic restarts.
+
         Raises
         ------
         RuntimeError
             If the service is already running or if the process cannot be started.
         """
         with self._lock:
-            # Perform placeholder substitution
-            full_cmd = _substitute_placeholders(self.cmd_line, self.params)
-            cmd_parts = _parse_command(full_cmd)
+            if self._proc is not None and self._proc.poll() is None:
+                raise RuntimeError(f"Service '{self.svc_id}' is already running")
+            supervisor.cancel(self._restart_handle)
+            self._restart_handle = None
+            self._extra_params = dict(extra_params or {})
+            self._starts.clear()
+            self._delay = self.restart_delay
+            self._spawn()
+
+    def _spawn(self) -> None:
+        """Start the process.  Caller holds ``_lock``."""
+        # Perform placeholder substitution
+        params = dict(self.params, **self._extra_params)
+        full_cmd = _substitute_placeholders(self.cmd_line, params)
+        cmd_parts = _parse_command(full_cmd)
+
+        logger.info("Starting service '%s': %s", self.svc_id, cmd_parts)
 
-            logger.info("Starting service '%s': %s", self.svc_id, cmd_parts)
+        try:
+            # Use stdout/stderr = subprocess.PIPE so that the
+            # child does not inherit our terminal (unless you want that)
+            proc = subprocess.Popen(
+                cmd_parts,
+                cwd=self.cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                start_new_session=True,  # own process group, see stop()
+            )
+        except Exception as exc:
+            self._proc = None
+            self.state = "stopped"
+            logger.exception("Failed to start service '%s'", self.svc_id)
+            raise RuntimeError(f"Could not start service '{self.svc_id}': {exc}") from exc
+
+        self._proc = proc
+        self.state = "running"
+        self._started_at = time.monotonic()
+        self._starts.append(self._started_at)
+
+        # Output is read, kept and logged by the shared multiplexer thread
+        output_mux.attach(self.svc_id, proc.stdout, proc.stderr, max_lines=self.output_lines)
+        supervisor.register_service(self)
+        supervisor.watch(proc, lambda returncode: self._on_exit(proc, returncode))
+
+    def _on_exit(self, proc: subprocess.Popen, returncode: int) -> None:
+        """Supervisor callback: the process exited, decide whether to restart it."""
+        with self._lock:
+            if proc is not self._proc:
+                return  # stopped on purpose, stop() has dealt with it
+            # Anything left in the group lost its parent and may still hold an SDR
+            signal_group(proc, signal.SIGKILL)
+            self._proc = None
+            self._exited(returncode, self._exit_reason(returncode))
+        self._notify()
 
-            try:
-                # Use stdout/stderr = subprocess.PIPE so that the
-                # child does not inherit our terminal (unless you want that)
-                self._proc = subprocess.Popen(
-                    cmd_parts,
-                    cwd=self.cwd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    bufsize=1,   # line buffered
-                )
-            except Exception as exc:
-                self._proc = None
-                logger.exception("Failed to start service '%s'", self.svc_id)
-                raise RuntimeError(f"Could not start service '{self.svc_id}': {exc}") from exc
-
-            # Optionally: spawn a thread that logs the output.
-            threading.Thread(
-                target=self._log_process_output,
-                name=f"{self.svc_id}-stdout-logger",
-                daemon=True,
-            ).start()
-
-    def _log_process_output(self) -> None:
-        """
-        Read from the process' stdout and stderr and log them.
-        Runs in a daemon thread so it doesn't block program exit.
-        """
-        if not self._proc:
+    @staticmethod
+    def _exit_reason(returncode: int) -> str:
+        if returncode < 0:
+            return f"killed by {signal.Signals(-returncode).name}"
+        return f"exit code {returncode}"
+
+    def _exited(self, returncode: int, reason: str) -> None:
+        """Apply the restart policy after an unplanned exit.  Caller holds ``_lock``."""
+        self.last_exit = returncode
+        wanted = self.restart == "always" or (self.restart == "on-failure" and returncode != 0)
+        if not wanted:
+            logger.warning("Service '%s' exited (%s)", self.svc_id, reason)
+            self.state = "stopped"
+            supervisor.unregister_service(self)
+        else:
+            self._schedule_restart(reason)
+
+    def _schedule_restart(self, reason: str) -> None:
+        """Queue a restart after the backoff delay, or give up.  Caller holds ``_lock``."""
+        now = time.monotonic()
+        if self._started_at and now - self._started_at >= self.STABLE_AFTER:
+            self._delay = self.restart_delay
+        while self._starts and now - self._starts[0] > self.start_interval:
+            self._starts.popleft()
+
+        if len(self._starts) >= self.start_limit:
+            logger.error("Service '%s' exited (%s) and was started %d times in %ss; giving up",
+                         self.svc_id, reason, len(self._starts), int(self.start_interval))
+            self.state = "failed"
+            supervisor.unregister_service(self)
             return
 
-        def _log_pipe(pipe, level):
-            for line in iter(pipe.readline, ""):
-                logger.log(level, "[%s] %s", self.svc_id, line.rstrip())
+        delay = self._delay
+        self._delay = min(self._delay * 2, self.restart_max_delay)
+        logger.warning("Service '%s' exited (%s), restarting in %ss", self.svc_id, reason, delay)
+        self.state = "restarting"
+        self._restart_handle = supervisor.call_later(delay, self._restart)
 
-        if self._proc.stdout:
-            threading.Thread(target=_log_pipe,
-                             args=(self._proc.stdout, logging.INFO),
-                             daemon=True).start()
-        if self._proc.stderr:
-            threading.Thread(target=_log_pipe,
-                             args=(self._proc.stderr, logging.ERROR),
-                             daemon=True).start()
+    def _restart(self) -> None:
+        with self._lock:
+            if self.state != "restarting":
+                return
+            self._restart_handle = None
+            try:
+                self._spawn()
+            except RuntimeError:
+                self._schedule_restart("could not start")
+        self._notify()
 
     def stop(self, timeout: Optional[float] = 5.0) -> None:
         """
-        Terminate the process gracefully.  If it does not exit within *timeout*
-        seconds, it is killed.
+        Terminate the process group gracefully.  If the process does not exit
+        within *timeout* seconds, the group is killed.  A pending automatic
+        restart is cancelled.
 
         Parameters
         ----------
@@ -309,21 +274,31 @@ class CliService:
             If None, the call blocks indefinitely until the process exits.
         """
         with self._lock:
-            if self._proc is None:
+            supervisor.cancel(self._restart_handle)
+            self._restart_handle = None
+            proc = self._proc
+            self._proc = None
+            if proc is None:
+                if self.state in ("restarting", "failed"):
+                    self.state = "stopped"
+                    supervisor.unregister_service(self)
+                    return
                 raise RuntimeError(f"Service '{self.svc_id}' is not running")
+            self.state = "stopped"
 
-            logger.info("Stopping service '%s'", self.svc_id)
+        logger.info("Stopping service '%s'", self.svc_id)
+        try:
+            signal_group(proc, signal.SIGTERM)
             try:
-                self._proc.terminate()   # sends SIGTERM
-                try:
-                    self._proc.wait(timeout=timeout)
-                except subprocess.TimeoutExpired:
-                    logger.warning("Service '%s' did not terminate in %s sec – killing", self.svc_id, timeout)
-                    self._proc.kill()
-                    self._proc.wait()
-            finally:
-                self._proc = None
-                logger.info("Service '%s' stopped", self.svc_id)
+                proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                logger.warning("Service '%s' did not terminate in %s sec – killing", self.svc_id, timeout)
+                signal_group(proc, signal.SIGKILL)
+                proc.wait()
+        finally:
+            signal_group(proc, signal.SIGKILL)  # stragglers that ignored SIGTERM
+            supervisor.unregister_service(self)
+            logger.info("Service '%s' stopped", self.svc_id)
 
     def is_running(self) -> bool:
         """
@@ -334,6 +309,24 @@ class CliService:
                 return False
             return self._proc.poll() is None
 
+    def tail(self, lines: int = 100, since: int = 0):
+        """
+        Most recent output of the service.
+
+        Parameters
+        ----------
+        lines : int
+            Maximum number of lines to return.
+        since : int
+            Only return lines with a sequence number above this.
+
+        Returns
+        -------
+        tuple
+            ``(lines, last_seq)`` where *lines* is a list of ``OutputLine``.
+        """
+        return output_mux.tail(self.svc_id, lines, since)
+
     # Representation helpers
     def __repr__(self) -> str:
         status = "RUNNING" if self.is_running() else "STOPPED"
@@ -342,126 +335,144 @@ class CliService:
     def __str__(self) -> str:
         return f"{self.svc_id} ({self.description}) - {self.type} - {self.cmd_line}"
 
-class DockerService:
-    """
-    Manage Services that are hosted in Docker
-    """
-
-    def __init__(self):
-        self.docker_client = docker.DockerClient(base_url='unix://var/run/docker.sock')
-
-    def start_service(self, container_name: str) -> None:
-        """Start the container with the given name."""
-        status = None
-
-        try:
-            container = self.docker_client.containers.get(container_name)
-
-            status = container.start()
-        except docker.errors.NotFound:
-            logger.error("Container %s not found", container_name)
-            status = False
-
-        return status
-
-    def stop_service(self, container_name: str) -> None:
-        """Stop the container."""
-        status = None
-
-        try:
-            container = self.docker_client.containers.get(container_name)
-            status = container.stop()
-        except docker.errors.NotFound:
-            logger.error("Container %s not found", container_name)
-            status = False
-
-        return status
-
-    def restart_service(self, container_name: str) -> None:
-        """Restart the container."""
-
-        status = None
-
-        try:
-            container = self.docker_client.containers.get(container_name)
-            status = container.restart()
-        except docker.errors.NotFound:
-            logger.error("Container %s not found", container_name)
-            status = False
-
-        return status
-
-    def status_service(self, container_name: str) -> None:
-        """Print a concise status summary of the container."""
-        status = None
-
-        try:
-            container = self.docker_client.containers.get(container_name)
-
-            container_state = container.attrs['State']
-
-            status = container_state['Status']
-        except docker.errors.NotFound:
-            logger.error("Container %s not found", container_name)
-            status = False
-
-        return status
-
 class KismetStatus:
     '''
         Get Status from Kismet for Datasources
+
+        Keeps one authenticated HTTP session for the life of the object: the
+        ``KISMET`` session cookie is reused and only re-issued when Kismet
+        answers 401.  Datasource queries ask for just the fields used here
+        through Kismet's field simplification, and failures back off
+        exponentially instead of hammering a Kismet that is down.
     '''
 
-    def __init__(self, username, password) -> None:
+    DEFAULT_URL = "http://localhost:2501"
+    TIMEOUT = 5
+    _BACKOFF_MIN = 5
+    _BACKOFF_MAX = 300
+
+    _FIELDS = [
+        'kismet.datasource.capture_interface',
+        'kismet.datasource.running',
+        'kismet.datasource.type_driver/kismet.datasource.driver.type',
+        'kismet.datasource.uuid',
+    ]
+
+    def __init__(self, username, password, base_url=None) -> None:
         '''
-            Initialize the class.
+            Initialize the class.  No request is made until the first refresh.
             :param username: The username to use when connecting to Kismet
             :param password: The password to use when connecting to Kismet
+            :param base_url: Kismet REST endpoint, defaults to DEFAULT_URL
         '''
         self.datasources = {}
-        self.kismet_datasources = None
         self.username = username
         self.password = password
+        self.base_url = (base_url or self.DEFAULT_URL).rstrip('/')
+        self._by_sdr_id = {}
+        self._session = requests.Session()
+        self._logged_in = False
+        self._failures = 0
+        self._retry_at = 0.0
+
+    def login(self):
+        """
+        Authenticate with basic auth and keep the session cookie Kismet sets.
 
+        :raises RuntimeError: if Kismet rejects the credentials or is unreachable.
+        """
         try:
-            self.kismet_datasources = kismet_rest.Datasources(username=self.username, password=self.password)
-            self.kismet_datasources.login()
-            self.get_active_datasources()
-
-        except kismet_rest.exceptions.KismetLoginException:
+            response = self._session.get(f"{self.base_url}/session/check_session",
+                                         auth=(self.username, self.password), timeout=self.TIMEOUT)
+        except requests.RequestException as e:
+            raise RuntimeError(f"Kismet unreachable: {e}") from e
+        if response.status_code != 200:
             logger.critical("Kismet login failed")
+            raise RuntimeError(f"Kismet login failed: HTTP {response.status_code}")
+        self._logged_in = True
+
+    def _post_fields(self, path):
+        """POST a field-simplification request, logging in again once on 401."""
+        for attempt in range(2):
+            if not self._logged_in:
+                self.login()
+            try:
+                response = self._session.post(f"{self.base_url}{path}",
+                                              data={'json': json.dumps({'fields': self._FIELDS})},
+                                              timeout=self.TIMEOUT)
+            except requests.RequestException as e:
+                raise RuntimeError(f"Kismet unreachable: {e}") from e
+            if response.status_code == 401 and attempt == 0:
+                logger.info("Kismet session expired, logging in again")
+                self._session.cookies.clear()
+                self._logged_in = False
+                continue
+            if response.status_code != 200:
+                raise RuntimeError(f"Kismet {path} failed: HTTP {response.status_code}")
+            return response.json()
+        raise RuntimeError("Kismet login failed")
 
     def get_active_datasources(self):
-        """Get the list of available data sources."""
+        """
+        Refresh the datasource table.  While backing off after a failure the
+        previous table is kept and no request is made.
 
-        for source in self.kismet_datasources.all():
-            data_type = ""
+        :return: True if the table was refreshed.
+        """
+        if time.monotonic() < self._retry_at:
+            return False
 
-            name = source['kismet.datasource.capture_interface']
+        try:
+            sources = self._post_fields('/datasource/all_sources.json')
+        except (RuntimeError, ValueError) as e:
+            self._failures += 1
+            delay = min(self._BACKOFF_MIN * 2 ** (self._failures - 1), self._BACKOFF_MAX)
+            self._retry_at = time.monotonic() + delay
+            logger.warning("Kismet datasource refresh failed (%s), retrying in %ss", e, delay)
+            return False
+
+        self._failures = 0
+        self._retry_at = 0.0
+        datasources = {}
+        by_sdr_id = {}
+        for source in sources:
+            data_type = ""
+            name = source.get('kismet.datasource.capture_interface', '')
             sdr_id = -1
 
             if name.startswith('rtl'):
-                data_type, sdr_id = name.split('-')
+                data_type, _, index = name.partition('-')
+                if index.isdigit():
+                    sdr_id = int(index)
 
-            self.datasources[name] = {
-                'is_running' : bool(source['kismet.datasource.running']),
+            info = {
+                'is_running' : bool(source.get('kismet.datasource.running')),
                 'data_type': data_type,
-                'driver_info': source['kismet.datasource.type_driver'],
-                'sdr_id' : int(sdr_id),
-                'uuid' : source['kismet.datasource.uuid'],
+                'driver_info': source.get('kismet.datasource.driver.type', ''),
+                'sdr_id' : sdr_id,
+                'uuid' : source.get('kismet.datasource.uuid', ''),
             }
+            datasources[name] = info
+            if sdr_id >= 0:
+                by_sdr_id.setdefault(sdr_id, info)
 
-    def lookup_by_sdr_id(self, sdr_id):
-        """Look up a datasource by its ID."""
+        self.datasources = datasources
+        self._by_sdr_id = by_sdr_id
+        return True
 
-        ret_val = None
+    def clear(self):
+        """Forget the datasource table, e.g. when Kismet is stopped.  The session is kept."""
+        self.datasources = {}
+        self._by_sdr_id = {}
 
-        for _, info in self.datasources.items():
-            if info['sdr_id'] == sdr_id:
-                ret_val = info['data_type']
-                break
+    def close(self):
+        """Close the HTTP session."""
+        self._session.close()
 
-        return ret_val
+    def lookup_by_sdr_id(self, sdr_id):
+        """Look up a datasource by its ID."""
+        info = self._by_sdr_id.get(sdr_id)
+        return info['data_type'] if info else None
 
 if __name__ == "__main__":
     pass
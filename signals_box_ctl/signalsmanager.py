@@ -6,29 +6,60 @@ This module contains the main class for managing services.
 import logging
 import threading
 import time
-import yaml
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Any, Mapping, NamedTuple, Tuple
 from services import (
-    SystemdServiceManager,
     CliService,
-    DockerService,
-
     KismetStatus,
-    _kismet_rest_available,
+    _kismet_available,
 )
-from usbs import UsbDevices
+from backends import BackendRegistry, BackendUnavailable
+from usbs import UsbDevices, UsbHotplugWatcher
+from sdrregistry import SdrRegistry
+from eventstream import EventBroker
+from outputmux import output_mux
+from pipeline import PipelineService
+from gpsclient import GpsdClient, GpsFixHistory
+from gpstrack import TrackRecorder
+from servicedefs import ServiceState, compile_services
+from configwatch import ConfigWatcher, YamlFileCache
+from profiles import compile_profiles, run_graph, find_cycle
+from sdralloc import SdrConflict, SdrRequest, allocate, parse_bands
+from jobs import JobQueue
 
 
+logger = logging.getLogger(__name__)
 
-_gpsd_available = False
-try:
-    import gpsd
-    _gpsd_available = True
-except ImportError:
-    pass  # GPS integration disabled; get_gps_status() will return 'unavailable'
+# Service types whose processes are run by this app
+_PROCESS_TYPES = ('cli', 'pipeline')
 
+# Statuses in which a service keeps its SDRs open
+_SDR_HOLDING = ('running', 'restarting')
 
+# Statuses a starting service falls to when its start failed
+_SDR_START_FAILED = ('stopped', 'unavailable')
+
+_GPS_UNAVAILABLE = MappingProxyType({
+    'state': 'unavailable', 'lat': None, 'lon': None, 'mode': None, 'alt': None,
+    'speed': None, 'sats': None, 'sats_used': None, 'hdop': None, 'fix_time': None,
+})
+
+
+class StateSnapshot(NamedTuple):
+    """
+    Immutable view of the state shown by the UI and API, published by the
+    background collector.  ``versions`` holds the state versions the
+    snapshot was built from, so ETags always match the body they describe.
+    """
+    taken: float
+    versions: Mapping[str, int]
+    services: Mapping[str, str]
+    health: Mapping[str, str]  # service_id -> container health, only for services reporting one
+    sdrs: Tuple[Any, ...]
+    gps: Mapping[str, Any]
 
-logger = logging.getLogger(__name__)
 
 class SignalsManager:
     """
@@ -39,113 +70,432 @@ class SignalsManager:
     """
 
     _CACHE_TTL = 10  # seconds
+    _STATUS_TIMEOUT = 3  # seconds allowed for each backend status query
+    _STATUS_WORKERS = 8
+    _ACTION_WORKERS = 8  # service starts/stops run in parallel during a profile change
+    _JOB_WORKERS = 4     # queued start/stop/profile jobs running at once
+    _SDR_START_TIMEOUT = 60  # seconds a starting service's SDRs stay reserved without it showing as running
+    # Default seconds between background refreshes, overridable via `collector:` in config.yml
+    _COLLECT_INTERVALS = {
+        'systemd': 5,
+        'docker': 5,
+        'cli': 2,
+        'usb': 10,
+        'kismet': 15,
+        'gps': 5,
+    }
+
+    _GPSD_DEFAULTS = {'host': '127.0.0.1', 'port': 2947, 'history': 3600}
+    _GPS_TRACK_DEFAULTS = {
+        'enabled': False,
+        'directory': 'track',
+        'min_interval': 1.0,
+        'flush_interval': 5.0,
+        'fsync_interval': 60.0,
+        'max_gap': 30.0,
+    }
 
     def __init__(self, config_file="config.yml", creds_file="creds.yml"):
-        if not _gpsd_available:
-            logger.warning("gpsd not installed – GPS integration disabled")
         self.config_file = config_file
         self.creds_file = creds_file
-        self.sdr_data = None
-        self._sdr_cache = None
-        self._sdr_cache_ts = 0.0
+        self.sdr_registry = SdrRegistry()
+        self._usb_cache = None
+        self._usb_cache_ts = 0.0
+        self.rtl_index_map = {}
+        self._hotplug = None
         self._sdr_lock = threading.Lock()
         self._gps_cache = None
-        self._gps_cache_ts = 0.0
+        self._gps_client = None
+        self._gps_track = None
+        self._gps_track_config = None
         self._kismet_mgr = None
+        self._systemd_units = frozenset()
+        # Clients for systemd and docker services, imported and connected on first use
+        self.backends = BackendRegistry()
+        self.backends.register('systemd', 'systemdservice', 'SystemdServiceManager',
+                               setup=lambda mgr: mgr.subscribe(self._systemd_units))
+        self.backends.register('docker', 'dockerservice', 'DockerService')
+        self.services = {}
+        self.service_state = {}
+        self.creds = {}
+        self.sdr_ids = None
+        self.sdr_model_bands = {}
+        self._alloc_lock = threading.Lock()
+        self._sdr_starting = {}  # service_id -> (serials, monotonic deadline) reserved while it starts
+        self._config_lock = threading.RLock()
+        self._yaml_cache = YamlFileCache()
+        self._config_digests = None
+        self._config_watcher = None
+        self._status_pool = ThreadPoolExecutor(max_workers=self._STATUS_WORKERS,
+                                               thread_name_prefix="status")
+        self._status_inflight = {}
+        self._action_pool = ThreadPoolExecutor(max_workers=self._ACTION_WORKERS,
+                                               thread_name_prefix="action")
+        self.profiles = {}
+        self.profile_reports = {}
+        self.active_profile = None
+        self._profile_lock = threading.Lock()
+        self._service_locks = {}
+        self._service_locks_guard = threading.Lock()
+        self.jobs = JobQueue(self._JOB_WORKERS, on_change=self._on_job_change)
+        self._status_lock = threading.Lock()
+        self._versions = {}
+        self._version_lock = threading.Lock()
+        self._sdr_signature = None
+        self._sdr_device_set = None
+        self._sdr_states = {}
+        self.events = EventBroker()
+        self._epoch = f"{int(time.time()):x}"
+        self.snapshot = None
+        self._snapshot_lock = threading.Lock()
+        self._collect_wake = {subsystem: threading.Event() for subsystem in self._COLLECT_INTERVALS}
         self.load_config()
+        self.start_collector()
+        self.start_config_watcher()
 
     def load_config(self):
         """
-        Load configuration from file and store in class variables
+        Load configuration from file and store in class variables.
+
+        Both files go through a parse cache, so a reload with nothing
+        changed returns straight away.  Otherwise the new service
+        definitions are diffed against the current ones: unchanged services
+        keep their runtime state (status, selected SDR, running process),
+        and only cli/pipeline services whose command or SDR settings changed
+        are restarted.  Backend clients are kept unless their own settings
+        changed.  Reloads are serialized, and readers see either the old or
+        the new service set, never a mix.
 
         :param self: Description
+        :return: True once the configuration is applied
         """
+        with self._config_lock:
+            return self._load_config()
 
-        logger.debug("Loading Config file: %s", self.config_file)
-        self._kismet_mgr = None
-
-        # Stop any running CLI services before replacing the config dict so
-        # their processes are not orphaned when self.services is reassigned.
-        if hasattr(self, 'services'):
-            for svc_id, svc in self.services.items():
-
-                if svc.get('type') == 'cli' and 'cli_status_obj' in svc:
-                    try:
-                        if svc['cli_status_obj'].is_running():
-                            logger.info("Stopping CLI service '%s' before config reload", svc_id)
-                            svc['cli_status_obj'].stop()
-                    except Exception:
-                        logger.warning("Failed to stop CLI service '%s' during config reload", svc_id)
-
+    def _load_config(self):
         logger.debug("Loading config file: %s", self.config_file)
-
         try:
-            with open(self.config_file, "r", encoding="utf-8") as file_handle:
-                cfg = yaml.safe_load(file_handle)
-                self.services = cfg['services']
-                self.http_base_url = cfg.get('http_base_url', '')
-                self.links = cfg.get('links', [])
-                self.buttons = cfg.get('buttons', {})
-                self.sdr_ids = {
-                    (int(e['vid'], 16), int(e['pid'], 16)): e['name']
-                    for e in cfg.get('sdr_ids', [])
-                }
-
-                if not self.http_base_url:
-                    logger.warning("Config missing 'http_base_url'; defaulting to empty string")
-                if not self.links:
-                    logger.warning("Config missing 'links'; no links will be shown")
-                if not self.buttons:
-                    logger.warning("Config missing 'buttons'; no buttons will be shown")
-
-                self.systemd_svc_mgr = SystemdServiceManager()
-                self.docker_svc_mgr = DockerService()
+            cfg, cfg_digest = self._yaml_cache.load(self.config_file)
         except FileNotFoundError:
             logger.critical("Config file not found: %s", self.config_file)
             raise
-        except (KeyError, TypeError) as e:
-            logger.critical("Invalid config file %s: missing key %s", self.config_file, e)
-            raise
-
-        # Validate required service fields; remove invalid entries rather than crashing
-        invalid_services = []
-        for svc_id, svc in self.services.items():
-            svc_type = svc.get('type')
-            if not svc_type:
-                logger.error("Service '%s' missing required field 'type'; skipping", svc_id)
-                invalid_services.append(svc_id)
-                continue
-            if 'description' not in svc:
-                logger.error("Service '%s' missing required field 'description'; skipping", svc_id)
-                invalid_services.append(svc_id)
-                continue
-            if svc_type == 'systemd' and 'system_ctl_name' not in svc:
-                logger.error("Service '%s' (systemd) missing required field 'system_ctl_name'; skipping", svc_id)
-                invalid_services.append(svc_id)
-            elif svc_type == 'docker' and 'container_name' not in svc:
-                logger.error("Service '%s' (docker) missing required field 'container_name'; skipping", svc_id)
-                invalid_services.append(svc_id)
-        for svc_id in invalid_services:
-            del self.services[svc_id]
-
-        # init Service values
-        for svc in self.services:
-            if not 'current_status' in self.services[svc]:
-                self.services[svc]['current_status'] = None
-
-            if not 'selected_sdr' in self.services[svc]:
-                self.services[svc]['selected_sdr'] = self.services[svc].get('default_sdr', None)
 
         logger.debug("Loading Credentials file: %s", self.creds_file)
         try:
-            with open(self.creds_file, "r", encoding="utf-8") as credfile_handle:
-                self.creds = yaml.safe_load(credfile_handle)
+            creds, creds_digest = self._yaml_cache.load(self.creds_file)
+            creds = creds or {}
         except FileNotFoundError:
             logger.critical("Credentials file not found: %s", self.creds_file)
             raise
 
+        if (cfg_digest, creds_digest) == self._config_digests:
+            logger.debug("Config files unchanged; nothing to reload")
+            return True
+
+        try:
+            services = compile_services(cfg['services'])
+            profiles = compile_profiles(cfg.get('profiles'), services)
+            http_base_url = cfg.get('http_base_url', '')
+            links = cfg.get('links', [])
+            buttons = cfg.get('buttons', {})
+            event_stream_port = int(cfg.get('event_stream_port', 8082))
+            collect_intervals = dict(self._COLLECT_INTERVALS, **(cfg.get('collector') or {}))
+            gpsd_config = dict(self._GPSD_DEFAULTS, **(cfg.get('gpsd') or {}))
+            gps_track_config = dict(self._GPS_TRACK_DEFAULTS, **(cfg.get('gps_track') or {}))
+            sdr_ids = {
+                (int(e['vid'], 16), int(e['pid'], 16)): e['name']
+                for e in cfg.get('sdr_ids', [])
+            }
+            sdr_model_bands = {}
+            for entry in cfg.get('sdr_ids', []):
+                if 'freq_range' in entry:
+                    try:
+                        sdr_model_bands[entry['name']] = parse_bands(entry['freq_range'])
+                    except ValueError as e:
+                        logger.error("sdr_ids entry '%s' has an invalid freq_range: %s", entry['name'], e)
+        except (KeyError, TypeError, AttributeError) as e:
+            logger.critical("Invalid config file %s: missing key %s", self.config_file, e)
+            raise
+
+        if not http_base_url:
+            logger.warning("Config missing 'http_base_url'; defaulting to empty string")
+        if not links:
+            logger.warning("Config missing 'links'; no links will be shown")
+        if not buttons:
+            logger.warning("Config missing 'buttons'; no buttons will be shown")
+
+        models = set(sdr_ids.values())
+        for svc in services.values():
+            for model in svc.sdr_models:
+                if model not in models:
+                    logger.warning("Service '%s' accepts SDR model '%s', which is not in sdr_ids", svc.id, model)
+
+        restart = self._apply_services(services)
+        self.profiles = profiles
+        self.sdr_model_bands = sdr_model_bands
+        if self.active_profile not in profiles:
+            self.active_profile = None
+
+        self.http_base_url = http_base_url
+        self.links = links
+        self.buttons = buttons
+        self.event_stream_port = event_stream_port
+        self.collect_intervals = collect_intervals
+        self.gpsd_config = gpsd_config
+        self.gps_track_config = gps_track_config
+
+        # Backend clients live across reloads; only the watched unit set is updated
+        systemd_units = frozenset(svc.system_ctl_name for svc in self.services.values()
+                                  if svc.type == 'systemd')
+        if systemd_units != self._systemd_units:
+            self._systemd_units = systemd_units
+            systemd_mgr = self.backends.peek('systemd')
+            if systemd_mgr is not None:
+                systemd_mgr.subscribe(systemd_units)
+
+        if creds.get('kismet') != self.creds.get('kismet') and self._kismet_mgr is not None:
+            self._kismet_mgr.close()
+            self._kismet_mgr = None
+        self.creds = creds
+
+        # (Re)start the hotplug watcher only if it has to filter on new sdr_ids
+        if self._hotplug is None or sdr_ids != self.sdr_ids:
+            self.sdr_ids = sdr_ids
+            if self._hotplug is not None:
+                self._hotplug.close()
+            self._hotplug = UsbHotplugWatcher(self.sdr_ids, self._on_usb_hotplug)
+            self._hotplug.start()
+            with self._sdr_lock:
+                self._usb_cache = None
+
+        gps_client = self._gps_client
+        if gps_client is None or (gps_client.host, gps_client.port, gps_client.history.capacity) != \
+                (self.gpsd_config['host'], int(self.gpsd_config['port']), int(self.gpsd_config['history'])):
+            if gps_client is not None:
+                gps_client.close()
+            self._gps_client = GpsdClient(self.gpsd_config['host'], int(self.gpsd_config['port']),
+                                          history=int(self.gpsd_config['history']))
+            self._gps_client.start()
+
+        if self.gps_track_config != self._gps_track_config:
+            if self._gps_track is not None:
+                self._gps_track.close()
+                self._gps_track = None
+            if self.gps_track_config['enabled']:
+                track_cfg = self.gps_track_config
+                self._gps_track = TrackRecorder(track_cfg['directory'],
+                    min_interval=float(track_cfg['min_interval']),
+                    flush_interval=float(track_cfg['flush_interval']),
+                    fsync_interval=float(track_cfg['fsync_interval']),
+                    max_gap=float(track_cfg['max_gap']))
+                try:
+                    self._gps_track.start()
+                except OSError as e:
+                    logger.error("GPS track recording disabled, cannot use %s: %s", track_cfg['directory'], e)
+                    self._gps_track = None
+            self._gps_track_config = self.gps_track_config
+        self._gps_client.on_fix = self._gps_track.record if self._gps_track is not None else None
+
+        for svc_id in restart:
+            logger.info("Restarting service '%s' with its new configuration", svc_id)
+            try:
+                self._cli_service(svc_id).start(self.get_sdr_args(svc_id))
+            except (RuntimeError, OSError, ValueError) as e:
+                logger.error("Failed to restart service '%s' after config reload: %s", svc_id, e)
+
+        self._config_digests = (cfg_digest, creds_digest)
+        self._bump_version('config')
+        self._publish_snapshot()
+        for subsystem in self._collect_wake:
+            self.request_refresh(subsystem)
         return True
 
+    def _apply_services(self, services):
+        """
+        Swap in new service definitions, carrying runtime state over from
+        the current ones.  Processes of removed services, and of process
+        services whose definition changed beyond ``ServiceDef.COSMETIC``,
+        are stopped here.
+
+        :param services: dict of service_id -> ServiceDef from compile_services()
+        :return: ids of services that were running and must be started again
+        """
+        old_services = self.services
+        restart = []
+
+        for svc_id, svc in services.items():
+            old = old_services.get(svc_id)
+            if old is None:
+                self.service_state[svc_id] = ServiceState(selected_sdr=svc.default_sdr)
+                continue
+            if old == svc:
+                services[svc_id] = old
+                continue
+
+            changed = svc.changed_fields(old)
+            logger.info("Service '%s' changed: %s", svc_id, ', '.join(sorted(changed)))
+            self._bump_version(f"service:{svc_id}")
+            state = self.service_state[svc_id]
+            if changed & svc.SDR_FIELDS:
+                state.selected_sdr = svc.default_sdr
+                state.auto_sdr = False
+
+            process = state.process
+            if process is None:
+                continue
+            if changed <= svc.COSMETIC and svc.type == old.type:
+                process.description = svc.description
+                continue
+            state.process = None
+            if process.state != 'stopped':
+                if process.state in ('running', 'restarting') and svc.PROCESS:
+                    restart.append(svc_id)
+                logger.info("Stopping service '%s' to apply its new configuration", svc_id)
+                self._stop_process(svc_id, process)
+
+        removed = [svc_id for svc_id in old_services if svc_id not in services]
+        self.services = services
+        for svc_id in removed:
+            # The state entry stays so readers still holding the old service set don't fail
+            state = self.service_state[svc_id]
+            process, state.process = state.process, None
+            if process is not None and process.state != 'stopped':
+                logger.info("Stopping service '%s', removed from config", svc_id)
+                self._stop_process(svc_id, process)
+            output_mux.unregister(svc_id)
+        return restart
+
+    @staticmethod
+    def _stop_process(svc_id, process):
+        try:
+            process.stop()
+        except Exception:
+            logger.warning("Failed to stop CLI service '%s' during config reload", svc_id)
+
+    def start_config_watcher(self):
+        """Reload automatically whenever config.yml or creds.yml is changed on disk."""
+        self._config_watcher = ConfigWatcher([self.config_file, self.creds_file], self._on_config_change)
+        self._config_watcher.start()
+
+    def _on_config_change(self, _paths):
+        """Watcher callback: apply the edited files, keeping the old config if they are broken."""
+        try:
+            self.load_config()
+        except Exception as e:
+            logger.error("Not applying changed config, keeping the current one: %s", e)
+
+    ### Background collector
+    def start_collector(self):
+        """
+        Start one refresh thread per subsystem.  Each runs on its own interval
+        from `collector:` in config.yml, so a hung backend only delays its own
+        subsystem, and publishes a new snapshot whenever state changed.
+        """
+        refreshers = {
+            'systemd': lambda: self.refresh_services(service_type='systemd'),
+            'docker': lambda: self.refresh_services(service_type='docker'),
+            'cli': lambda: self.refresh_services(service_type=_PROCESS_TYPES),
+            'usb': self.refresh_sdrs,
+            'kismet': self.refresh_kismet,
+            'gps': self.refresh_gps,
+        }
+        for subsystem, refresh in refreshers.items():
+            threading.Thread(target=self._collect_loop, args=(subsystem, refresh),
+                             name=f"collect-{subsystem}", daemon=True).start()
+
+    def _collect_loop(self, subsystem, refresh):
+        wake = self._collect_wake[subsystem]
+        while True:
+            try:
+                refresh()
+            except Exception:
+                logger.exception("Background refresh of %s failed", subsystem)
+            self._publish_snapshot()
+
+            wake.wait(self.collect_intervals.get(subsystem, self._COLLECT_INTERVALS[subsystem]))
+            wake.clear()
+
+    def request_refresh(self, subsystem):
+        """Wake one collector thread for an immediate refresh."""
+        self._collect_wake[subsystem].set()
+
+    def _publish_snapshot(self):
+        """Build and swap in a new snapshot if any state version moved."""
+        with self._snapshot_lock:
+            with self._version_lock:
+                versions = dict(self._versions)
+            if self.snapshot is not None and self.snapshot.versions == versions:
+                return
+
+            self.snapshot = StateSnapshot(
+                taken=time.time(),
+                versions=MappingProxyType(versions),
+                services=MappingProxyType({
+                    service_id: self.service_state[service_id].status or 'unknown'
+                    for service_id in self.services
+                }),
+                health=MappingProxyType({
+                    service_id: self.service_state[service_id].health
+                    for service_id in self.services if self.service_state[service_id].health
+                }),
+                sdrs=tuple(device.freeze() for device in self.sdr_registry.devices()),
+                gps=MappingProxyType(dict(self._gps_cache)) if self._gps_cache else _GPS_UNAVAILABLE,
+            )
+
+    ### State versions
+    def _bump_version(self, *keys):
+        """Increment the state version of each resource key."""
+        with self._version_lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def get_version(self, key):
+        """Current state version of a resource key (0 if never changed)."""
+        return self._versions.get(key, 0)
+
+    def state_etag(self, *keys, snapshot=None):
+        """
+        Opaque ETag value for a resource made of the given state keys, taken
+        from *snapshot* (default: the latest one).  Includes the process epoch
+        and config generation so tags never repeat across restarts or reloads.
+
+        :param keys: resource keys such as 'services', 'service:<id>', 'sdrs', 'gps'
+        """
+        versions = (snapshot or self.snapshot).versions
+        parts = [self._epoch, str(versions.get('config', 0))]
+        parts.extend(str(versions.get(key, 0)) for key in keys)
+        return '-'.join(parts)
+
+    def _set_service_status(self, service_id, status, health=None):
+        """
+        Store a service's status and container health, bumping its version
+        when either changed.  Returns True if the status changed.
+        """
+        state = self.service_state.get(service_id)
+        if state is None or service_id not in self.services or \
+                (state.status == status and state.health == health):
+            return False
+
+        changed = state.status != status
+        state.status, state.health = status, health
+        if changed and (status in _SDR_HOLDING or status in _SDR_START_FAILED) and \
+                self._sdr_starting.pop(service_id, None) is not None:
+            logger.debug("Released SDR reservation of %s, now %s", service_id, status)
+        self._bump_version(f"service:{service_id}", 'services')
+        self._publish_service(service_id)
+        return changed
+
+    def _publish_service(self, service_id):
+        """Push a service status/selection delta to live subscribers."""
+        state = self.service_state[service_id]
+        selected = state.selected_sdr
+        self.events.publish('service', {
+            'id': service_id,
+            'status': state.status,
+            'health': state.health,
+            'selected_sdr': [selected] if isinstance(selected, str) else selected,
+        })
+
     def get_single_service_status(self, service_id):
         """
         Get the status of a single service
@@ -155,6 +505,7 @@ class SignalsManager:
         - stopped
         - stopping
         - unknown
+        - unavailable (the backend for the service type cannot be loaded)
 
         :param self: Description
         :param service_id: Description
@@ -162,28 +513,23 @@ class SignalsManager:
 
         status = "unknown"
         status_data = None
-        svc_type = self.services[service_id].get('type', '')
+        svc = self.services[service_id]
+        svc_type = svc.type
         logger.debug("Refreshing Service Status for service: %s using type %s", service_id, svc_type)
 
-        if svc_type == "systemd":
+        if svc_type in ("systemd", "docker"):
+            try:
+                backend = self.backends.get(svc_type)
+            except BackendUnavailable:
+                return "unavailable", None
 
-            status_data = self.systemd_svc_mgr.status_service(self.services[service_id]['system_ctl_name'])
+        if svc_type == "systemd":
 
-            if status_data:
-                active_state = status_data.get('ActiveState')
-                if active_state == 'active':
-                    status = 'running'
-                elif active_state == 'deactivating':
-                    status = "stopping"
-                elif active_state == 'inactive':
-                    status = "stopped"
-                else:
-                    status = "unknown"
-            else:
-                status = "unknown"
+            status_data = backend.status_service(svc.system_ctl_name)
+            status = self._systemd_status(status_data)
 
         elif svc_type == "docker":
-            status_data = self.docker_svc_mgr.status_service(self.services[service_id]['container_name'])
+            status_data = backend.status_service(svc.container_name)
 
             if status_data:
                 if status_data == 'running':
@@ -193,18 +539,201 @@ class SignalsManager:
             else:
                 status = 'unknown'
 
-        elif svc_type == "cli":
-
-            if not 'cli_status_obj' in self.services[service_id]:
-                self.services[service_id]['cli_status_obj'] = CliService(service_id, self.services[service_id])
+        elif svc.PROCESS:
 
-            if self.services[service_id]['cli_status_obj'].is_running():
+            cli_service = self._cli_service(service_id)
+            if cli_service.is_running():
                 status = 'running'
+            elif cli_service.state in ('restarting', 'failed'):
+                status = cli_service.state
             else:
                 status = "stopped"
 
         return status, status_data
 
+    def _container_health(self, service_id, status):
+        """Healthcheck result of a running docker service, from the backend's event cache."""
+        svc = self.services.get(service_id)
+        if svc is None or svc.type != 'docker' or status != 'running':
+            return None
+        try:
+            return self.backends.get('docker').health_service(svc.container_name)
+        except BackendUnavailable:
+            return None
+
+    @staticmethod
+    def _systemd_status(status_data):
+        """Map a systemd unit state dict onto the service status vocabulary."""
+        if not status_data:
+            return "unknown"
+
+        active_state = status_data.get('ActiveState')
+        if active_state == 'active':
+            return 'running'
+        if active_state == 'deactivating':
+            return "stopping"
+        if active_state == 'inactive':
+            return "stopped"
+        return "unknown"
+
+    def get_systemd_statuses(self, service_ids):
+        """
+        Get the status of several systemd services with one bulk D-Bus query.
+
+        :param service_ids: ids of services with type systemd
+        :return: dict of service_id -> status
+        """
+        try:
+            systemd_mgr = self.backends.get('systemd')
+        except BackendUnavailable:
+            return dict.fromkeys(service_ids, 'unavailable')
+        unit_names = {service_id: self.services[service_id].system_ctl_name for service_id in service_ids}
+        logger.debug("Refreshing %d systemd services in bulk", len(unit_names))
+        unit_states = systemd_mgr.status_services(unit_names.values())
+
+        return {service_id: self._systemd_status(unit_states.get(unit_name))
+                for service_id, unit_name in unit_names.items()}
+
+    def _single_status_entry(self, service_id):
+        """Status of one service as a dict, matching get_systemd_statuses()."""
+        status, _ = self.get_single_service_status(service_id)
+        return {service_id: status}
+
+    def get_all_service_statuses(self, timeout=None, service_ids=None):
+        """
+        Query the status of every service (or just *service_ids*) in parallel.
+
+        Each backend call runs on the status thread pool and the whole batch
+        waits at most *timeout* seconds, so the cost is that of the slowest
+        single query.  Services whose query did not finish in time (or whose
+        previous query is still stuck) are reported as ``unknown``.
+
+        :param timeout: seconds to wait for the batch, defaults to _STATUS_TIMEOUT
+        :param service_ids: services to query, defaults to all
+        :return: dict of service_id -> status
+        """
+
+        if timeout is None:
+            timeout = self._STATUS_TIMEOUT
+        if service_ids is None:
+            service_ids = list(self.services)
+
+        statuses = {}
+        futures = {}
+        with self._status_lock:
+            idle = []
+            for service_id in service_ids:
+                pending = self._status_inflight.get(service_id)
+                if pending is not None and not pending.done():
+                    # Don't pile more work onto a backend that is already hung
+                    logger.warning("Status query for %s still pending; reporting unknown", service_id)
+                    statuses[service_id] = 'unknown'
+                else:
+                    idle.append(service_id)
+
+            # More than one systemd unit is cheaper as a single bulk query
+            systemd_ids = [i for i in idle if self.services[i].type == 'systemd']
+            if len(systemd_ids) > 1:
+                future = self._status_pool.submit(self.get_systemd_statuses, systemd_ids)
+                futures[future] = systemd_ids
+                idle = [i for i in idle if i not in systemd_ids]
+
+            for service_id in idle:
+                future = self._status_pool.submit(self._single_status_entry, service_id)
+                futures[future] = [service_id]
+
+            for future, service_ids in futures.items():
+                for service_id in service_ids:
+                    self._status_inflight[service_id] = future
+
+        done, not_done = wait(futures, timeout=timeout)
+
+        for future in done:
+            try:
+                statuses.update(future.result())
+            except Exception as e:
+                logger.error("Status query for %s failed: %s", ', '.join(futures[future]), e)
+                statuses.update(dict.fromkeys(futures[future], 'unknown'))
+
+        for future in not_done:
+            logger.warning("Status query for %s timed out after %ss", ', '.join(futures[future]), timeout)
+            statuses.update(dict.fromkeys(futures[future], 'unknown'))
+
+        sdr_users_changed = False
+        for service_id, status in statuses.items():
+            health = self._container_health(service_id, status)
+            if self._set_service_status(service_id, status, health) and \
+                    self.services[service_id].require_sdr:
+                sdr_users_changed = True
+
+        if sdr_users_changed:
+            self.refresh_sdr_status()
+
+        return statuses
+
+    def refresh_services(self, service_type=None):
+        """
+        Collector entry point: re-query every service of *service_type*, a
+        type name or tuple of them (all services if None).
+        """
+        if isinstance(service_type, str):
+            service_type = (service_type,)
+        service_ids = [service_id for service_id, svc in self.services.items()
+                       if service_type is None or svc.type in service_type]
+        if service_ids:
+            self.get_all_service_statuses(service_ids=service_ids)
+
+    def refresh_service(self, service_id):
+        """Targeted refresh of one service after an action, published immediately."""
+        self.get_all_service_statuses(service_ids=[service_id])
+        self.refresh_sdr_status()
+        self._publish_snapshot()
+
+    def get_service_statuses(self):
+        """
+        Service statuses from the latest snapshot; never touches a backend.
+
+        :return: dict of service_id -> status
+        """
+        return dict(self.snapshot.services)
+
+    def _cli_service(self, service_id):
+        """The CliService (or PipelineService) of a cli or pipeline service, created on first use."""
+        state = self.service_state[service_id]
+        if state.process is None:
+            svc = self.services[service_id]
+            service_class = PipelineService if svc.type == 'pipeline' else CliService
+            state.process = service_class(service_id, svc.process_config(),
+                                          on_change=lambda: self.request_refresh('cli'))
+        return state.process
+
+    def get_pipeline_stats(self, service_id):
+        """
+        Flow counters of a pipeline service.
+
+        :param service_id: service to read
+        :return: dict from PipelineService.stats(), or None if not a pipeline
+        """
+        svc = self.services.get(service_id)
+        if svc is None or svc.type != 'pipeline':
+            return None
+        return self._cli_service(service_id).stats()
+
+    def get_service_output(self, service_id, lines=100, since=0):
+        """
+        Recent stdout/stderr of a cli or pipeline service.
+
+        :param service_id: service to read
+        :param lines: maximum number of lines
+        :param since: only lines with a sequence number above this
+        :return: (list of OutputLine, last sequence number), or None if the
+                 service's output is not captured
+        """
+        svc = self.services.get(service_id)
+        if svc is None or not svc.PROCESS:
+            return None
+        return output_mux.tail(service_id, lines, since)
+
     def start_service(self, service_id):
         """
         Start a service and return its status.
@@ -214,21 +743,40 @@ class SignalsManager:
         :param service_id: Description
         """
 
-        self._sdr_cache = None  # force fresh SDR status on next page render
-        svc_type = self.services[service_id].get('type', '')
-        logger.debug("Calling Start for service: %s using type %s", service_id, svc_type)
+        with self._service_lock(service_id):
+            return self._start_service(service_id)
 
-        if svc_type == "systemd":
-            self.systemd_svc_mgr.start_service(self.services[service_id]['system_ctl_name'])
-        elif svc_type == "docker":
-            self.docker_svc_mgr.start_service(self.services[service_id]['container_name'])
-        elif svc_type == 'cli':
-            if not 'cli_status_obj' in self.services[service_id]:
-                self.services[service_id]['cli_status_obj'] = CliService(service_id, self.services[service_id])
+    def _start_service(self, service_id):
+        svc = self.services[service_id]
+        logger.debug("Calling Start for service: %s using type %s", service_id, svc.type)
 
-            self.services[service_id]['cli_status_obj'].start()
+        # Pick (or check) its SDRs first and hold them until a status refresh
+        # shows the service running or failed, or _SDR_START_TIMEOUT passes
+        if svc.require_sdr and self.service_state[service_id].status not in _SDR_HOLDING:
+            with self._alloc_lock:
+                assignment = self._solve_sdrs([service_id])
+                self._apply_sdrs(assignment)
+                self._sdr_starting[service_id] = (assignment[service_id],
+                                                  time.monotonic() + self._SDR_START_TIMEOUT)
 
-        return self.get_single_service_status(service_id)
+        try:
+            if svc.type == "systemd":
+                self.backends.get('systemd').start_service(svc.system_ctl_name)
+            elif svc.type == "docker":
+                self.backends.get('docker').start_service(svc.container_name)
+            elif svc.PROCESS:
+                self._cli_service(service_id).start(self.get_sdr_args(service_id))
+        except Exception:
+            self._sdr_starting.pop(service_id, None)
+            raise
+
+        self.refresh_service(service_id)
+        status = self.service_state[service_id].status
+        # A service already 'stopped' whose start exited at once shows no status change
+        if (status in _SDR_HOLDING or status in _SDR_START_FAILED) and \
+                self._sdr_starting.pop(service_id, None) is not None:
+            logger.debug("Released SDR reservation of %s, now %s", service_id, status)
+        return status
 
 
     def stop_service(self, service_id):
@@ -240,51 +788,137 @@ class SignalsManager:
         :param service_id: Description
         """
 
-        self._sdr_cache = None  # force fresh SDR status on next page render
-        if service_id == 'kismet':
-            self._kismet_mgr = None
-        svc_type = self.services[service_id].get('type', '')
-        logger.debug("Calling Stop for service: %s using type %s", service_id, svc_type)
-
-        if svc_type == "systemd":
-            self.systemd_svc_mgr.stop_service(self.services[service_id]['system_ctl_name'])
-        elif svc_type == "docker":
-            self.docker_svc_mgr.stop_service(self.services[service_id]['container_name'])
-        elif svc_type == 'cli':
-            if not 'cli_status_obj' in self.services[service_id]:
+        with self._service_lock(service_id):
+            return self._stop_service(service_id)
+
+    def _stop_service(self, service_id):
+        if service_id == 'kismet' and self._kismet_mgr is not None:
+            self._kismet_mgr.clear()
+        self._sdr_starting.pop(service_id, None)
+        svc = self.services[service_id]
+        logger.debug("Calling Stop for service: %s using type %s", service_id, svc.type)
+
+        if svc.type == "systemd":
+            self.backends.get('systemd').stop_service(svc.system_ctl_name)
+        elif svc.type == "docker":
+            self.backends.get('docker').stop_service(svc.container_name)
+        elif svc.PROCESS:
+            process = self.service_state[service_id].process
+            if process is None:
                 logger.error("No cli service object found for %s", service_id)
             else:
-                self.services[service_id]['cli_status_obj'].stop()
+                process.stop()
 
-        return self.get_single_service_status(service_id)
+        self.refresh_service(service_id)
+        return self.service_state[service_id].status
 
     ### SDR
-    def get_all_sdrs(self):
+    def _on_usb_hotplug(self, action, vid_pid, devpath):
+        """Hotplug callback: drop the SDR caches so the next read re-enumerates."""
+        logger.debug("Invalidating SDR cache after %s of %04x:%04x (%s)",
+                     action, vid_pid[0], vid_pid[1], devpath)
+        with self._sdr_lock:
+            self._usb_cache = None
+        self.request_refresh('usb')
+
+    def _get_usb_devices(self, now):
+        """
+        Return the enumerated SDR devices.  While the hotplug watcher is
+        running the enumeration is kept until a device is added or removed,
+        otherwise it expires after _CACHE_TTL.  Caller must hold _sdr_lock.
         """
-        Gather list of all SDRs, using a short-lived cache to avoid
-        repeated USB enumeration and Kismet API calls on every page load.
+        hotplug_active = self._hotplug is not None and self._hotplug.active
+        if self._usb_cache is not None and \
+                (hotplug_active or (now - self._usb_cache_ts) < self._CACHE_TTL):
+            return self._usb_cache
+
+        logger.debug("Enumerating SDR USB devices")
+        usb_dev = UsbDevices(self.sdr_ids)
+        self._usb_cache = usb_dev.list_rtlsdr_devices()
+        self.rtl_index_map = usb_dev.serial_map
+        self.sdr_registry.load(self._usb_cache)
+        self._usb_cache_ts = now
+        return self._usb_cache
+
+    def get_sdr_args(self, service_id):
         """
+        Placeholder values describing the SDR selected for a service, for
+        command lines that need ``-d <sdr_index>`` or ``rtl=<sdr_serial>``.
+        With multiple SDRs selected the first one is used.
 
-        now = time.time()
-        if self._sdr_cache is not None and (now - self._sdr_cache_ts) < self._CACHE_TTL:
-            logger.debug("Returning cached SDR list")
-            return self._sdr_cache
+        :param service_id: service to describe
+        :return: dict with sdr_serial and sdr_index, empty if no SDR is selected
+        """
+        selected = self.service_state[service_id].selected_sdr
+        if isinstance(selected, list):
+            selected = selected[0] if selected else None
+        if not selected:
+            return {}
 
         with self._sdr_lock:
-            # Re-check under lock so concurrent requests don't both enumerate USB
-            now = time.time()
-            if self._sdr_cache is not None and (now - self._sdr_cache_ts) < self._CACHE_TTL:
-                logger.debug("Returning cached SDR list")
-                return self._sdr_cache
+            self._get_usb_devices(time.time())
+            device = self.sdr_registry.get(selected)
+        rtl_index = device.rtl_index if device is not None else None
+
+        if rtl_index is None:
+            logger.warning("SDR %s for service %s has no RTL-SDR index", selected, service_id)
+            return {'sdr_serial': str(selected)}
+
+        return {'sdr_serial': str(selected), 'sdr_index': rtl_index}
 
+    def get_all_sdrs(self):
+        """
+        List of all SDRs from the latest snapshot; never touches USB or Kismet.
+
+        :return: tuple of frozen SdrInfo records
+        """
+        return self.snapshot.sdrs
+
+    def refresh_sdrs(self):
+        """Collector entry point: re-enumerate USB if needed and re-apply SDR claims."""
+        with self._sdr_lock:
             logger.debug("Getting all SDRs")
-            usb_dev = UsbDevices(self.sdr_ids)
-            self.sdr_data = usb_dev.list_rtlsdr_devices()
+            self._get_usb_devices(time.time())
             self.update_sdr_status()
-            self._sdr_cache = self.sdr_data
-            self._sdr_cache_ts = now
+            self._note_sdr_change()
 
-        return self.sdr_data
+    def refresh_sdr_status(self):
+        """Re-apply SDR claims from current service state (no USB or network I/O)."""
+        with self._sdr_lock:
+            self.update_sdr_status()
+            self._note_sdr_change()
+
+    def _note_sdr_change(self):
+        """
+        Bump the 'sdrs' version if the device set or any claim changed, and
+        publish the changed and removed devices to live subscribers.
+        'sdr_devices' only moves when devices are added, removed or renumbered.
+        """
+        devices = self.sdr_registry.devices()
+        signature = tuple((d.serial, d.rtl_index, d.owner, d.status) for d in devices)
+        if signature == self._sdr_signature:
+            return
+        first = self._sdr_signature is None
+        device_set = tuple((d.serial, d.rtl_index, d.manufacturer, d.product) for d in devices)
+        if device_set != self._sdr_device_set:
+            self._sdr_device_set = device_set
+            self._bump_version('sdr_devices')
+        self._sdr_signature = signature
+        self._bump_version('sdrs')
+
+        states = {d.serial: (d.owner, d.status) for d in self.sdr_registry.devices()}
+        if first:
+            self._sdr_states = states  # initial enumeration, nothing to announce
+            return
+        changed = [
+            {'serial': serial, 'owner': owner, 'status': status}
+            for serial, (owner, status) in states.items()
+            if self._sdr_states.get(serial) != (owner, status)
+        ]
+        removed = [serial for serial in self._sdr_states if serial not in states]
+        added = [serial for serial in states if serial not in self._sdr_states]
+        self._sdr_states = states
+        self.events.publish('sdrs', {'changed': changed, 'added': added, 'removed': removed})
 
     def update_sdr_status(self):
         """
@@ -292,99 +926,385 @@ class SignalsManager:
         """
 
         logger.debug("Updating SDR status")
+        self.sdr_registry.release_all()
 
-        # Get Status from Kismet
-        if _kismet_rest_available and 'kismet' in self.services and self.services['kismet']['current_status'] == "running":
-            logger.debug("Getting Kismet SDR usage status")
-            if self._kismet_mgr is None:
-                self._kismet_mgr = KismetStatus(self.creds['kismet']['username'], self.creds['kismet']['password'])
-            else:
-                try:
-                    self._kismet_mgr.get_active_datasources()
-                except Exception:
-                    logger.warning("KismetStatus refresh failed, reconnecting")
-                    self._kismet_mgr = KismetStatus(self.creds['kismet']['username'], self.creds['kismet']['password'])
+        # Get Status from Services
+        logger.debug("Updating %s SDR status", len(self.services))
+        for service_entry, svc in self.services.items():
+            state = self.service_state[service_entry]
+            if svc.require_sdr and state.status == 'running' and state.selected_sdr:
+                selected = state.selected_sdr
+                if isinstance(selected, str):
+                    selected = [selected]
+                conflicts = self.sdr_registry.claim(service_entry, selected, svc.description)
+                for serial, other in conflicts.items():
+                    logger.warning("SDR %s selected by %s is already used by %s", serial, service_entry, other)
 
-            for index, sdr_entry in enumerate(self.sdr_data):
-                kismet_result = self._kismet_mgr.lookup_by_sdr_id(sdr_entry['Rtl Id'])
+        # Get Status from Kismet, as last fetched by refresh_kismet()
+        if self._kismet_running() and self._kismet_mgr is not None:
+            for device in self.sdr_registry.devices():
+                kismet_result = self._kismet_mgr.lookup_by_sdr_id(device.rtl_index)
 
                 if kismet_result:
-                    self.sdr_data[index]['status'] = f"Kismet: {kismet_result}"
+                    conflicts = self.sdr_registry.claim('kismet', [device.serial], f"Kismet: {kismet_result}")
+                    for serial, other in conflicts.items():
+                        logger.warning("SDR %s used by Kismet is also assigned to %s", serial, other)
 
-        # Get Status from other Services
+    def _kismet_running(self):
+        return _kismet_available and 'kismet' in self.services and \
+            self.service_state['kismet'].status == "running"
 
-        logger.debug("Updating %s SDR status", len(self.services))
-        for service_entry in self.services:
-            if self.services[service_entry].get('require_sdr', False) and \
-               self.services[service_entry]['current_status'] == 'running' and \
-               self.services[service_entry]['selected_sdr']:
-                selected = self.services[service_entry]['selected_sdr']
-                if isinstance(selected, str):
-                    selected = [selected]
-                for serial in selected:
-                    index = next((i for i, d in enumerate(self.sdr_data)
-                                    if d.get('Serial') == str(serial)), -1)
-                    if index != -1:
-                        self.sdr_data[index]['status'] = f"{self.services[service_entry]['description']}"
-                    else:
-                        logger.error("Could not find SDR with serial %s for service %s",
-                                        serial, service_entry)
+    def refresh_kismet(self):
+        """Collector entry point: fetch Kismet's datasources and re-apply SDR claims."""
+        if not self._kismet_running():
+            return
+
+        logger.debug("Getting Kismet SDR usage status")
+        if self._kismet_mgr is None:
+            kismet_creds = self.creds.get('kismet', {})
+            self._kismet_mgr = KismetStatus(kismet_creds.get('username'), kismet_creds.get('password'),
+                                            kismet_creds.get('url'))
+        if not self._kismet_mgr.get_active_datasources():
+            return
+
+        self.refresh_sdr_status()
 
     def set_service_radio(self, name, sdr_serials):
         """
         Set the radio(s) to be used by a given service.
-        sdr_serials: list of serial number strings (empty list to clear).
+        sdr_serials: list of serial number strings (empty list to clear, so
+        the allocator picks when the service starts).
+
+        :raises SdrConflict: if a serial is not connected, is held by another
+            running service or does not suit the service
         """
         logger.debug("Setting SDRs %s for service %s", sdr_serials, name)
+        sdr_serials = [str(s) for s in sdr_serials or [] if s]
+        with self._service_lock(name):
+            if sdr_serials:
+                with self._alloc_lock:
+                    self._solve_sdrs([name], pins={name: sdr_serials}, fill=False)
+                    self._select_sdrs(name, sdr_serials, auto=False)
+            else:
+                self._select_sdrs(name, None, auto=False)
+
+    def allocate_sdrs(self, service_ids, pins=None):
+        """
+        Pick SDRs for the SDR services among *service_ids* in one matching,
+        around the devices held by running services and Kismet, and select
+        them.  Nothing is selected if any service cannot be satisfied.
+
+        :param service_ids: services about to start
+        :param pins: service_id -> serials to use instead of the current selection
+        :return: dict of service_id -> tuple of serials
+        :raises SdrConflict: with the reason for each service that cannot get its SDRs
+        """
+        with self._alloc_lock:
+            assignment = self._solve_sdrs(service_ids, pins=pins)
+            self._apply_sdrs(assignment, pinned=pins)
+        return assignment
+
+    @staticmethod
+    def _as_serials(selected):
+        if not selected:
+            return ()
+        if isinstance(selected, (str, int)):
+            return (str(selected),)
+        return tuple(str(serial) for serial in selected)
+
+    def _sdr_holders(self, exclude=()):
+        """
+        serial -> id of the running or starting service (or Kismet) holding
+        it.  Reservations of services that have not shown as running within
+        _SDR_START_TIMEOUT are dropped here.
+        """
+        holders = {}
+        now = time.monotonic()
+        for svc_id, (serials, deadline) in list(self._sdr_starting.items()):
+            if now >= deadline:
+                logger.warning("%s did not show as running within %ss, releasing its SDRs %s",
+                               svc_id, self._SDR_START_TIMEOUT, ', '.join(serials))
+                self._sdr_starting.pop(svc_id, None)
+            elif svc_id not in exclude:
+                holders.update(dict.fromkeys(serials, svc_id))
+        for svc_id, svc in self.services.items():
+            state = self.service_state[svc_id]
+            if svc_id not in exclude and svc.require_sdr and state.status in _SDR_HOLDING:
+                for serial in self._as_serials(state.selected_sdr):
+                    holders.setdefault(serial, svc_id)
+        for device in self.sdr_registry.devices():
+            if device.owner == 'kismet':
+                holders.setdefault(device.serial, 'kismet')
+        return holders
+
+    def _solve_sdrs(self, service_ids, pins=None, fill=True):
+        """
+        Run the allocator for *service_ids*; caller must hold _alloc_lock.
+        Without *fill* only the pinned serials are checked.
+        """
+        pins = pins or {}
+        with self._sdr_lock:
+            self._get_usb_devices(time.time())
+            devices = self.sdr_registry.devices()
 
+        requests = []
+        for svc_id in service_ids:
+            svc = self.services[svc_id]
+            if not svc.require_sdr:
+                continue
+            state = self.service_state[svc_id]
+            if svc_id in pins:
+                pinned, movable = self._as_serials(pins[svc_id]), False
+            else:
+                pinned, movable = self._as_serials(state.selected_sdr), state.auto_sdr
+            requests.append(SdrRequest(svc_id, svc.sdr_count if fill else 0, svc.sdr_models,
+                                       svc.freq_range, pinned, movable))
+        if not requests:
+            return {}
+        return allocate(requests, devices, self._sdr_holders(exclude=set(service_ids)), self.sdr_model_bands)
+
+    def _apply_sdrs(self, assignment, pinned=None):
+        """Select the serials the allocator chose, marking those it picked itself as movable."""
+        pinned = pinned or {}
+        for svc_id, serials in assignment.items():
+            state = self.service_state[svc_id]
+            current = self._as_serials(pinned[svc_id]) if svc_id in pinned else self._as_serials(state.selected_sdr)
+            auto = serials != current or (svc_id not in pinned and state.auto_sdr)
+            if serials != self._as_serials(state.selected_sdr) or auto != state.auto_sdr:
+                logger.info("Assigning SDR %s to %s%s", ', '.join(serials), svc_id, " (auto)" if auto else "")
+                self._select_sdrs(svc_id, list(serials), auto=auto)
+
+    def _select_sdrs(self, name, sdr_serials, auto):
         # Clear previous status annotations
-        if self.sdr_data is not None:
-            old = self.services[name].get('selected_sdr') or []
-            if isinstance(old, str):
-                old = [old]
-            for serial in old:
-                idx = next((i for i, d in enumerate(self.sdr_data) if d.get('Serial') == str(serial)), -1)
-                if idx != -1:
-                    self.sdr_data[idx]['status'] = ""
+        self.sdr_registry.release(name)
 
+        state = self.service_state[name]
+        state.auto_sdr = auto
         if sdr_serials:
-            self.services[name]['selected_sdr'] = [str(s) for s in sdr_serials]
-            if self.sdr_data is not None:
-                for serial in sdr_serials:
-                    idx = next((i for i, d in enumerate(self.sdr_data) if d.get('Serial') == str(serial)), -1)
-                    if idx != -1:
-                        self.sdr_data[idx]['status'] = f"{self.services[name]['description']}"
+            state.selected_sdr = list(sdr_serials)
+            if state.status == 'running':
+                self.sdr_registry.claim(name, sdr_serials, self.services[name].description)
         else:
-            self.services[name]['selected_sdr'] = None
+            state.selected_sdr = None
+
+        self._bump_version(f"service:{name}", 'services')
+        self._publish_service(name)
+        self._note_sdr_change()
+        self._publish_snapshot()
 
-    def get_gps_status(self):
-        """Query gpsd for GPS fix status and coordinates."""
-        if not _gpsd_available:
-            return {'state': 'unavailable', 'lat': None, 'lon': None, 'mode': None}
+    def get_gps_status(self, snapshot=None):
+        """
+        GPS fix status with the age of the last fix in seconds.
 
-        now = time.time()
-        if self._gps_cache is not None and (now - self._gps_cache_ts) < self._CACHE_TTL:
-            logger.debug("Returning cached GPS status")
-            return self._gps_cache
+        :param snapshot: StateSnapshot to read, defaults to the latest
+        """
+        gps = dict((snapshot or self.snapshot).gps)
+        fix_time = gps.get('fix_time')
+        gps['fix_age'] = round(max(time.time() - fix_time, 0.0), 1) if fix_time else None
+        return gps
+
+    def get_gps_history(self, since=None, last=None):
+        """Recent fixes from the gpsd client's ring buffer, as columns oldest first."""
+        if self._gps_client is None:
+            return {name: [] for name in GpsFixHistory.COLUMNS + ('mode',)}
+        return self._gps_client.history.columns(since=since, last=last)
+
+    @property
+    def gps_track(self):
+        """The TrackRecorder, or None when ``gps_track`` recording is disabled."""
+        return self._gps_track
+
+    def refresh_gps(self):
+        """Collector entry point: pick up the latest report from the gpsd watch client."""
+        if self._gps_client is None:
+            return
+
+        result = self._gps_client.status()
+        if result != self._gps_cache:
+            self._bump_version('gps')
+            fix_time = result['fix_time']
+            self.events.publish('gps', dict(result, fix_age=round(max(time.time() - fix_time, 0.0), 1)
+                                            if fix_time else None))
+        self._gps_cache = result
 
-        logger.debug("Querying GPS status from gpsd")
-        try:
-            gpsd.connect()
-            gps_data = gpsd.get_current()
-            mode = gps_data.mode
-            if mode >= 2:
-                result = {
-                    'state': 'fix_3d' if mode == 3 else 'fix_2d',
-                    'lat': gps_data.lat,
-                    'lon': gps_data.lon,
-                    'mode': mode,
-                }
+    ### Profiles
+    def profile_up(self, name, exclusive=False):
+        """
+        Bring a profile up: assign its SDRs and start its services, each as
+        soon as the services it depends on have started, independent ones in
+        parallel.  Services already running are left alone.
+
+        :param name: profile name from config.yml
+        :param exclusive: first stop running services of other profiles that are not part of this one
+        :return: report dict with per-step timing
+        :raises KeyError: unknown profile
+        :raises RuntimeError: another profile change is in progress
+        """
+        profile = self.profiles[name]
+        with self._profile_change(name, 'up') as report:
+            if exclusive:
+                stop_ids = {svc_id for other in self.profiles.values() if other.name != name
+                            for svc_id in other.services
+                            if svc_id not in profile.services and self.service_state[svc_id].status == 'running'}
+                report['steps'] += self._labelled('stop', run_graph(
+                    self._action_pool, self._stop_order(stop_ids), self._profile_stop_step, stop_on_failure=False))
+            starting = [svc_id for svc_id in profile.services
+                        if self.service_state[svc_id].status not in _SDR_HOLDING]
+            allocated = time.monotonic()
+            try:
+                self.allocate_sdrs(starting, pins={svc_id: serials for svc_id, serials in profile.sdrs.items()
+                                                   if svc_id in starting})
+            except SdrConflict as e:
+                logger.error("Profile '%s' cannot get its SDRs: %s", name, e)
+                report['steps'].append({'node': 'sdrs', 'action': 'allocate', 'result': 'failed', 'error': str(e),
+                                        'conflicts': e.conflicts, 'waited': 0.0,
+                                        'elapsed': round(time.monotonic() - allocated, 3)})
             else:
-                result = {'state': 'no_fix', 'lat': None, 'lon': None, 'mode': mode}
-        except Exception as e:
-            logger.warning("GPS status unavailable: %s", e)
-            result = {'state': 'unavailable', 'lat': None, 'lon': None, 'mode': None}
+                report['steps'] += self._labelled('start', run_graph(
+                    self._action_pool, profile.depends, lambda svc_id: self._profile_start_step(svc_id)))
+            if all(step['result'] in ('done', 'skipped') for step in report['steps']):
+                self.active_profile = name
+            elif exclusive:
+                self.active_profile = None
+        return report
+
+    def profile_down(self, name):
+        """
+        Stop a profile's services, dependents before the services they
+        depend on, independent ones in parallel.
 
-        self._gps_cache = result
-        self._gps_cache_ts = now
-        return result
+        :param name: profile name from config.yml
+        :return: report dict with per-step timing
+        :raises KeyError: unknown profile
+        :raises RuntimeError: another profile change is in progress
+        """
+        profile = self.profiles[name]
+        with self._profile_change(name, 'down') as report:
+            report['steps'] += self._labelled('stop', run_graph(
+                self._action_pool, profile.reverse_depends(), self._profile_stop_step, stop_on_failure=False))
+            if self.active_profile == name:
+                self.active_profile = None
+        return report
+
+    @contextmanager
+    def _profile_change(self, name, action):
+        """Serialize profile changes and time, store and publish their report."""
+        if not self._profile_lock.acquire(blocking=False):
+            raise RuntimeError("Another profile change is in progress")
+        started = time.monotonic()
+        report = {'profile': name, 'action': action, 'started': time.time(), 'steps': []}
+        try:
+            logger.info("Profile '%s' %s", name, action)
+            yield report
+        finally:
+            report['elapsed'] = round(time.monotonic() - started, 3)
+            report['ok'] = all(step['result'] in ('done', 'skipped') for step in report['steps'])
+            for step in report['steps']:
+                logger.info("Profile '%s' %s: %s %s %s in %.2fs (waited %.2fs)", name, action,
+                            step['action'], step['node'], step['result'], step['elapsed'], step['waited'])
+            self.profile_reports[name] = report
+            self._profile_lock.release()
+            self._bump_version('profiles')
+            self._publish_snapshot()
+            self.events.publish('profile', {'profile': name, 'action': action, 'ok': report['ok'],
+                                            'elapsed': report['elapsed'], 'active': self.active_profile})
+
+    @staticmethod
+    def _labelled(action, steps):
+        """Tag step reports with *action*; steps that raised or were blocked carry none yet."""
+        for step in steps:
+            step.setdefault('action', action)
+        return steps
+
+    def _stop_order(self, service_ids):
+        """Stop dependencies among *service_ids* taken from every profile; dependents stop first."""
+        order = {svc_id: set() for svc_id in service_ids}
+        for profile in self.profiles.values():
+            for svc_id, dependents in profile.reverse_depends().items():
+                if svc_id in order:
+                    order[svc_id].update(d for d in dependents if d in order)
+        order = {svc_id: frozenset(deps) for svc_id, deps in order.items()}
+        if find_cycle(order):
+            logger.warning("Profiles disagree on stop order for %s; stopping them together", ', '.join(sorted(order)))
+            return dict.fromkeys(order, frozenset())
+        return order
+
+    def _profile_start_step(self, svc_id):
+        step = {}
+        self.refresh_service(svc_id)
+        status = self.service_state[svc_id].status
+        if status == 'running':
+            step.update(result='skipped', status=status)
+            return step
+
+        if self.services[svc_id].require_sdr:
+            step['sdrs'] = list(self._as_serials(self.service_state[svc_id].selected_sdr))
+        status = self.start_service(svc_id)
+        step.update(result='failed' if status in ('stopped', 'failed', 'unavailable') else 'done', status=status)
+        return step
+
+    def _profile_stop_step(self, svc_id):
+        step = {}
+        self.refresh_service(svc_id)
+        status = self.service_state[svc_id].status
+        if status in ('stopped', 'unavailable'):
+            step.update(result='skipped', status=status)
+            return step
+
+        status = self.stop_service(svc_id)
+        step.update(result='done' if status in ('stopped', 'stopping') else 'failed', status=status)
+        return step
+
+    ### Jobs
+    def submit_service_action(self, service_id, action):
+        """
+        Queue a start or stop of a service and return at once.  Actions on
+        one service run in the order they were submitted; actions on
+        different services run in parallel.
+
+        :param service_id: service to act on
+        :param action: 'start' or 'stop'
+        :return: the queued Job; its result is the service status afterwards
+        :raises KeyError: unknown service
+        :raises ValueError: unknown action
+        """
+        if service_id not in self.services:
+            raise KeyError(service_id)
+        actions = {'start': self.start_service, 'stop': self.stop_service}
+        if action not in actions:
+            raise ValueError(f"Unknown action '{action}'")
+        return self.jobs.submit(f"service:{service_id}", action, actions[action], service_id)
+
+    def submit_profile_action(self, name, action, exclusive=False):
+        """
+        Queue bringing a profile up or down.  Profile changes run one at a
+        time in the order they were submitted.
+
+        :param name: profile name from config.yml
+        :param action: 'up' or 'down'
+        :param exclusive: with 'up', stop the services of other profiles first
+        :return: the queued Job; its result is the profile report
+        :raises KeyError: unknown profile
+        :raises ValueError: unknown action
+        """
+        if name not in self.profiles:
+            raise KeyError(name)
+        if action == 'up':
+            label = f"{'switch' if exclusive else 'up'} {name}"
+            return self.jobs.submit('profiles', label, self.profile_up, name, exclusive)
+        if action == 'down':
+            return self.jobs.submit('profiles', f"down {name}", self.profile_down, name)
+        raise ValueError(f"Unknown action '{action}'")
+
+    @contextmanager
+    def _service_lock(self, service_id):
+        """Hold the lock that keeps two actions on one service from overlapping."""
+        with self._service_locks_guard:
+            lock = self._service_locks.setdefault(service_id, threading.Lock())
+        with lock:
+            yield
+
+    def _on_job_change(self, job):
+        self._bump_version('jobs')
+        self._publish_snapshot()
+        self.events.publish('job', job.to_dict())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Central reaping and restart scheduling for CLI service processes.
+
+``ProcessSupervisor`` watches every child started by a ``CliService`` from
+one thread.  Exits are noticed through a pidfd per child where the kernel
+supports it (Linux 5.3+, Python 3.9+) and by polling otherwise.  The same
+thread runs delayed calls, which services use for restart backoff, and a
+single ``atexit`` hook stops whatever is still running.
+"""
+
+from typing import Callable, Dict, List, Optional, Set
+import atexit
+import heapq
+import itertools
+import logging
+import os
+import selectors
+import signal
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def signal_group(proc: subprocess.Popen, sig: int) -> bool:
+    """
+    Send *sig* to the process group led by *proc* (started with
+    ``start_new_session=True``).  Returns False if the group is gone.
+    """
+    try:
+        os.killpg(proc.pid, sig)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        logger.warning("Not allowed to signal process group %s", proc.pid)
+        return False
+
+
+class _Watch:
+    __slots__ = ('proc', 'on_exit', 'pidfd')
+
+    def __init__(self, proc: subprocess.Popen, on_exit: Callable[[int], None], pidfd: Optional[int]) -> None:
+        self.proc = proc
+        self.on_exit = on_exit
+        self.pidfd = pidfd
+
+
+class ProcessSupervisor:
+    """
+    Reaps supervised children and runs scheduled callbacks on one thread.
+    Callbacks run on that thread and must not block for long.
+    """
+
+    POLL_INTERVAL = 1.0  # seconds, for children without a pidfd
+
+    def __init__(self) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._watches: Dict[int, _Watch] = {}
+        self._polled: Set[int] = set()
+        self._timers: List = []
+        self._counter = itertools.count()
+        self._cancelled: Set[int] = set()
+        self._services: Set = set()
+        self._lock = threading.Lock()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._thread: Optional[threading.Thread] = None
+        atexit.register(self.shutdown)
+
+    def watch(self, proc: subprocess.Popen, on_exit: Callable[[int], None]) -> None:
+        """Call *on_exit(returncode)* on the supervisor thread once *proc* exits."""
+        pidfd = None
+        if hasattr(os, 'pidfd_open'):
+            try:
+                pidfd = os.pidfd_open(proc.pid)
+            except OSError:
+                pidfd = None  # kernel without pidfd support; poll instead
+
+        with self._lock:
+            self._watches[proc.pid] = _Watch(proc, on_exit, pidfd)
+            if pidfd is None:
+                self._polled.add(proc.pid)
+        if pidfd is not None:
+            self._selector.register(pidfd, selectors.EVENT_READ, proc.pid)
+        self._start()
+        self._wake()
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> int:
+        """Run *callback* after *delay* seconds.  Returns a handle for ``cancel``."""
+        with self._lock:
+            handle = next(self._counter)
+            heapq.heappush(self._timers, (time.monotonic() + delay, handle, callback))
+        self._start()
+        self._wake()
+        return handle
+
+    def cancel(self, handle: Optional[int]) -> None:
+        """Cancel a pending ``call_later``."""
+        if handle is not None:
+            with self._lock:
+                self._cancelled.add(handle)
+
+    def register_service(self, service) -> None:
+        """Have ``shutdown`` stop *service* if it is still running at exit."""
+        with self._lock:
+            self._services.add(service)
+
+    def unregister_service(self, service) -> None:
+        """Undo ``register_service``."""
+        with self._lock:
+            self._services.discard(service)
+
+    def shutdown(self) -> None:
+        """Stop every registered service (the process-wide ``atexit`` hook)."""
+        with self._lock:
+            services = list(self._services)
+        for service in services:
+            try:
+                if service.is_running():
+                    logger.debug("Cleaning up service '%s' on exit", service.svc_id)
+                    service.stop()
+            except Exception:
+                logger.exception("Failed to stop service '%s' on exit", getattr(service, 'svc_id', service))
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="cli-supervisor", daemon=True)
+                self._thread.start()
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_w, b'\0')
+        except BlockingIOError:
+            pass
+
+    def _timeout(self) -> Optional[float]:
+        with self._lock:
+            timeout = self.POLL_INTERVAL if self._polled else None
+            if self._timers:
+                due = max(self._timers[0][0] - time.monotonic(), 0.0)
+                timeout = due if timeout is None else min(timeout, due)
+        return timeout
+
+    def _run(self) -> None:
+        while True:
+            for key, _ in self._selector.select(self._timeout()):
+                if key.data is None:
+                    try:
+                        while os.read(self._wake_r, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                else:
+                    self._reap(key.data)
+
+            with self._lock:
+                polled = list(self._polled)
+            for pid in polled:
+                watch = self._watches.get(pid)
+                if watch is not None and watch.proc.poll() is not None:
+                    self._reap(pid)
+
+            self._run_timers()
+
+    def _reap(self, pid: int) -> None:
+        with self._lock:
+            watch = self._watches.pop(pid, None)
+            self._polled.discard(pid)
+        if watch is None:
+            return
+        if watch.pidfd is not None:
+            self._selector.unregister(watch.pidfd)
+            os.close(watch.pidfd)
+
+        returncode = watch.proc.wait()
+        try:
+            watch.on_exit(returncode)
+        except Exception:
+            logger.exception("Exit handler for pid %s failed", pid)
+
+    def _run_timers(self) -> None:
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            while self._timers and self._timers[0][0] <= now:
+                _, handle, callback = heapq.heappop(self._timers)
+                if handle in self._cancelled:
+                    self._cancelled.discard(handle)
+                else:
+                    due.append(callback)
+        for callback in due:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Scheduled callback failed")
+
+
+# Shared by every CliService
+supervisor = ProcessSupervisor()
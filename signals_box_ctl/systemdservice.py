@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+systemd backend: starts, stops and watches units over D-Bus.
+
+Imported on first use through the backend registry, so a host without
+dbus-python still runs the other service types.
+"""
+
+from typing import Dict, Iterable
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    import dbus
+    from dbus.exceptions import DBusException
+except ImportError as e:
+    raise ImportError("dbus library not installed on system") from e
+
+_glib_available = False
+try:
+    from dbus.mainloop.glib import DBusGMainLoop
+    from gi.repository import GLib
+    _glib_available = True
+except ImportError:
+    logger.warning("PyGObject not installed – systemd status will be polled")
+
+
+class SystemdServiceManager:
+    """
+    Manages services using systemd.
+
+    Unit state is normally polled over D-Bus.  After ``subscribe()`` the
+    manager listens for ``PropertiesChanged`` signals on the watched units and
+    answers ``status_service()`` from an in-memory table instead; polling is
+    used as a fallback and to resync the table whenever the signal connection
+    is (re)established.
+    """
+
+    _SYSTEMD_BUS_NAME = "org.freedesktop.systemd1"
+    _SYSTEMD_PATH = "/org/freedesktop/systemd1"
+    _RESUBSCRIBE_INTERVAL = 30  # seconds between attempts to restore signals
+
+    def __init__(self):
+        self.bus = self.get_bus(False)
+        self._manager = None
+
+        # Signal subscription state
+        self._watched = set()
+        self._unit_paths = {}       # D-Bus object path -> unit name
+        self._unit_states = {}      # unit name -> {'ActiveState': ...}
+        self._state_lock = threading.Lock()
+        self._signal_bus = None
+        self._loop = None
+        self._signals_ok = False
+        self._last_subscribe_attempt = 0.0
+
+    # D‑Bus helpers
+    @staticmethod
+    def get_bus(is_user: bool) -> dbus.Bus:
+        """Return the correct D‑Bus connection (system or session)."""
+        return dbus.SessionBus() if is_user else dbus.SystemBus()
+
+    @staticmethod
+    def unit_object_path(unit_name: str) -> str:
+        """
+        Return the systemd D-Bus object path for *unit_name* without a bus
+        round trip, using systemd's bus path escaping rules.
+        """
+        escaped = ''.join(
+            c if c.isascii() and c.isalnum() else f"_{ord(c):02x}"
+            for c in unit_name
+        )
+        return f"/org/freedesktop/systemd1/unit/{escaped}"
+
+    def get_manager(self) -> dbus.Interface:
+        """
+        Get the `org.freedesktop.systemd1.Manager` interface.
+        The proxy is cached; it is dropped again whenever a call through it fails.
+        Raises RuntimeError if the interface cannot be reached.
+        """
+        if self._manager is not None:
+            return self._manager
+
+        try:
+            obj = self.bus.get_object(self._SYSTEMD_BUS_NAME, self._SYSTEMD_PATH)
+            self._manager = dbus.Interface(obj, "org.freedesktop.systemd1.Manager")
+            return self._manager
+        except DBusException as exc:
+            raise RuntimeError(
+                f"Unable to connect to systemd over D‑Bus: {exc}"
+            ) from exc
+
+    # Signal subscription
+    def subscribe(self, unit_names: Iterable[str]) -> bool:
+        """
+        Watch *unit_names* for state changes via D-Bus signals.
+
+        Returns ``True`` if the signal subscription is active; otherwise
+        status reads keep polling the bus.
+        """
+        with self._state_lock:
+            self._watched = set(unit_names)
+            self._unit_paths = {self.unit_object_path(n): n for n in self._watched}
+            self._unit_states = {}
+
+        if not _glib_available:
+            return False
+
+        self._start_signals()
+        return self._signals_ok
+
+    def _start_signals(self) -> None:
+        """Open the signal connection, call Subscribe() and resync the state table."""
+        self._last_subscribe_attempt = time.time()
+
+        try:
+            if self._signal_bus is None:
+                self._signal_bus = dbus.SystemBus(mainloop=DBusGMainLoop(), private=True)
+                self._signal_bus.add_signal_receiver(
+                    self._on_properties_changed,
+                    signal_name="PropertiesChanged",
+                    dbus_interface="org.freedesktop.DBus.Properties",
+                    bus_name=self._SYSTEMD_BUS_NAME,
+                    path_keyword="path",
+                )
+                self._signal_bus.add_signal_receiver(
+                    self._on_systemd_restarted,
+                    signal_name="NameOwnerChanged",
+                    dbus_interface="org.freedesktop.DBus",
+                    arg0=self._SYSTEMD_BUS_NAME,
+                )
+                self._signal_bus.call_on_disconnection(self._on_disconnected)
+
+            manager_obj = self._signal_bus.get_object(self._SYSTEMD_BUS_NAME, self._SYSTEMD_PATH)
+            dbus.Interface(manager_obj, "org.freedesktop.systemd1.Manager").Subscribe()
+        except DBusException as exc:
+            logger.warning("systemd signal subscription failed, polling instead: %s", exc)
+            self._signals_ok = False
+            return
+
+        if self._loop is None:
+            self._loop = GLib.MainLoop()
+            threading.Thread(target=self._loop.run, name="systemd-signals", daemon=True).start()
+
+        self._signals_ok = True
+        self.resync()
+        logger.info("Subscribed to systemd state changes for %d units", len(self._watched))
+
+    def resync(self) -> None:
+        """Re-read the state of every watched unit with one bulk query."""
+        logger.debug("Resyncing systemd state table")
+        states = self._poll_statuses(self._watched)
+        with self._state_lock:
+            self._unit_states = states
+
+    def close(self) -> None:
+        """Stop the signal loop and drop the signal connection."""
+        self._signals_ok = False
+        if self._loop is not None:
+            self._loop.quit()
+            self._loop = None
+        if self._signal_bus is not None:
+            try:
+                self._signal_bus.close()
+            except DBusException:
+                pass
+            self._signal_bus = None
+
+    def _on_properties_changed(self, interface, changed, _invalidated, path=None) -> None:
+        """Signal handler: record ActiveState changes for watched units."""
+        if interface != "org.freedesktop.systemd1.Unit" or "ActiveState" not in changed:
+            return
+        name = self._unit_paths.get(str(path))
+        if name is None:
+            return
+
+        logger.debug("systemd unit %s is now %s", name, changed["ActiveState"])
+        with self._state_lock:
+            state = dict(self._unit_states.get(name, {}))
+            for prop in ("ActiveState", "SubState", "LoadState"):
+                if prop in changed:
+                    state[prop] = str(changed[prop])
+            self._unit_states[name] = state
+
+    def _on_systemd_restarted(self, _name, _old_owner, new_owner) -> None:
+        """Signal handler: systemd re-executed, so the subscription must be renewed."""
+        if new_owner:
+            logger.info("systemd changed bus owner, resubscribing")
+            self._start_signals()
+
+    def _on_disconnected(self, _connection) -> None:
+        """Called when the signal connection drops; fall back to polling."""
+        logger.warning("Lost systemd signal connection, falling back to polling")
+        self._signals_ok = False
+        self._signal_bus = None
+
+    def get_unit_properties(self, unit_name: str) -> dict:
+        """
+        Fetch all properties of a unit via the `org.freedesktop.DBus.Properties`
+        interface. Returns a plain dict with string keys and Python‑friendly
+        values (bytes → str, etc.).
+        """
+        try:
+            unit_obj_path = self.get_manager().GetUnit(unit_name)
+            props_obj = self.bus.get_object("org.freedesktop.systemd1",
+                                    str(unit_obj_path))
+            props_iface = dbus.Interface(props_obj, "org.freedesktop.DBus.Properties")
+            raw_props = props_iface.GetAll("org.freedesktop.systemd1.Unit")
+
+            # Convert D‑Bus types to normal Python types for printing
+            def _convert(value):
+                if isinstance(value, dbus.ByteArray):
+                    return bytes(value).decode()
+                if isinstance(value, dbus.Byte):
+                    return int(value)
+                return value
+
+            return {k: _convert(v) for k, v in raw_props.items()}
+        except DBusException as exc:
+            raise RuntimeError(
+                f"Failed to read properties of unit '{unit_name}': {exc}"
+            ) from exc
+
+    # Service actions
+    def start_service(self, name: str) -> None:
+        """Start the unit with the given name."""
+        manager = self.get_manager()
+        try:
+            manager.StartUnit(name, "replace")  # 'replace' mode starts it immediately
+            logger.info("Started %s", name)
+        except DBusException as exc:
+            self._manager = None
+            raise RuntimeError(f"Failed to start {name}: {exc}") from exc
+
+
+    def stop_service(self, name: str) -> None:
+        """Stop the unit."""
+        manager = self.get_manager()
+        try:
+            manager.StopUnit(name, "replace")
+            logger.info("Stopped %s", name)
+        except DBusException as exc:
+            self._manager = None
+            raise RuntimeError(f"Failed to stop {name}: {exc}") from exc
+
+    def restart_service(self, name: str) -> None:
+        """Restart the unit."""
+        manager = self.get_manager()
+        try:
+            manager.RestartUnit(name, "replace")
+            logger.info("Restarted %s", name)
+        except DBusException as exc:
+            self._manager = None
+            raise RuntimeError(f"Failed to restart {name}: {exc}") from exc
+
+    def status_service(self, name: str) -> dict:
+        """
+        Return a dict with the unit's ActiveState.
+
+        Served from the signal-driven state table when subscribed, otherwise
+        with a single targeted D-Bus Get call.
+        """
+        if self._signals_ok:
+            with self._state_lock:
+                cached = self._unit_states.get(name)
+            if cached is not None:
+                return cached
+        elif self._watched and _glib_available and \
+                time.time() - self._last_subscribe_attempt > self._RESUBSCRIBE_INTERVAL:
+            self._start_signals()
+
+        return self._poll_status(name)
+
+    def _poll_status(self, name: str) -> dict:
+        """Read ActiveState for *name* directly from the bus."""
+        try:
+            props_obj = self.bus.get_object(self._SYSTEMD_BUS_NAME, self.unit_object_path(name))
+            props_iface = dbus.Interface(props_obj, "org.freedesktop.DBus.Properties")
+            active_state = str(props_iface.Get("org.freedesktop.systemd1.Unit", "ActiveState"))
+            return {'ActiveState': active_state}
+        except (DBusException, RuntimeError) as exc:
+            logger.error("Failed to status %s: %s", name, exc)
+            self._manager = None
+            return None
+
+    def status_services(self, names: Iterable[str]) -> Dict[str, dict]:
+        """
+        Return the state of several units, keyed by unit name.
+
+        Each value holds ActiveState, SubState and LoadState.  Served from the
+        signal-driven state table when every unit is in it, otherwise fetched
+        with a single ListUnitsByNames call.
+        """
+        names = list(names)
+        if self._signals_ok:
+            with self._state_lock:
+                cached = {n: self._unit_states.get(n) for n in names}
+            if all(state is not None and "SubState" in state for state in cached.values()):
+                return cached
+
+        return self._poll_statuses(names)
+
+    def _poll_statuses(self, names: Iterable[str]) -> Dict[str, dict]:
+        """Fetch the state of *names* from the bus in one ListUnitsByNames round trip."""
+        names = list(names)
+        if not names:
+            return {}
+
+        try:
+            units = self.get_manager().ListUnitsByNames(names)
+        except (DBusException, RuntimeError) as exc:
+            logger.error("Failed to status units %s: %s", ", ".join(names), exc)
+            self._manager = None
+            return {}
+
+        # (name, description, load_state, active_state, sub_state, followed, path, job_id, job_type, job_path)
+        return {
+            str(unit[0]): {
+                'ActiveState': str(unit[3]),
+                'SubState': str(unit[4]),
+                'LoadState': str(unit[2]),
+            }
+            for unit in units
+        }
+
+    def list_services(self) -> None:
+        """List all services, optionally filtering by a glob pattern."""
+        manager = self.get_manager()
+        try:
+            units = manager.ListUnits()  # returns list of tuples
+        except DBusException as exc:
+            raise RuntimeError(f"Failed to list units: {exc}") from exc
+
+        print(f"{'ID':<50} {'Active':<10} {'Sub':<10} {'Description'}")
+        print("-" * 90)
+        for unit in units:
+            print(f"{unit[0]:<50} {unit[3]:<10} {unit[4]:<10} {unit[1]}")
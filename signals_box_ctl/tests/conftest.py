@@ -0,0 +1,103 @@
+"""Make the app's flat modules importable from the tests, and share a SignalsManager fixture."""
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SDR = {"Serial": "00000001", "Rtl Id": 0, "VID": "0x0bda", "PID": "0x2838", "Friendly": "RTLSDRBlog v4"}
+
+SDR_IDS = """\
+http_base_url: http://localhost
+sdr_ids:
+  - vid: "0x0bda"
+    pid: "0x2838"
+    name: "RTLSDRBlog v4"
+"""
+
+
+class FakeSystemd:
+    """Units start as ``activating`` until the test moves them on."""
+
+    def __init__(self):
+        self.units = {}
+        self.fail_start = False
+
+    def subscribe(self, _names):
+        return False
+
+    def status_service(self, name):
+        return {"ActiveState": self.units.get(name, "inactive")}
+
+    def status_services(self, names):
+        return {name: self.status_service(name) for name in names}
+
+    def start_service(self, name):
+        if self.fail_start:
+            raise RuntimeError(f"Failed to start {name}: unit not found")
+        self.units[name] = "activating"
+
+    def stop_service(self, name):
+        self.units[name] = "inactive"
+
+
+class _Idle:
+    """Stands in for the hotplug watcher and gpsd client, which the tests do not need."""
+
+    def __init__(self, *_args, **_kwargs):
+        self.host, self.port = "127.0.0.1", 2947
+        self.history = types.SimpleNamespace(capacity=3600)
+        self.active = False
+        self.on_fix = None
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _OneSdr:
+    def __init__(self, _sdr_ids):
+        self.serial_map = {SDR["Serial"]: 0}
+
+    def list_rtlsdr_devices(self):
+        return [dict(SDR)]
+
+
+@pytest.fixture
+def systemd(monkeypatch):
+    backend = FakeSystemd()
+    monkeypatch.setitem(sys.modules, "systemdservice", types.SimpleNamespace(SystemdServiceManager=lambda: backend))
+    return backend
+
+
+@pytest.fixture
+def make_manager(tmp_path, monkeypatch, systemd):
+    """
+    Build a SignalsManager from a config.yml text with one fake SDR, the
+    fake systemd backend and no background threads.
+    """
+    import signalsmanager  # pylint: disable=import-outside-toplevel
+    managers = []
+
+    def make(config):
+        (tmp_path / "config.yml").write_text(config)
+        (tmp_path / "creds.yml").write_text("{}\n")
+        monkeypatch.setattr(signalsmanager, "UsbDevices", _OneSdr)
+        monkeypatch.setattr(signalsmanager, "UsbHotplugWatcher", _Idle)
+        monkeypatch.setattr(signalsmanager, "GpsdClient", _Idle)
+        monkeypatch.setattr(signalsmanager.SignalsManager, "start_collector", lambda self: None)
+        monkeypatch.setattr(signalsmanager.SignalsManager, "start_config_watcher", lambda self: None)
+        manager = signalsmanager.SignalsManager(str(tmp_path / "config.yml"), str(tmp_path / "creds.yml"))
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.jobs.close()
+        for state in manager.service_state.values():
+            if state.process is not None and state.process.is_running():
+                state.process.stop(timeout=1)
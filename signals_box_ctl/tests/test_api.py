@@ -0,0 +1,122 @@
+"""JSON API conditional GETs through the Flask test client."""
+import pytest
+from flask import Flask
+
+from api import api
+from backends import BackendUnavailable
+from conftest import SDR_IDS
+
+CONFIG = SDR_IDS + """\
+services:
+    adsb:
+        system_ctl_name: dump1090-fa.service
+        type: systemd
+        description: ADS-B
+        require_sdr: true
+    ais:
+        system_ctl_name: ais-catcher.service
+        type: systemd
+        description: AIS
+profiles:
+    ships:
+        description: Ships
+        services: [ais]
+"""
+
+
+@pytest.fixture
+def manager(make_manager):
+    return make_manager(CONFIG)
+
+
+@pytest.fixture
+def client(manager):
+    app = Flask(__name__)
+    app.config['SIGNALS_MANAGER'] = manager
+    app.register_blueprint(api)
+    return app.test_client()
+
+
+def _revalidate(client, path, etag):
+    return client.get(path, headers={'If-None-Match': etag})
+
+
+@pytest.mark.parametrize("path", ["/api/v1/services", "/api/v1/services/adsb", "/api/v1/sdrs",
+                                  "/api/v1/gps", "/api/v1/profiles", "/api/v1/profiles/ships",
+                                  "/api/v1/jobs"])
+def test_unchanged_resource_is_304(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert etag.startswith('W/"')
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    again = _revalidate(client, path, etag)
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == etag
+
+    assert _revalidate(client, path, 'W/"something-else"').status_code == 200
+
+
+def test_service_change_invalidates(client, manager, systemd):
+    etag = client.get('/api/v1/services/adsb').headers['ETag']
+    other = client.get('/api/v1/services/ais').headers['ETag']
+
+    systemd.units['dump1090-fa.service'] = 'active'
+    manager.refresh_service('adsb')
+
+    response = _revalidate(client, '/api/v1/services/adsb', etag)
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'running'
+    assert _revalidate(client, '/api/v1/services/ais', other).status_code == 304  # a different service
+
+
+def test_etag_follows_the_snapshot(client, manager):
+    """Versions bumped but not yet published must not change the ETag of the published body."""
+    etags = {path: client.get(path).headers['ETag'] for path in ('/api/v1/profiles/ships', '/api/v1/jobs')}
+    manager._bump_version('profiles', 'jobs')
+    for path, etag in etags.items():
+        assert _revalidate(client, path, etag).status_code == 304
+
+    manager._publish_snapshot()
+    for path, etag in etags.items():
+        assert _revalidate(client, path, etag).status_code == 200
+
+
+def test_new_job_invalidates_job_list(client, manager):
+    etag = client.get('/api/v1/jobs').headers['ETag']
+    job = manager.submit_service_action('ais', 'start')
+    job.wait(5)
+    response = _revalidate(client, '/api/v1/jobs', etag)
+    assert response.status_code == 200
+    assert [j['id'] for j in response.get_json()['jobs']] == [job.id]
+
+
+def test_gps_body_is_stable_for_its_etag(client, manager):
+    manager._gps_cache = dict(manager.snapshot.gps, state='fix_3d', lat=51.5, lon=-0.1, fix_time=1000.0)
+    manager._bump_version('gps')
+    manager._publish_snapshot()
+
+    first = client.get('/api/v1/gps')
+    body = first.get_json()
+    assert (body['state'], body['fix_time']) == ('fix_3d', 1000.0)
+    assert 'fix_age' not in body  # a live age would change under an unchanged ETag
+    assert client.get('/api/v1/gps').data == first.data
+    assert _revalidate(client, '/api/v1/gps', first.headers['ETag']).status_code == 304
+
+
+def test_unknown_resources(client):
+    assert client.get('/api/v1/services/nope').status_code == 404
+    assert client.get('/api/v1/profiles/nope').status_code == 404
+
+
+def test_backend_status(client, manager):
+    manager.backends.register('docker', 'no_such_docker_module', 'DockerService')
+    manager.refresh_services()  # loads systemd
+    with pytest.raises(BackendUnavailable):
+        manager.backends.get('docker')
+    backends = client.get('/api/v1/backends').get_json()['backends']
+    assert backends['systemd'] == {'state': 'loaded', 'error': None}
+    assert backends['docker']['state'] == 'unavailable'
+    assert 'no_such_docker_module' in backends['docker']['error']
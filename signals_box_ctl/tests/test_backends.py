@@ -0,0 +1,131 @@
+"""Lazy loading, retry and status of BackendRegistry."""
+import sys
+import threading
+import types
+
+import pytest
+
+import backends
+from backends import BackendRegistry, BackendUnavailable
+
+
+class Client:
+    created = 0
+
+    def __init__(self):
+        Client.created += 1
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(backends.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def module(monkeypatch):
+    """A backend module whose factory fails while ``module.down`` is set."""
+    Client.created = 0
+    fake = types.SimpleNamespace(down=True, calls=0)
+
+    def factory():
+        fake.calls += 1
+        if fake.down:
+            raise ConnectionError("daemon not running")
+        return Client()
+
+    fake.Client = factory
+    monkeypatch.setitem(sys.modules, "fakebackend", fake)
+    return fake
+
+
+def test_unknown_backend():
+    with pytest.raises(BackendUnavailable, match="No backend registered for 'kube'"):
+        BackendRegistry().get("kube")
+
+
+def test_loaded_on_first_use_only(module):
+    module.down = False
+    setups = []
+    registry = BackendRegistry()
+    registry.register("docker", "fakebackend", "Client", setup=setups.append)
+    assert registry.status() == {"docker": {"state": "idle", "error": None}}
+    assert registry.peek("docker") is None and module.calls == 0
+
+    client = registry.get("docker")
+    assert registry.get("docker") is client and registry.peek("docker") is client
+    assert module.calls == 1 and setups == [client]
+    assert registry.status() == {"docker": {"state": "loaded", "error": None}}
+
+    registry.close()
+    assert client.closed and registry.peek("docker") is None
+
+
+def test_missing_module_is_unavailable():
+    registry = BackendRegistry()
+    registry.register("docker", "no_such_backend_module", "Client")
+    with pytest.raises(BackendUnavailable, match="docker backend unavailable: No module named"):
+        registry.get("docker")
+    status = registry.status()["docker"]
+    assert status["state"] == "unavailable" and "no_such_backend_module" in status["error"]
+
+
+def test_failed_setup_is_unavailable(module):
+    module.down = False
+
+    def setup(_client):
+        raise RuntimeError("subscribe failed")
+
+    registry = BackendRegistry()
+    registry.register("systemd", "fakebackend", "Client", setup=setup)
+    with pytest.raises(BackendUnavailable, match="subscribe failed"):
+        registry.get("systemd")
+    assert registry.peek("systemd") is None
+
+
+def test_retried_after_interval(module, clock):
+    registry = BackendRegistry()
+    registry.register("docker", "fakebackend", "Client")
+    with pytest.raises(BackendUnavailable, match="daemon not running"):
+        registry.get("docker")
+
+    # Within the interval the error is returned without trying again
+    module.down = False
+    clock[0] += registry.RETRY_INTERVAL - 1
+    with pytest.raises(BackendUnavailable, match="daemon not running"):
+        registry.get("docker")
+    assert module.calls == 1
+    assert registry.status()["docker"]["state"] == "unavailable"
+
+    clock[0] += 1
+    client = registry.get("docker")
+    assert module.calls == 2 and isinstance(client, Client)
+    assert registry.status() == {"docker": {"state": "loaded", "error": None}}
+
+
+def test_concurrent_first_use_creates_one_client(module, monkeypatch):
+    module.down = False
+    gate = threading.Event()
+    factory = module.Client
+
+    def slow():
+        gate.wait(5)
+        return factory()
+
+    monkeypatch.setattr(module, "Client", slow)
+    registry = BackendRegistry()
+    registry.register("docker", "fakebackend", "Client")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("docker"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(results) == 4 and len({id(client) for client in results}) == 1
+    assert Client.created == 1
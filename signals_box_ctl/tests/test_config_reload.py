@@ -0,0 +1,115 @@
+"""Incremental config reloads in SignalsManager.load_config()."""
+import os
+
+import pytest
+
+from conftest import SDR_IDS
+from outputmux import output_mux
+
+SERVICES = """\
+services:
+    adsb:
+        system_ctl_name: dump1090-fa.service
+        type: systemd
+        description: ADS-B
+        require_sdr: true
+        default_sdr: '00000001'
+    sleeper:
+        type: cli
+        description: Sleeper
+        cmd_line: sleep 30
+"""
+
+
+def _rewrite(manager, text):
+    """Replace config.yml the way an editor saving atomically would."""
+    tmp = manager.config_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as handle:
+        handle.write(text)
+    os.replace(tmp, manager.config_file)
+
+
+@pytest.fixture
+def manager(make_manager):
+    mgr = make_manager(SDR_IDS + SERVICES)
+    mgr.start_service("sleeper")
+    return mgr
+
+
+def test_unchanged_files_are_not_reloaded(manager):
+    version, services = manager.get_version("config"), manager.services
+    _rewrite(manager, SDR_IDS + SERVICES)  # new inode, same content
+    assert manager.load_config()
+    assert manager.get_version("config") == version
+    assert manager.services is services
+
+
+def test_cosmetic_change_keeps_the_process(manager):
+    process = manager.service_state["sleeper"].process
+    adsb = manager.services["adsb"]
+    version = manager.get_version("service:sleeper")
+
+    _rewrite(manager, SDR_IDS + SERVICES.replace("description: Sleeper", "description: Napper"))
+    manager.load_config()
+
+    assert manager.service_state["sleeper"].process is process
+    assert process.is_running() and process.description == "Napper"
+    assert manager.services["sleeper"].description == "Napper"
+    assert manager.services["adsb"] is adsb  # untouched definitions are kept as they are
+    assert manager.get_version("service:sleeper") == version + 1
+
+
+def test_command_change_restarts_the_process(manager):
+    old = manager.service_state["sleeper"].process
+    _rewrite(manager, SDR_IDS + SERVICES.replace("sleep 30", "sleep 31"))
+    manager.load_config()
+
+    new = manager.service_state["sleeper"].process
+    assert new is not old
+    assert not old.is_running() and new.is_running()
+    assert new.cmd_line == "sleep 31"
+
+
+def test_stopped_process_service_is_not_started_by_a_change(manager):
+    manager.stop_service("sleeper")
+    _rewrite(manager, SDR_IDS + SERVICES.replace("sleep 30", "sleep 31"))
+    manager.load_config()
+    assert manager.get_service_statuses()["sleeper"] != "running"
+    process = manager.service_state["sleeper"].process
+    assert process is None or not process.is_running()
+
+
+def test_sdr_change_resets_the_selection(manager):
+    manager.service_state["adsb"].selected_sdr = "somewhere-else"
+    _rewrite(manager, SDR_IDS + SERVICES.replace("default_sdr: '00000001'", "default_sdr: null"))
+    manager.load_config()
+    assert manager.service_state["adsb"].selected_sdr is None
+
+
+def test_removed_and_added_services(manager):
+    process = manager.service_state["sleeper"].process
+    config = SDR_IDS + SERVICES.split("    sleeper:")[0] + """\
+    ais:
+        system_ctl_name: ais-catcher.service
+        type: systemd
+        description: AIS
+"""
+    _rewrite(manager, config)
+    manager.load_config()
+
+    assert set(manager.services) == {"adsb", "ais"}
+    assert not process.is_running()
+    assert manager.service_state["sleeper"].process is None  # state kept for old readers
+    assert "ais" in manager.service_state
+    assert "sleeper" not in output_mux._buffers
+
+
+def test_broken_config_keeps_the_running_one(manager):
+    services, version = manager.services, manager.get_version("config")
+    _rewrite(manager, SDR_IDS)  # no services section
+    with pytest.raises(KeyError):
+        manager.load_config()
+    manager._on_config_change({manager.config_file})  # the watcher path logs instead
+    assert manager.services is services
+    assert manager.get_version("config") == version
+    assert manager.service_state["sleeper"].process.is_running()
@@ -0,0 +1,143 @@
+"""ConfigWatcher (inotify and polling) and YamlFileCache."""
+import os
+import threading
+import time
+
+import pytest
+
+from configwatch import ConfigWatcher, YamlFileCache
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def files(tmp_path):
+    config, creds = tmp_path / "config.yml", tmp_path / "creds.yml"
+    config.write_text("services: {}\n")
+    creds.write_text("{}\n")
+    return str(config), str(creds)
+
+
+@pytest.fixture
+def watch(files, monkeypatch):
+    """Start a watcher on *files* that records each callback; ``poll=True`` forces the fallback."""
+    watchers = []
+    monkeypatch.setattr(ConfigWatcher, "DEBOUNCE", 0.2)
+    monkeypatch.setattr(ConfigWatcher, "POLL_INTERVAL", 0.05)
+
+    def start(poll=False, callback=None):
+        calls = []
+        watcher = ConfigWatcher(files, callback or calls.append)
+        if poll:
+            def no_inotify():
+                raise OSError("not here")
+            monkeypatch.setattr(watcher, "_open_inotify", no_inotify)
+        watcher.start()
+        watcher.calls = calls
+        watchers.append(watcher)
+        return watcher
+
+    yield start
+    for watcher in watchers:
+        watcher.close()
+
+
+def _save(path, text):
+    tmp = path + ".swp"
+    with open(tmp, "w", encoding="utf-8") as handle:
+        handle.write(text)
+    os.replace(tmp, path)
+
+
+def test_inotify_coalesces_a_burst(watch, files):
+    watcher = watch()
+    assert watcher.mode == "inotify" and watcher.active
+    config, creds = files
+    for n in range(5):
+        with open(config, "a", encoding="utf-8") as handle:
+            handle.write(f"# edit {n}\n")
+        time.sleep(0.02)
+    _save(creds, "user: x\n")
+
+    assert _wait_for(lambda: watcher.calls)
+    time.sleep(ConfigWatcher.DEBOUNCE * 2)
+    assert watcher.calls == [{config, creds}]
+
+
+def test_inotify_sees_rename_over_and_ignores_other_files(watch, files, tmp_path):
+    watcher = watch()
+    (tmp_path / "notes.txt").write_text("unrelated\n")
+    time.sleep(ConfigWatcher.DEBOUNCE * 2)
+    assert watcher.calls == []
+
+    _save(files[0], "services: {a: 1}\n")
+    assert _wait_for(lambda: watcher.calls)
+    assert watcher.calls == [{files[0]}]
+
+
+def test_inotify_close_stops_the_thread(watch):
+    watcher = watch()
+    watcher.close()
+    assert not watcher.active
+    assert _wait_for(lambda: watcher.mode is None and watcher._fd is None)
+
+
+def test_poll_fallback(watch, files):
+    watcher = watch(poll=True)
+    assert watcher.mode == "poll"
+    config, creds = files
+    time.sleep(ConfigWatcher.POLL_INTERVAL * 2)
+    assert watcher.calls == []
+
+    with open(config, "a", encoding="utf-8") as handle:
+        handle.write("# edited\n")
+    assert _wait_for(lambda: watcher.calls)
+    assert watcher.calls[0] == {config}
+
+    os.remove(creds)
+    assert _wait_for(lambda: {creds} in watcher.calls)
+
+
+def test_callback_failure_keeps_watching(watch, files):
+    seen = threading.Event()
+    calls = []
+
+    def callback(paths):
+        calls.append(paths)
+        if len(calls) == 1:
+            raise RuntimeError("broken config")
+        seen.set()
+
+    watcher = watch(callback=callback)
+    _save(files[0], "services: {a: 1}\n")
+    assert _wait_for(lambda: calls)
+    _save(files[0], "services: {a: 2}\n")
+    assert seen.wait(5)
+    assert watcher.active
+
+
+def test_yaml_cache(files):
+    cache = YamlFileCache()
+    config = files[0]
+    data, digest = cache.load(config)
+    assert data == {"services": {}}
+    assert cache.load(config) == (data, digest)
+
+    _save(config, "services: {}\n")  # new inode, same content: not re-parsed
+    again, same = cache.load(config)
+    assert again is data and same == digest
+
+    _save(config, "services: {a: 1}\n")
+    changed, other = cache.load(config)
+    assert changed == {"services": {"a": 1}} and other != digest
+
+    os.remove(config)
+    with pytest.raises(FileNotFoundError):
+        cache.load(config)
@@ -0,0 +1,138 @@
+"""DockerService's event-fed container cache, with a stub docker module."""
+import importlib
+import sys
+import types
+
+import pytest
+
+
+class NotFound(Exception):
+    pass
+
+
+class StubContainer:
+    def __init__(self, name, status):
+        self.name, self.status = name, status
+        self.attrs = {'Names': [f"/{name}"], 'State': {'Status': status}}
+        self.calls = []
+
+    def start(self):
+        self.calls.append('start')
+
+    def stop(self):
+        self.calls.append('stop')
+
+
+class StubClient:
+    def __init__(self, containers):
+        self.by_name = {c.name: c for c in containers}
+        self.lists = 0
+        self.containers = self
+
+    def list(self, all=False, sparse=False):  # pylint: disable=redefined-builtin
+        self.lists += 1
+        return list(self.by_name.values())
+
+    def get(self, name):
+        if name not in self.by_name:
+            raise NotFound(name)
+        return self.by_name[name]
+
+
+@pytest.fixture
+def docker(monkeypatch):
+    client = StubClient([StubContainer('pagermon', 'running'), StubContainer('rdio', 'exited')])
+    module = types.ModuleType('docker')
+    module.errors = types.SimpleNamespace(NotFound=NotFound)
+    module.DockerClient = lambda base_url: client
+    monkeypatch.setitem(sys.modules, 'docker', module)
+    monkeypatch.setitem(sys.modules, 'docker.errors', module.errors)
+    monkeypatch.delitem(sys.modules, 'dockerservice', raising=False)
+    client.service = importlib.import_module('dockerservice').DockerService(watch_events=False)
+    client.service._snapshot()
+    client.service._cache_ok = True
+    yield client
+    sys.modules.pop('dockerservice', None)
+
+
+def _event(action, name, **attributes):
+    return {'Action': action, 'Actor': {'Attributes': dict(attributes, name=name)}}
+
+
+def test_status_served_from_snapshot(docker):
+    assert docker.service.status_service('pagermon') == 'running'
+    assert docker.service.status_service('rdio') == 'exited'
+    assert docker.service.status_service('missing') is False
+    assert docker.lists == 1
+
+
+def test_events_update_cache(docker):
+    service = docker.service
+    service._apply_event(_event('die', 'pagermon'))
+    service._apply_event(_event('start', 'rdio'))
+    assert (service.status_service('pagermon'), service.status_service('rdio')) == ('exited', 'running')
+
+    service._apply_event(_event('rename', 'rdio-scanner', oldName='/rdio'))
+    assert service.status_service('rdio-scanner') == 'running'
+    assert service.status_service('rdio') is False
+
+    docker.by_name['trunk'] = StubContainer('trunk', 'created')
+    service._apply_event(_event('create', 'trunk'))
+    assert service.status_service('trunk') == 'created'
+    service._apply_event(_event('destroy', 'trunk'))
+    assert service.status_service('trunk') is False
+
+
+def test_actions_reuse_cached_container(docker):
+    docker.service.start_service('rdio')
+    assert docker.by_name['rdio'].calls == ['start']
+    assert docker.service.start_service('missing') is False
+
+
+def test_health_events(docker):
+    service = docker.service
+    assert service.health_service('pagermon') is None  # no healthcheck reported yet
+    service._apply_event(_event('health_status: unhealthy', 'pagermon'))
+    assert service.health_service('pagermon') == 'unhealthy'
+    service._apply_event(_event('health_status: healthy', 'pagermon'))
+    assert service.health_service('pagermon') == 'healthy'
+
+    service._apply_event(_event('die', 'pagermon'))
+    assert service.health_service('pagermon') is None
+
+
+def test_health_survives_resnapshot(docker):
+    service = docker.service
+    service._apply_event(_event('health_status: unhealthy', 'pagermon'))
+    docker.by_name['rdio'].attrs['Status'] = 'Up 2 minutes (health: starting)'
+    service._snapshot()  # as after the event stream reconnects
+    assert service.health_service('pagermon') == 'unhealthy'
+    assert service.health_service('rdio') == 'starting'
+
+    del docker.by_name['pagermon']
+    service._snapshot()
+    assert service.health_service('pagermon') is None
+
+
+CONFIG = """\
+http_base_url: http://localhost
+services:
+    pagermon:
+        type: docker
+        container_name: pagermon
+        description: Pagermon
+"""
+
+
+def test_manager_reports_health(docker, make_manager, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'dockerservice', types.SimpleNamespace(DockerService=lambda: docker.service))
+    manager = make_manager(CONFIG)
+    manager.refresh_service('pagermon')
+    assert (manager.snapshot.services['pagermon'], dict(manager.snapshot.health)) == ('running', {})
+
+    version = manager.get_version('service:pagermon')
+    docker.service._apply_event(_event('health_status: unhealthy', 'pagermon'))
+    manager.refresh_service('pagermon')
+    assert manager.snapshot.services['pagermon'] == 'running'
+    assert manager.snapshot.health == {'pagermon': 'unhealthy'}
+    assert manager.get_version('service:pagermon') == version + 1
@@ -0,0 +1,160 @@
+"""SseServer on an ephemeral port, driven over raw sockets."""
+import socket
+import time
+
+import pytest
+
+from eventstream import EventBroker, SseServer
+
+REQUEST = b"GET /api/v1/events HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n"
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class Reader:
+    """Buffers what the server sends so tests can read it up to a delimiter."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buf = b""
+
+    def until(self, delimiter, count=1, timeout=5.0):
+        self.sock.settimeout(timeout)
+        while self.buf.count(delimiter) < count:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise EOFError(self.buf)
+            self.buf += chunk
+        end = 0
+        for _ in range(count):
+            end = self.buf.index(delimiter, end) + len(delimiter)
+        data, self.buf = self.buf[:end], self.buf[end:]
+        return data
+
+
+@pytest.fixture
+def broker():
+    return EventBroker(history=4)
+
+
+@pytest.fixture
+def server(broker):
+    sse = SseServer(broker, host="127.0.0.1", port=0)
+    assert sse.start()
+    assert sse.port != 0
+    yield sse
+    broker.remove_listener(sse._on_event)
+
+
+@pytest.fixture
+def connect(server):
+    sockets = []
+
+    def open_stream(headers=b"", handshake=True):
+        sock = socket.create_connection(("127.0.0.1", server.port), timeout=5)
+        sockets.append(sock)
+        reader = Reader(sock)
+        if handshake:
+            sock.sendall(REQUEST + headers + b"\r\n")
+            reader.head = reader.until(b"\r\n\r\n")
+            assert reader.until(b"\n\n") == b"retry: %d\n\n" % server.RETRY_MS
+        return reader
+
+    yield open_stream
+    for sock in sockets:
+        sock.close()
+
+
+def test_handshake(connect, server):
+    reader = connect()
+    status, *headers = reader.head.decode().split("\r\n")
+    assert status == "HTTP/1.1 200 OK"
+    assert "Content-Type: text/event-stream" in headers
+    assert "Cache-Control: no-cache" in headers
+    assert _wait_for(lambda: server.subscriber_count == 1)
+
+
+def test_request_split_over_several_packets(connect, server, broker):
+    reader = connect(handshake=False)
+    for part in (REQUEST[:10], REQUEST[10:], b"\r\n"):
+        reader.sock.sendall(part)
+        time.sleep(0.02)
+    assert reader.until(b"\r\n\r\n").startswith(b"HTTP/1.1 200 OK")
+
+
+def test_unknown_path_is_404(connect):
+    reader = connect(handshake=False)
+    reader.sock.sendall(b"GET /elsewhere HTTP/1.1\r\n\r\n")
+    assert reader.until(b"\r\n\r\n").startswith(b"HTTP/1.1 404 Not Found")
+    assert reader.sock.recv(1) == b""  # and closed
+
+
+def test_oversized_request_dropped(connect, server):
+    reader = connect(handshake=False)
+    reader.sock.sendall(b"GET /api/v1/events HTTP/1.1\r\nX-Filler: " + b"x" * (server.MAX_REQUEST + 10))
+    with pytest.raises(EOFError):
+        reader.until(b"\r\n\r\n")
+
+
+def test_event_framing(connect, server, broker):
+    reader = connect()
+    assert _wait_for(lambda: server.subscriber_count == 1)
+    broker.publish("service", {"id": "adsb", "status": "running"})
+    broker.publish("gps", {"state": "no_fix"})
+
+    assert reader.until(b"\n\n", count=2) == (
+        b'id: 1\nevent: service\ndata: {"id":"adsb","status":"running"}\n\n'
+        b'id: 2\nevent: gps\ndata: {"state":"no_fix"}\n\n'
+    )
+
+
+def test_last_event_id_replay(connect, broker):
+    for n in range(1, 7):
+        broker.publish("job", {"id": n})
+
+    reader = connect(b"Last-Event-ID: 3\r\n")
+    assert reader.until(b"\n\n", count=3) == b"".join(
+        b'id: %d\nevent: job\ndata: {"id":%d}\n\n' % (n, n) for n in (4, 5, 6))
+
+    # Events older than the history are gone; the client gets what is left
+    reader = connect(b"Last-Event-ID: 0\r\n")
+    assert reader.until(b"\n\n", count=4).count(b"event: job") == 4
+
+
+def test_heartbeat(connect, server):
+    reader = connect()
+    server.HEARTBEAT = 0.05
+    server._on_event(0, b"")  # wake the loop so it picks up the shorter interval
+    assert reader.until(b"\n\n") == b": keepalive\n\n"
+
+
+def test_slow_client_dropped(connect, server, broker):
+    server.MAX_BUFFER = 64 * 1024
+    slow = connect()
+    slow.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    fast = connect()
+    assert _wait_for(lambda: server.subscriber_count == 2)
+
+    payload = "x" * 32 * 1024
+    for n in range(2000):
+        broker.publish("blob", {"n": n, "payload": payload})
+        fast.buf = b""  # keep draining the fast client
+        fast.sock.settimeout(0.001)
+        try:
+            while fast.sock.recv(1 << 20):
+                pass
+        except (socket.timeout, BlockingIOError):
+            pass
+        if server.subscriber_count < 2:
+            break
+
+    assert _wait_for(lambda: server.subscriber_count == 1)
+    broker.publish("service", {"id": "after"})
+    assert b'"id":"after"' in fast.until(b'"id":"after"}\n\n')
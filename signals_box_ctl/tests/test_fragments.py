@@ -0,0 +1,107 @@
+"""Cached page fragments and their invalidation on state version bumps."""
+import importlib
+import logging.config
+import os
+import sys
+
+import pytest
+
+import signalsmanager
+from conftest import SDR_IDS
+from fragments import FragmentCache
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIG = SDR_IDS + """\
+services:
+    adsb:
+        system_ctl_name: dump1090-fa.service
+        type: systemd
+        description: ADS-B
+        require_sdr: true
+        default_sdr: '00000001'
+    ais:
+        system_ctl_name: ais-catcher.service
+        type: systemd
+        description: AIS
+        require_sdr: true
+        default_sdr: null
+"""
+
+
+def test_cache_hit_miss_and_eviction():
+    cache = FragmentCache(max_entries=2)
+    renders = []
+
+    def render(text):
+        return lambda: renders.append(text) or f"<b>{text}</b>"
+
+    assert cache.get(('row', 1), render("one")) == "<b>one</b>"
+    assert cache.get(('row', 1), render("again")) == "<b>one</b>"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.get(('row', 2), render("two"))  # a version bump is a new key
+    cache.get(('other', 1), render("other"))
+    assert renders == ["one", "two", "other"]
+    cache.get(('row', 1), render("one"))  # the oldest entry was evicted
+    assert renders[-1] == "one"
+
+    cache.clear()
+    cache.get(('row', 2), render("two"))
+    assert cache.misses == 5
+
+
+@pytest.fixture
+def app_module(make_manager, monkeypatch):
+    """Import app.py around a manager built from CONFIG, without its logging setup or event server."""
+    manager = make_manager(CONFIG)
+    manager.event_stream_port = 0
+    manager.refresh_sdrs()
+    manager._publish_snapshot()
+    monkeypatch.setattr(signalsmanager, "SignalsManager", lambda: manager)
+    monkeypatch.setattr(logging.config, "dictConfig", lambda _config: None)
+    monkeypatch.chdir(APP_DIR)
+    monkeypatch.delitem(sys.modules, "app", raising=False)
+    module = importlib.import_module("app")
+    with module.app.test_request_context():
+        yield module
+    sys.modules.pop("app", None)
+
+
+def test_drop_list_selection_rendered_by_template(app_module):
+    snapshot = app_module.manager.snapshot
+    selected = app_module.render_sdr_drop_list(snapshot, "00000001")
+    assert '<option value="00000001" selected>' in selected
+
+    # The cached list for another selection is not the one marked above
+    plain = app_module.render_sdr_drop_list(snapshot)
+    assert "selected" not in plain
+    assert app_module.render_sdr_drop_list(snapshot, ["00000001"]) == selected
+    assert "selected" not in app_module.render_sdr_drop_list(snapshot, ["gone"])
+
+
+def test_service_rows_rerendered_on_version_bump(app_module, systemd):
+    fragments, manager = app_module.fragments, app_module.manager
+    first = app_module.render_service_toggles(manager)
+    misses = fragments.misses
+    assert app_module.render_service_toggles(manager) == first
+    assert fragments.misses == misses  # all rows and option lists from the cache
+
+    systemd.units["ais-catcher.service"] = "active"
+    manager.refresh_service("ais")
+    second = app_module.render_service_toggles(manager)
+    assert fragments.misses == misses + 1  # just the ais row
+    assert second != first
+    assert '<td class="svc-status">running</td>' in second
+
+
+def test_device_change_rerenders_option_lists(app_module):
+    fragments, manager = app_module.fragments, app_module.manager
+    app_module.render_service_toggles(manager)
+    misses = fragments.misses
+
+    manager._bump_version("sdr_devices")
+    manager._publish_snapshot()
+    app_module.render_service_toggles(manager)
+    # both rows, the adsb options (selected) and the ais options (none)
+    assert fragments.misses == misses + 4
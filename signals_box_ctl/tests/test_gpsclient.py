@@ -0,0 +1,165 @@
+"""GpsdClient against a scripted gpsd socket."""
+import json
+import queue
+import socket
+import threading
+import time
+
+import pytest
+
+from gpsclient import GpsdClient, GpsFixHistory
+
+VERSION = {"class": "VERSION", "release": "3.25", "proto_major": 3, "proto_minor": 15}
+SKY = {"class": "SKY", "hdop": 0.9, "nSat": 12, "uSat": 8}
+NO_FIX = {"class": "TPV", "mode": 1}
+
+
+def _tpv(second, lat, lon, mode=3):
+    return {"class": "TPV", "mode": mode, "time": f"2024-05-01T12:00:{second:02d}.000Z",
+            "lat": lat, "lon": lon, "altHAE": 250.5, "speed": 1.5}
+
+
+def _lines(*reports):
+    return b"".join(json.dumps(report).encode() + b"\n" for report in reports)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+class FakeGpsd:
+    """Listens on a local port and hands over each client connection once it sent ?WATCH."""
+
+    def __init__(self):
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        self.watches = []
+        self._connections = queue.Queue()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _addr = self.listener.accept()
+            except OSError:
+                return
+            self.watches.append(conn.makefile("rb").readline())
+            self._connections.put(conn)
+
+    def connection(self, timeout=5.0):
+        return self._connections.get(timeout=timeout)
+
+    def pending(self):
+        return self._connections.qsize()
+
+    def close(self):
+        self.listener.close()
+
+
+@pytest.fixture
+def gpsd():
+    server = FakeGpsd()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def watch(gpsd):
+    """Start a GpsdClient on the fake gpsd with the given class settings overridden."""
+    started = []
+
+    def start(**settings):
+        fixes = []
+        gps = GpsdClient(port=gpsd.port, history=4, on_fix=lambda *fix: fixes.append(fix))
+        gps.RECONNECT_MIN = 0.05
+        for name, value in settings.items():
+            setattr(gps, name, value)
+        gps.fixes = fixes
+        gps.start()
+        started.append(gps)
+        return gps
+
+    yield start
+    for gps in started:
+        gps.close()
+        gps._thread.join(5)
+
+
+@pytest.fixture
+def client(watch):
+    return watch()
+
+
+def test_reports_fill_status_and_history(gpsd, client):
+    conn = gpsd.connection()
+    assert gpsd.watches == [b'?WATCH={"enable":true,"json":true};\n']
+    _wait_for(lambda: client.connected)
+    assert client.status()["state"] == "no_fix"
+
+    data = _lines(VERSION, SKY, _tpv(0, 51.5, -0.12), NO_FIX) + b"{not json\n" + _lines(_tpv(1, 51.6, -0.13))
+    conn.sendall(data[:50])
+    conn.sendall(data[50:])  # a report split across reads
+    _wait_for(lambda: len(client.history) == 2)
+
+    status = client.status()
+    assert status["state"] == "fix_3d"
+    assert (status["lat"], status["lon"], status["alt"], status["speed"]) == (51.6, -0.13, 250.5, 1.5)
+    assert (status["sats"], status["sats_used"], status["hdop"]) == (12, 8, 0.9)
+    history = client.history.columns()
+    assert history["lat"] == [51.5, 51.6]
+    assert history["mode"] == [3, 3]
+    assert history["time"][1] - history["time"][0] == 1.0
+    assert [fix[1] for fix in client.fixes] == [51.5, 51.6]
+    conn.close()
+
+
+def test_reconnects_after_gpsd_goes_away(gpsd, client):
+    conn = gpsd.connection()
+    conn.sendall(_lines(SKY, _tpv(0, 51.5, -0.12)))
+    _wait_for(lambda: client.status()["state"] == "fix_3d")
+    conn.close()
+
+    conn = gpsd.connection()
+    _wait_for(lambda: client.connected and not client.tpv)
+    assert client.status()["state"] == "no_fix"  # nothing carried over from the old connection
+    conn.sendall(_lines(_tpv(5, 51.7, -0.14, mode=2)))
+    _wait_for(lambda: len(client.history) == 2)
+
+    status = client.status()
+    assert (status["state"], status["lat"], status["alt"]) == ("fix_2d", 51.7, None)
+    assert len(gpsd.watches) == 2
+    conn.close()
+
+
+def test_quiet_gpsd_is_no_fix_not_a_disconnect(gpsd, watch):
+    gps = watch(READ_TIMEOUT=0.1)
+    conn = gpsd.connection()
+    conn.sendall(_lines(SKY, _tpv(0, 51.5, -0.12)))
+    _wait_for(lambda: gps.status()["state"] == "fix_3d")
+
+    _wait_for(lambda: gps.status()["state"] == "no_fix")
+    time.sleep(0.3)  # several read timeouts
+    assert gps.connected
+    assert gps.status()["state"] == "no_fix"
+    assert gpsd.pending() == 0  # no reconnect
+
+    conn.sendall(_lines(_tpv(1, 51.6, -0.13)))
+    _wait_for(lambda: gps.status()["state"] == "fix_3d")
+    conn.close()
+
+
+def test_history_wraps_and_filters():
+    history = GpsFixHistory(3)
+    for second in range(5):
+        history.append(100.0 + second, 50.0 + second, 0.0, None, 2.0, 2)
+
+    columns = history.columns()
+    assert len(history) == 3
+    assert columns["time"] == [102.0, 103.0, 104.0]
+    assert columns["alt"] == [None, None, None]
+    assert history.columns(since=102.5)["lat"] == [53.0, 54.0]
+    assert history.columns(last=1)["lat"] == [54.0]
@@ -0,0 +1,101 @@
+"""GPS track day files: lookups, interpolation and crash recovery."""
+from datetime import datetime, timezone
+
+import pytest
+
+from gpstrack import MAGIC, RECORD, TrackFile, TrackRecorder
+
+T0 = datetime(2026, 3, 1, 23, 59, 0, tzinfo=timezone.utc).timestamp()  # one minute before midnight UTC
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    track = TrackRecorder(str(tmp_path), min_interval=1.0, max_gap=30.0)
+    yield track
+    track.close()
+
+
+def test_bisect_and_between(recorder):
+    times = [T0 - 50 + 10 * i for i in range(5)]  # all on 1 March
+    for n, when in enumerate(times):
+        assert recorder.record(when, 51.0 + n, -1.0)
+    assert not recorder.record(times[-1] + 0.5, 0, 0)  # closer than min_interval
+    assert not recorder.record(times[0], 0, 0)  # going back in time
+    recorder.flush()
+
+    with TrackFile(recorder.path_for("20260301")) as track:
+        assert track.count == 5
+        assert track.bisect(times[0] - 1) == 0
+        assert track.bisect(times[2]) == 3  # bisect_right: past an equal time
+        assert track.bisect(times[2] + 1) == 3
+        assert track.bisect(times[-1] + 1) == 5
+        assert [p.time for p in track.between(times[1], times[3])] == times[1:4]
+        assert track[0].alt is None and track[0].speed is None
+        with pytest.raises(IndexError):
+            track[5]  # pylint: disable=pointless-statement
+
+
+def test_position_interpolated_between_fixes(recorder):
+    recorder.record(T0 - 30, 50.0, 10.0, alt=100.0, speed=2.0, mode=3)
+    recorder.record(T0 - 20, 51.0, 12.0, alt=200.0, speed=4.0, mode=2)
+
+    position = recorder.position_at(T0 - 27.5)
+    assert position['interpolated'] is True
+    assert position['time'] == T0 - 27.5
+    assert (position['lat'], position['lon'], position['alt']) == pytest.approx((50.25, 10.5, 125.0))
+    assert (position['speed'], position['mode']) == (2.0, 2)
+
+    exact = recorder.position_at(T0 - 20)
+    assert exact['lat'] == pytest.approx(51.0)
+
+
+def test_position_outside_max_gap(recorder):
+    recorder.record(T0 - 110, 50.0, 10.0)
+    recorder.record(T0 - 40, 51.0, 11.0)
+
+    # 70 s between fixes: 25 s after the first is within max_gap of it only
+    position = recorder.position_at(T0 - 85)
+    assert (position['lat'], position['interpolated']) == (50.0, False)
+    assert recorder.position_at(T0 - 75) is None  # 35 s from both
+    assert recorder.position_at(T0 - 45)['lat'] == 51.0
+    assert recorder.position_at(T0 - 9) is None  # after the last fix by more than max_gap
+    assert recorder.position_at(T0 - 200) is None
+
+
+def test_lookups_across_midnight(recorder, tmp_path):
+    recorder.record(T0 + 50, 50.0, 10.0)  # 23:59:50
+    recorder.record(T0 + 70, 52.0, 10.0)  # 00:00:10 the next day
+    recorder.flush()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["track-20260301.sbt", "track-20260302.sbt"]
+
+    assert [p.lat for p in recorder.points(T0, T0 + 120)] == [50.0, 52.0]
+    assert recorder.position_at(T0 + 60)['lat'] == pytest.approx(51.0)
+    assert recorder.position_at(T0 + 55)['lat'] == pytest.approx(50.5)
+
+
+def test_torn_record_dropped_on_reopen(tmp_path):
+    first = TrackRecorder(str(tmp_path))
+    first.record(T0 - 20, 50.0, 10.0)
+    first.record(T0 - 10, 51.0, 10.0)
+    first.close()
+    path = tmp_path / "track-20260301.sbt"
+    with open(path, "ab") as handle:
+        handle.write(b"\x01" * (RECORD.size // 2))  # a crash mid-write
+
+    with TrackFile(str(path)) as track:
+        assert track.count == 2  # the partial record is not read
+
+    second = TrackRecorder(str(tmp_path))
+    second.record(T0, 52.0, 10.0)
+    second.close()
+    assert path.stat().st_size == len(MAGIC) + 3 * RECORD.size
+    with TrackFile(str(path)) as track:
+        assert [p.lat for p in track.between(T0 - 60, T0)] == [50.0, 51.0, 52.0]
+
+
+def test_foreign_file_is_ignored(tmp_path):
+    path = tmp_path / "track-20260301.sbt"
+    path.write_bytes(b"not a track" * 10)
+    with TrackFile(str(path)) as track:
+        assert track.count == 0
+        assert list(track.between(0, T0)) == []
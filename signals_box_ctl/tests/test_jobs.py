@@ -0,0 +1,74 @@
+"""jobs: per-key ordering and merging of queued actions."""
+import threading
+
+import pytest
+
+from jobs import JobQueue
+
+
+@pytest.fixture
+def queue():
+    jobs = JobQueue(workers=2)
+    yield jobs
+    jobs.close()
+
+
+def _blocker(queue, key):
+    """Submit a job that holds *key*'s worker until the returned event is set."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    queue.submit(key, 'block', block)
+    assert started.wait(5)
+    return release
+
+
+def test_start_stop_start_keeps_order(queue):
+    ran = []
+    release = _blocker(queue, 'service:adsb')
+
+    first = queue.submit('service:adsb', 'start', ran.append, 'start')
+    stop = queue.submit('service:adsb', 'stop', ran.append, 'stop')
+    last = queue.submit('service:adsb', 'start', ran.append, 'start')
+    release.set()
+    assert last.wait(5)
+
+    assert ran == ['start', 'stop', 'start']
+    assert len({first.id, stop.id, last.id}) == 3
+
+
+def test_repeat_of_last_queued_action_is_merged(queue):
+    ran = []
+    release = _blocker(queue, 'service:adsb')
+
+    stop = queue.submit('service:adsb', 'stop', ran.append, 'stop')
+    start = queue.submit('service:adsb', 'start', ran.append, 'start')
+    again = queue.submit('service:adsb', 'start', ran.append, 'start')
+    release.set()
+    assert start.wait(5)
+
+    assert again is start
+    assert stop is not start
+    assert ran == ['stop', 'start']
+
+
+def test_keys_run_independently(queue):
+    release = _blocker(queue, 'service:adsb')
+    other = queue.submit('service:ais', 'start', lambda: 'ok')
+
+    assert other.wait(5)
+    assert (other.state, other.result) == ('done', 'ok')
+    release.set()
+
+
+def test_failure_is_recorded(queue):
+    def fail():
+        raise RuntimeError("unit failed")
+
+    job = queue.submit('service:adsb', 'start', fail)
+    assert job.wait(5)
+    assert (job.state, job.error) == ('failed', 'unit failed')
@@ -0,0 +1,152 @@
+"""KismetStatus against a stand-in Kismet REST server."""
+import base64
+import json
+import threading
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from services import KismetStatus
+
+SOURCES = [
+    {'kismet.datasource.capture_interface': 'rtl433-0', 'kismet.datasource.running': 1,
+     'kismet.datasource.driver.type': 'rtl433', 'kismet.datasource.uuid': 'uuid-0'},
+    {'kismet.datasource.capture_interface': 'rtladsb-2', 'kismet.datasource.running': 0,
+     'kismet.datasource.driver.type': 'rtladsb', 'kismet.datasource.uuid': 'uuid-2'},
+    {'kismet.datasource.capture_interface': 'wlan1', 'kismet.datasource.running': 1,
+     'kismet.datasource.driver.type': 'linuxwifi', 'kismet.datasource.uuid': 'uuid-w'},
+]
+
+
+class FakeKismet(ThreadingHTTPServer):
+    """Basic auth on /session/check_session sets the KISMET cookie, which the datasource call requires."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _KismetHandler)
+        self.auth = 'Basic ' + base64.b64encode(b'kismet:secret').decode()
+        self.token = None
+        self.logins = 0
+        self.queries = []
+        self.connections = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def expire(self):
+        """Forget the session, as a restarted Kismet would."""
+        self.token = None
+
+
+class _KismetHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        if self.path != '/session/check_session':
+            return self._reply(404)
+        if self.headers.get('Authorization') != self.server.auth:
+            return self._reply(401)
+        self.server.logins += 1
+        self.server.token = f"token{self.server.logins}"
+        return self._reply(200, {'session': 'ok'}, cookie=self.server.token)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        if self.path != '/datasource/all_sources.json':
+            return self._reply(404)
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        if self.server.token is None or 'KISMET' not in cookie or cookie['KISMET'].value != self.server.token:
+            return self._reply(401)
+        self.server.queries.append(json.loads(parse_qs(body)['json'][0]))
+        return self._reply(200, SOURCES)
+
+    def _reply(self, status, payload=None, cookie=None):
+        body = json.dumps(payload if payload is not None else {}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if cookie:
+            self.send_header('Set-Cookie', f"KISMET={cookie}; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def kismet():
+    server = FakeKismet()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(kismet):
+    status = KismetStatus('kismet', 'secret', base_url=kismet.url + '/')
+    yield status
+    status.close()
+
+
+def test_refresh_builds_tables(kismet, client):
+    assert client.get_active_datasources()
+
+    assert client.datasources['rtl433-0'] == {
+        'is_running': True, 'data_type': 'rtl433', 'driver_info': 'rtl433', 'sdr_id': 0, 'uuid': 'uuid-0',
+    }
+    assert client.datasources['wlan1']['sdr_id'] == -1
+    assert client.lookup_by_sdr_id(0) == 'rtl433'
+    assert client.lookup_by_sdr_id(2) == 'rtladsb'
+    assert client.lookup_by_sdr_id(1) is None
+
+
+def test_session_is_reused(kismet, client):
+    for _ in range(3):
+        assert client.get_active_datasources()
+
+    assert kismet.logins == 1
+    assert len(kismet.queries) == 3
+    assert kismet.connections == 1
+
+
+def test_request_asks_only_for_used_fields(kismet, client):
+    client.get_active_datasources()
+    assert kismet.queries == [{'fields': KismetStatus._FIELDS}]
+
+
+def test_logs_in_again_on_401(kismet, client):
+    assert client.get_active_datasources()
+    kismet.expire()
+    assert client.get_active_datasources()
+
+    assert kismet.logins == 2
+    assert len(kismet.queries) == 2
+
+
+def test_bad_credentials_back_off_and_keep_table(kismet, client):
+    assert client.get_active_datasources()
+    kismet.expire()
+    client.password = 'wrong'
+
+    assert not client.get_active_datasources()
+    assert client.lookup_by_sdr_id(0) == 'rtl433'  # previous table kept
+    # Backing off: no further requests until the retry time
+    assert not client.get_active_datasources()
+    assert kismet.logins == 1
+    assert len(kismet.queries) == 1
+
+    client.password = 'secret'
+    client._retry_at = 0
+    assert client.get_active_datasources()
+    assert kismet.logins == 2
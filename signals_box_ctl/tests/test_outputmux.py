@@ -0,0 +1,122 @@
+"""OutputMultiplexer reading service pipes into per-service rings."""
+import logging
+import os
+import time
+
+import pytest
+
+from outputmux import OutputBuffer, OutputMultiplexer
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def mux():
+    return OutputMultiplexer()
+
+
+@pytest.fixture
+def attach(mux):
+    """Attach a fresh pipe as a service's stdout; returns its write end."""
+    writers = []
+
+    def attach_pipe(svc_id, **kwargs):
+        read_fd, write_fd = os.pipe()
+        mux.attach(svc_id, stdout=os.fdopen(read_fd, "rb"), **kwargs)
+        writers.append(write_fd)
+        return write_fd
+
+    yield attach_pipe
+    for fd in writers:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+def _texts(mux, svc_id, **kwargs):
+    return [line.text for line in mux.tail(svc_id, **kwargs)[0]]
+
+
+def test_lines_reassembled_across_reads(mux, attach):
+    fd = attach("rtl433")
+    os.write(fd, b"hel")
+    time.sleep(0.05)
+    assert _texts(mux, "rtl433") == []  # no newline yet
+    os.write(fd, b"lo\r\nwor")
+    os.write(fd, b"ld\n\n")
+    assert _wait_for(lambda: len(_texts(mux, "rtl433")) == 3)
+    assert _texts(mux, "rtl433") == ["hello", "world", ""]
+    assert {line.stream for line in mux.tail("rtl433")[0]} == {"stdout"}
+
+
+def test_overlong_line_split(mux, attach):
+    fd = attach("rtl433")
+    os.write(fd, b"x" * (mux.MAX_LINE + 10) + b"\n")
+    assert _wait_for(lambda: len(_texts(mux, "rtl433")) == 2)
+    assert [len(text) for text in _texts(mux, "rtl433")] == [mux.MAX_LINE, 10]
+
+
+def test_ring_size_per_service(mux, attach):
+    small, large = attach("small", max_lines=3), attach("large")
+    os.write(small, b"".join(b"%d\n" % n for n in range(1, 6)))
+    os.write(large, b"".join(b"%d\n" % n for n in range(1, 6)))
+    assert _wait_for(lambda: mux.tail("small")[1] == 5 and mux.tail("large")[1] == 5)
+
+    assert _texts(mux, "small") == ["3", "4", "5"]
+    assert _texts(mux, "large") == ["1", "2", "3", "4", "5"]
+
+
+def test_since_sequence_numbers():
+    buf = OutputBuffer(max_lines=4)
+    for n in range(6):
+        buf.append("stdout", str(n))
+    assert buf.last_seq == 6
+    assert [line.seq for line in buf.tail()] == [3, 4, 5, 6]  # 1 and 2 fell out of the ring
+    assert [line.text for line in buf.tail(since=4)] == ["4", "5"]
+    assert buf.tail(since=6) == []
+    assert [line.seq for line in buf.tail(lines=1, since=0)] == [6]
+    assert buf.tail(lines=0) == []
+
+
+def test_partial_line_flushed_at_eof(mux, attach):
+    fd = attach("rtl433")
+    os.write(fd, b"first\nlast words")
+    os.close(fd)
+    assert _wait_for(lambda: _texts(mux, "rtl433") == ["first", "last words"])
+    # the pipe is dropped from the selector once it reached EOF
+    assert _wait_for(lambda: len(mux._selector.get_map()) == 1)  # just the wake pipe
+
+
+def test_unregister_forgets_service(mux, attach):
+    fd = attach("rtl433")
+    os.write(fd, b"one\n")
+    assert _wait_for(lambda: _texts(mux, "rtl433") == ["one"])
+    assert "rtl433" in mux._limits
+
+    mux.unregister("rtl433")
+    assert mux.tail("rtl433") == ([], 0)
+    assert "rtl433" not in mux._limits and "rtl433" not in mux._buffers
+
+    os.write(fd, b"late\n")  # a straggler on the old pipe is dropped
+    os.close(fd)
+    assert _wait_for(lambda: len(mux._selector.get_map()) == 1)
+    assert mux.tail("rtl433") == ([], 0)
+
+
+def test_log_rate_limited(mux, attach, caplog):
+    mux.LOG_BURST, mux.LOG_RATE = 2, 0.001
+    fd = attach("chatty")
+    with caplog.at_level(logging.INFO, logger="outputmux"):
+        os.write(fd, b"a\nb\nc\nd\n")
+        assert _wait_for(lambda: mux.tail("chatty")[1] == 4)
+    assert [r.getMessage() for r in caplog.records] == ["[chatty] a", "[chatty] b"]
+    assert mux._limits["chatty"].dropped == 2
+    assert _texts(mux, "chatty") == ["a", "b", "c", "d"]  # the ring keeps every line
@@ -0,0 +1,161 @@
+"""pagersink: multimon-ng parsing and delivery to a stand-in Pagermon server."""
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pagersink import PagermonClient, PagerSink, Spool, parse_line
+
+# Recorded multimon-ng output (-a POCSAG* -a FLEX -a FLEX_NEXT -a EAS -f alpha)
+MULTIMON_OUTPUT = """\
+multimon-ng 1.3.0
+  (C) 1996/1997 by Tom Sailer HB9JNX/AE4WA
+Enabled demodulators: POCSAG512 POCSAG1200 POCSAG2400 FLEX FLEX_NEXT EAS
+POCSAG1200: Address:  123456  Function: 3  Alpha:   MEDIC 12 RESPOND STATION 4<NUL><NUL>
+POCSAG1200: Address:  123456  Function: 3  Alpha:   MEDIC 12 RESPOND STATION 4<NUL><NUL>
+POCSAG512: Address:    2001  Function: 0  Numeric: 5551234
+FLEX|2024-05-01 12:00:00|1600/2/K/A|05.120|001234567|ALN|CALL DISPATCH
+FLEX_NEXT|2024-05-01 12:00:01|1600/2/K/A|05.121|000000042 000000043|NUM|8675309
+FLEX: 2024-05-01 12:00:02 1600/2/A 05.122 [001234568] ALN ENGINE 7 TONE OUT
+FLEX|2024-05-01 12:00:03|1600/2/K/A|05.123|001234569|SPN|not a page
+EAS: ZCZC-WXR-TOR-029037+0030-1051700-KEAX/NWS-
+POCSAG1200: Address:  999999  Function: 0  Alpha:   <EOT>
+"""
+
+
+def test_parse_recorded_output():
+    messages = [parse_line(line, now=100.0) for line in MULTIMON_OUTPUT.splitlines()]
+    decoded = [(m.protocol, m.address, m.message) for m in messages if m is not None]
+    assert decoded == [
+        ('POCSAG1200', '123456', 'MEDIC 12 RESPOND STATION 4'),
+        ('POCSAG1200', '123456', 'MEDIC 12 RESPOND STATION 4'),
+        ('POCSAG512', '2001', '5551234'),
+        ('FLEX', '1234567', 'CALL DISPATCH'),
+        ('FLEX_NEXT', '42', '8675309'),
+        ('FLEX', '1234568', 'ENGINE 7 TONE OUT'),
+        ('EAS', 'WXR', 'ZCZC-WXR-TOR-029037+0030-1051700-KEAX/NWS-'),
+        ('POCSAG1200', '999999', ''),
+    ]
+
+
+class FakePagermon(ThreadingHTTPServer):
+    """Records POST /api/messages bodies; ``statuses`` scripts the answers, 200 once exhausted."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _PagermonHandler)
+        self.received = []
+        self.statuses = []
+        self.apikeys = set()
+        self.connections = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def addresses(self):
+        return [body['address'] for body in self.received]
+
+
+class _PagermonHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.apikeys.add(self.headers.get('apikey'))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        if status == 200:
+            self.server.received.append(body)
+        reply = b'{}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def pagermon():
+    server = FakePagermon()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sink(pagermon, tmp_path):
+    return PagerSink(PagermonClient(pagermon.url, 'secret'), Spool(str(tmp_path / 'spool')),
+                     source='test', batch_size=20, batch_interval=0.05)
+
+
+def _page(address):
+    return {'address': address, 'message': f'page {address}', 'datetime': 0, 'source': 'test'}
+
+
+def test_feed_delivers_deduplicated_pages(pagermon, sink):
+    sender = threading.Thread(target=sink.run_sender)
+    sender.start()
+    sink.feed(io.StringIO(MULTIMON_OUTPUT))
+    sender.join(timeout=10)
+
+    assert pagermon.addresses() == ['123456', '2001', '1234567', '42', '1234568', 'WXR', '999999']
+    assert pagermon.received[0] == {'address': '123456', 'message': 'MEDIC 12 RESPOND STATION 4',
+                                    'datetime': pagermon.received[0]['datetime'], 'source': 'test'}
+    assert pagermon.apikeys == {'secret'}
+    assert pagermon.connections == 1
+    assert len(sink.spool) == 0
+
+
+def test_partial_batch_failure_spools_the_rest(pagermon, sink):
+    pagermon.statuses = [200, 503]
+    sink._deliver([_page('0'), _page('1'), _page('2')])
+
+    assert pagermon.addresses() == ['0']
+    assert [item['address'] for item in sink.spool.peek(10)] == ['1', '2']
+
+    # Once the retry time has passed the spool is replayed ahead of new pages
+    sink._retry_at = 0
+    sink._deliver([_page('3')])
+    assert pagermon.addresses() == ['0', '1', '2', '3']
+    assert len(sink.spool) == 0
+
+
+def test_partial_spool_replay_keeps_order(pagermon, sink):
+    sink.spool.append([_page('0'), _page('1'), _page('2')])
+    pagermon.statuses = [200, 500]
+    sink._deliver([_page('3')])
+
+    assert pagermon.addresses() == ['0']
+    assert [item['address'] for item in sink.spool.peek(10)] == ['1', '2', '3']
+
+    sink._retry_at = 0
+    sink._deliver([])
+    assert pagermon.addresses() == ['0', '1', '2', '3']
+
+
+def test_rejected_message_is_dropped_not_retried(pagermon, sink):
+    pagermon.statuses = [400]
+    sink._deliver([_page('bad'), _page('good')])
+
+    assert pagermon.addresses() == ['good']
+    assert len(sink.spool) == 0
+
+
+def test_unreachable_server_spools_everything(tmp_path):
+    client = PagermonClient('http://127.0.0.1:9', 'secret')  # discard port, nothing listens
+    sink = PagerSink(client, Spool(str(tmp_path / 'spool')))
+    sink._deliver([_page('0'), _page('1')])
+
+    assert [item['address'] for item in sink.spool.peek(10)] == ['0', '1']
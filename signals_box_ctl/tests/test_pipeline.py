@@ -0,0 +1,67 @@
+"""PipelineRelay copying between stage pipes and shutting down."""
+import os
+
+import pytest
+
+from pipeline import PipelineRelay, _Link
+
+
+@pytest.fixture
+def pipes():
+    """(upstream write end, relay link, downstream read end)."""
+    up_r, up_w = os.pipe()
+    down_r, down_w = os.pipe()
+    yield up_w, _Link(up_r, down_w, 'rtl_fm', 'multimon-ng', 0), down_r
+    for fd in (up_w, down_r):
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+def _read_all(fd):
+    chunks = []
+    while True:
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+
+
+def test_relay_copies_until_eof(pipes):
+    up_w, link, down_r = pipes
+    relay = PipelineRelay('pagers', [link], on_stall=lambda link: None)
+    relay.start()
+
+    os.write(up_w, b'line one\nline two\n')
+    os.close(up_w)
+    assert _read_all(down_r) == b'line one\nline two\n'  # EOF once upstream closed
+
+    assert (link.bytes, link.lines) == (18, 2)
+    relay.stop()
+    relay._thread.join(5)
+    assert not relay._thread.is_alive()
+
+
+def test_stop_after_relay_closed_leaves_reused_fds_alone(pipes):
+    _up_w, link, _down_r = pipes
+    relay = PipelineRelay('pagers', [link], on_stall=lambda link: None)
+    relay.TICK = 0.01
+    wake_w = relay._wake_w
+    relay.start()
+    relay._stopping = True  # the relay thread finishes and closes its wake pipe on its own
+    relay._thread.join(5)
+
+    # Another file opened meanwhile gets the wake pipe's write end number
+    reuse_r, reuse_w = os.pipe()
+    os.dup2(reuse_w, wake_w)
+    os.close(reuse_w)
+    try:
+        relay.stop()
+        relay.stop()
+        os.set_blocking(reuse_r, False)
+        with pytest.raises(BlockingIOError):
+            os.read(reuse_r, 1)
+    finally:
+        os.close(reuse_r)
+        os.close(wake_w)
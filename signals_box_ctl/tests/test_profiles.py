@@ -0,0 +1,237 @@
+"""Profile validation, the dependency graph runner and profile up/down."""
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+
+import pytest
+
+from conftest import SDR_IDS
+from profiles import compile_profiles, find_cycle, run_graph
+from servicedefs import compile_services
+
+
+@pytest.fixture
+def pool():
+    executor = ThreadPoolExecutor(max_workers=4)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def _graph(**needs):
+    return {node: frozenset(deps) for node, deps in needs.items()}
+
+
+def test_find_cycle():
+    assert find_cycle(_graph(a=[], b=["a"], c=["a", "b"])) is None
+    assert find_cycle(_graph(a=["c"], b=["a"], c=["b"], d=[])) == ["a", "b", "c"]
+    # Nodes waiting on a cycle cannot run either and are reported with it
+    assert find_cycle(_graph(a=["b"], b=["a"], c=["a"])) == ["a", "b", "c"]
+
+
+def test_run_graph_order(pool):
+    log, lock = [], threading.Lock()
+
+    def step(node):
+        with lock:
+            log.append(("start", node))
+        time.sleep(0.02)
+        with lock:
+            log.append(("end", node))
+        return {"result": "done"}
+
+    depends = _graph(gps=[], db=[], web=["db"], decoder=["web", "gps"])
+    reports = run_graph(pool, depends, step)
+
+    assert sorted(report["node"] for report in reports) == sorted(depends)
+    for node, needs in depends.items():
+        for need in needs:
+            assert log.index(("end", need)) < log.index(("start", node))
+    assert reports[-1]["node"] == "decoder"
+    assert all(report["waited"] >= 0 and report["elapsed"] >= 0.02 for report in reports)
+
+
+def test_run_graph_runs_independent_steps_together(pool):
+    barrier = threading.Barrier(3, timeout=5)
+
+    def step(_node):
+        barrier.wait()  # breaks, and fails the step, unless all three run at once
+        return {"result": "done"}
+
+    reports = run_graph(pool, _graph(a=[], b=[], c=[]), step)
+    assert [report["result"] for report in reports] == ["done"] * 3
+
+
+def test_run_graph_blocks_dependents_of_failures(pool, caplog):
+    ran = []
+
+    def step(node):
+        ran.append(node)
+        if node == "db":
+            raise RuntimeError("unit not found")
+        return {"result": "done"}
+
+    depends = _graph(db=[], web=["db"], decoder=["web"], gps=[])
+    with caplog.at_level(logging.ERROR, logger="profiles"):
+        reports = {report["node"]: report for report in run_graph(pool, depends, step)}
+
+    assert sorted(ran) == ["db", "gps"]
+    assert reports["db"]["result"] == "failed" and reports["db"]["error"] == "unit not found"
+    assert reports["web"] == dict(reports["web"], result="blocked", error="depends on db")
+    assert reports["decoder"]["error"] == "depends on web"
+    assert reports["gps"]["result"] == "done"
+
+    # Without stop_on_failure everything runs, e.g. when stopping
+    ran.clear()
+    reports = run_graph(pool, depends, step, stop_on_failure=False)
+    assert sorted(ran) == sorted(depends)
+
+
+def test_run_graph_rejects_unsatisfiable_dependencies(pool):
+    with pytest.raises(ValueError, match="Unsatisfiable dependencies among a, b"):
+        run_graph(pool, _graph(a=["b"], b=["a"]), lambda node: {"result": "done"})
+    with pytest.raises(ValueError, match="among a"):
+        run_graph(pool, _graph(a=["missing"]), lambda node: {"result": "done"})
+
+
+SERVICES = {
+    "gps": {"type": "systemd", "description": "GPS", "system_ctl_name": "gpsd.service"},
+    "kismet": {"type": "systemd", "description": "Kismet", "system_ctl_name": "kismet.service"},
+    "adsb": {"type": "systemd", "description": "ADS-B", "system_ctl_name": "dump1090-fa.service",
+             "require_sdr": True},
+}
+
+
+def test_compile_profiles(caplog):
+    services = compile_services(SERVICES)
+    with caplog.at_level(logging.ERROR, logger="profiles"):
+        profiles = compile_profiles({
+            "wardrive": {"services": ["gps", "kismet", "gps", "nope"],
+                         "sdrs": {"kismet": "1234", "adsb": "1234"},
+                         "depends": {"kismet": "gps", "gps": ["adsb", "gps"]}},
+            "loop": {"services": ["gps", "kismet"], "depends": {"gps": ["kismet"], "kismet": ["gps"]}},
+            "flat": {"services": "gps"},
+            "planes": {"services": ["adsb"], "sdrs": {"adsb": ["1234", 5678]}},
+        }, services)
+
+    assert sorted(profiles) == ["planes", "wardrive"]
+    wardrive = profiles["wardrive"]
+    assert wardrive.services == ("gps", "kismet")
+    assert dict(wardrive.sdrs) == {}
+    assert dict(wardrive.depends) == {"gps": frozenset(), "kismet": frozenset({"gps"})}
+    assert wardrive.reverse_depends() == {"gps": frozenset({"kismet"}), "kismet": frozenset()}
+    assert dict(profiles["planes"].sdrs) == {"adsb": ("1234", "5678")}
+    for message in ("unknown service 'nope'", "assigns SDRs to 'kismet'", "assigns SDRs to 'adsb'",
+                    "gps -> adsb", "gps -> gps", "'loop' has a dependency cycle among gps, kismet",
+                    "'flat' needs a 'services' list"):
+        assert message in caplog.text
+
+
+CONFIG = SDR_IDS + """\
+services:
+    gps:
+        system_ctl_name: gpsd.service
+        type: systemd
+        description: GPS
+    kismet:
+        system_ctl_name: kismet.service
+        type: systemd
+        description: Kismet
+    adsb:
+        system_ctl_name: dump1090-fa.service
+        type: systemd
+        description: ADS-B
+        require_sdr: true
+    decoder:
+        system_ctl_name: decoder.service
+        type: systemd
+        description: Decoder
+profiles:
+    wardrive:
+        services: [gps, kismet]
+        depends:
+            kismet: [gps]
+    planes:
+        services: [gps, adsb, decoder]
+        sdrs:
+            adsb: '00000001'
+        depends:
+            decoder: [adsb]
+"""
+
+
+@pytest.fixture
+def manager(make_manager, systemd):
+    systemd.calls = []
+    start, stop = systemd.start_service, systemd.stop_service
+
+    def recorded(action, call):
+        def run(name):
+            systemd.calls.append((action, name))
+            return call(name)
+        return run
+
+    systemd.start_service = recorded("start", start)
+    systemd.stop_service = recorded("stop", stop)
+    return make_manager(CONFIG)
+
+
+def test_profile_up_and_down(manager, systemd):
+    report = manager.profile_up("wardrive")
+    assert report["ok"] and manager.active_profile == "wardrive"
+    assert systemd.calls == [("start", "gpsd.service"), ("start", "kismet.service")]
+    assert [(step["action"], step["node"]) for step in report["steps"]] == [("start", "gps"), ("start", "kismet")]
+    assert manager.profile_reports["wardrive"] is report
+
+    for unit in ("gpsd.service", "kismet.service"):
+        systemd.units[unit] = "active"
+    systemd.calls.clear()
+    again = manager.profile_up("wardrive")
+    assert systemd.calls == [] and {step["result"] for step in again["steps"]} == {"skipped"}
+
+    down = manager.profile_down("wardrive")
+    assert down["ok"] and manager.active_profile is None
+    assert systemd.calls == [("stop", "kismet.service"), ("stop", "gpsd.service")]
+
+
+def test_profile_up_assigns_sdrs(manager):
+    report = manager.profile_up("planes")
+    assert report["ok"]
+    assert list(manager._as_serials(manager.service_state["adsb"].selected_sdr)) == ["00000001"]
+    adsb = next(step for step in report["steps"] if step["node"] == "adsb")
+    assert adsb["sdrs"] == ["00000001"]
+
+
+def test_failed_start_blocks_dependents(manager, systemd):
+    systemd.fail_start = True
+    report = manager.profile_up("planes")
+    steps = {step["node"]: step for step in report["steps"]}
+    assert not report["ok"] and manager.active_profile is None
+    assert steps["adsb"]["result"] == "failed"
+    assert steps["decoder"] == dict(steps["decoder"], result="blocked", action="start", error="depends on adsb")
+
+
+def test_exclusive_up_stops_other_profiles_first(manager, systemd):
+    for unit in ("gpsd.service", "kismet.service"):
+        systemd.units[unit] = "active"
+    manager.refresh_services()
+    systemd.calls.clear()
+
+    report = manager.profile_up("planes", exclusive=True)
+    assert report["ok"] and manager.active_profile == "planes"
+    # kismet is stopped before anything starts; gps is shared and keeps running
+    assert systemd.calls[0] == ("stop", "kismet.service")
+    assert ("stop", "gpsd.service") not in systemd.calls
+    assert systemd.calls.index(("start", "dump1090-fa.service")) < systemd.calls.index(("start", "decoder.service"))
+    assert [step["action"] for step in report["steps"]][0] == "stop"
+
+
+def test_one_profile_change_at_a_time(manager):
+    manager._profile_lock.acquire()
+    try:
+        with pytest.raises(RuntimeError, match="Another profile change is in progress"):
+            manager.profile_up("wardrive")
+    finally:
+        manager._profile_lock.release()
+    with pytest.raises(KeyError):
+        manager.profile_down("nope")
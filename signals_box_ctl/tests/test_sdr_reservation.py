@@ -0,0 +1,89 @@
+"""SDR reservations held by SignalsManager while a service starts."""
+import pytest
+
+from conftest import SDR_IDS
+from sdralloc import SdrConflict
+
+CONFIG = SDR_IDS + """\
+services:
+    adsb:
+        system_ctl_name: dump1090-fa.service
+        type: systemd
+        description: ADS-B
+        require_sdr: true
+    ais:
+        system_ctl_name: ais-catcher.service
+        type: systemd
+        description: AIS
+        require_sdr: true
+"""
+
+
+@pytest.fixture
+def manager(make_manager):
+    return make_manager(CONFIG)
+
+
+def test_reservation_outlives_the_start_call(manager, systemd):
+    assert manager.start_service("adsb") == "unknown"  # still activating
+
+    with pytest.raises(SdrConflict) as conflict:
+        manager.start_service("ais")
+    assert "in use: 00000001 by adsb" in conflict.value.conflicts["ais"]
+
+    systemd.units["dump1090-fa.service"] = "active"
+    manager.refresh_services("systemd")
+    assert manager.service_state["adsb"].status == "running"
+    assert "adsb" not in manager._sdr_starting
+    with pytest.raises(SdrConflict):  # now held as a running service
+        manager.start_service("ais")
+
+
+def test_failed_start_releases_reservation(manager, systemd):
+    manager.start_service("adsb")
+    systemd.units["dump1090-fa.service"] = "activating"
+    manager.refresh_services("systemd")
+    assert "adsb" in manager._sdr_starting
+
+    systemd.units["dump1090-fa.service"] = "inactive"  # the unit gave up
+    manager.refresh_services("systemd")
+    assert manager.service_state["adsb"].status == "stopped"
+    assert "adsb" not in manager._sdr_starting
+    manager.start_service("ais")
+    assert manager.service_state["ais"].selected_sdr == ["00000001"]
+
+
+def test_start_error_releases_reservation(manager, systemd):
+    systemd.fail_start = True
+    with pytest.raises(RuntimeError):
+        manager.start_service("adsb")
+    assert manager._sdr_starting == {}
+
+
+def test_reservation_expires(manager, systemd):
+    manager._SDR_START_TIMEOUT = 0
+    manager.start_service("adsb")
+    assert manager.service_state["adsb"].status == "unknown"
+
+    manager.start_service("ais")  # adsb never came up, so its SDR is free again
+    assert manager.service_state["ais"].selected_sdr == ["00000001"]
+    assert "adsb" not in manager._sdr_starting
+
+
+def test_stop_releases_reservation(manager, systemd):
+    manager.start_service("adsb")
+    manager.stop_service("adsb")
+    assert manager._sdr_starting == {}
+
+
+def test_start_that_exits_at_once_from_stopped(manager, systemd):
+    manager.refresh_services("systemd")
+    assert manager.service_state["adsb"].status == "stopped"
+
+    systemd.start_service = lambda name: None  # the unit exits straight away, never activating
+    assert manager.start_service("adsb") == "stopped"
+    assert "adsb" not in manager._sdr_starting
+
+    del systemd.start_service
+    manager.start_service("ais")
+    assert manager.service_state["ais"].selected_sdr == ["00000001"]
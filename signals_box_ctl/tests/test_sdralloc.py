@@ -0,0 +1,138 @@
+"""sdralloc: frequency parsing and the SDR matching."""
+from typing import NamedTuple
+
+import pytest
+
+from sdralloc import (SdrConflict, SdrRequest, allocate, format_range, parse_bands, parse_frequency,
+                      parse_range)
+
+V4, AIRSPY, HF = "RTLSDRBlog v4", "AirSpy", "AirSpy HF"
+BANDS = {
+    V4: parse_bands(["500k", "1766M"]),
+    AIRSPY: parse_bands(["24M", "1800M"]),
+    HF: parse_bands([["9k", "31M"], ["60M", "260M"]]),
+}
+
+
+class Dev(NamedTuple):
+    serial: str
+    friendly: str
+
+
+DEVICES = [Dev("v4-a", V4), Dev("v4-b", V4), Dev("airspy", AIRSPY), Dev("hf", HF)]
+
+
+def _request(service_id, count=1, models=(), freq=None, pinned=(), movable=False):
+    return SdrRequest(service_id, count, tuple(models), parse_range(freq) if freq is not None else None,
+                      tuple(pinned), movable)
+
+
+@pytest.mark.parametrize("value, hz", [
+    (1090000000, 1.09e9), ("152.592M", 152.592e6), ("24e6", 24e6), ("1.7 GHz", 1.7e9),
+    ("500k", 500e3), ("433.92MHz", 433.92e6),
+])
+def test_parse_frequency(value, hz):
+    assert parse_frequency(value) == pytest.approx(hz)
+
+
+@pytest.mark.parametrize("value", ["fast", "", True, "12X"])
+def test_parse_frequency_rejects(value):
+    with pytest.raises(ValueError):
+        parse_frequency(value)
+
+
+def test_ranges_and_bands():
+    assert parse_range("1090M") == (1090e6, 1090e6)
+    assert parse_range(["144M", "148M"]) == (144e6, 148e6)
+    with pytest.raises(ValueError, match="reversed"):
+        parse_range(["148M", "144M"])
+    with pytest.raises(ValueError, match="two values"):
+        parse_range(["1M", "2M", "3M"])
+    assert BANDS[HF] == ((9e3, 31e6), (60e6, 260e6))
+    assert format_range((24e6, 1766e6)) == "24-1766 MHz"
+    assert format_range((1090e6, 1090e6)) == "1090 MHz"
+
+
+def test_pinned_serial_is_kept():
+    result = allocate([_request("adsb", pinned=["v4-b"])], DEVICES, {}, BANDS)
+    assert result == {"adsb": ("v4-b",)}
+
+
+@pytest.mark.parametrize("pin, busy, reason", [
+    ("gone", {}, "SDR gone is not connected"),
+    ("v4-a", {"v4-a": "ais"}, "SDR v4-a is in use by ais"),
+    ("hf", {}, "SDR hf (AirSpy HF, 0.009-31 MHz, 60-260 MHz) cannot tune 1090 MHz"),
+])
+def test_pinned_serial_conflicts(pin, busy, reason):
+    with pytest.raises(SdrConflict) as conflict:
+        allocate([_request("adsb", freq="1090M", pinned=[pin])], DEVICES, busy, BANDS)
+    assert conflict.value.conflicts == {"adsb": reason}
+    assert str(conflict.value) == f"adsb: {reason}"
+
+
+def test_pinned_serial_wrong_model():
+    with pytest.raises(SdrConflict) as conflict:
+        allocate([_request("hfdl", models=[HF], pinned=["v4-a"])], DEVICES, {}, BANDS)
+    assert conflict.value.conflicts == {"hfdl": f"SDR v4-a is a {V4}, not {HF}"}
+
+
+def test_model_and_frequency_filter():
+    result = allocate([_request("hfdl", freq="8.9M"), _request("air", models=[AIRSPY])], DEVICES, {}, BANDS)
+    assert result["air"] == ("airspy",)
+    assert result["hfdl"] in (("v4-a",), ("v4-b",), ("hf",))
+
+    # 100-300 MHz does not fit inside either HF band
+    with pytest.raises(SdrConflict, match=f"no free SDR {HF} for 100-300 MHz"):
+        allocate([_request("wide", models=[HF], freq=["100M", "300M"])], DEVICES, {}, BANDS)
+
+
+def test_scarce_devices_go_to_the_services_that_need_them():
+    # 'any' is listed first but must not take the only AirSpy or a v4 the pair needs
+    requests = [_request("any"), _request("v4s", count=2, models=[V4]), _request("air", models=[AIRSPY])]
+    result = allocate(requests, DEVICES, {}, BANDS)
+    assert sorted(result["v4s"]) == ["v4-a", "v4-b"]
+    assert result["air"] == ("airspy",)
+    assert result["any"] == ("hf",)
+
+
+def test_count_above_free_devices():
+    with pytest.raises(SdrConflict) as conflict:
+        allocate([_request("v4s", count=2, models=[V4])], DEVICES, {"v4-b": "ais"}, BANDS)
+    assert conflict.value.conflicts == {"v4s": f"no free SDR {V4} (in use: v4-b by ais)"}
+
+
+def test_pins_count_towards_count():
+    result = allocate([_request("v4s", count=2, models=[V4], pinned=["v4-b"])], DEVICES, {}, BANDS)
+    assert result == {"v4s": ("v4-b", "v4-a")}
+
+
+def test_movable_pin_makes_room_for_a_fixed_one():
+    requests = [_request("adsb", pinned=["v4-a"], movable=True), _request("ais", pinned=["v4-a"])]
+    result = allocate(requests, DEVICES, {}, BANDS)
+    assert result["ais"] == ("v4-a",)
+    assert len(result["adsb"]) == 1 and result["adsb"][0] != "v4-a"
+
+
+def test_movable_pin_kept_when_it_still_fits():
+    result = allocate([_request("adsb", pinned=["v4-b"], movable=True)], DEVICES, {}, BANDS)
+    assert result == {"adsb": ("v4-b",)}
+
+
+def test_fixed_pins_collide():
+    with pytest.raises(SdrConflict) as conflict:
+        allocate([_request("adsb", pinned=["v4-a"]), _request("ais", pinned=["v4-a"])], DEVICES, {}, BANDS)
+    assert conflict.value.conflicts == {"ais": "SDR v4-a is in use by adsb"}
+
+
+def test_every_conflict_is_reported():
+    requests = [_request("air", models=[AIRSPY]), _request("hfdl", models=[HF]), _request("adsb")]
+    busy = {"airspy": "rdio", "hf": "kismet"}
+    with pytest.raises(SdrConflict) as conflict:
+        allocate(requests, DEVICES, busy, BANDS)
+    assert set(conflict.value.conflicts) == {"air", "hfdl"}
+    assert conflict.value.conflicts["hfdl"] == f"no free SDR {HF} (in use: airspy by rdio, hf by kismet)"
+
+
+def test_models_without_bands_accept_any_frequency():
+    result = allocate([_request("x", freq="5G")], [Dev("lime", "LimeSDR Mini")], {}, BANDS)
+    assert result == {"x": ("lime",)}
@@ -0,0 +1,57 @@
+"""SdrRegistry indexing, claims and duplicate serials."""
+import logging
+
+from sdrregistry import SdrRegistry
+
+
+def _info(serial, index, port, address):
+    return {"Serial": serial, "Rtl Id": index, "Friendly": "RTLSDRBlog v4",
+            "Bus": 1, "Address": address, "Port": port}
+
+
+def test_claims_survive_reload():
+    registry = SdrRegistry()
+    registry.load([_info("A", 0, "1-1", 3), _info("B", 1, "1-2", 4)])
+    assert registry.claim("adsb", ["A"], "ADS-B") == {}
+    assert registry.claim("ais", ["A", "B"], "AIS") == {"A": "adsb"}
+
+    registry.load([_info("A", 0, "1-1", 5), _info("B", 1, "1-2", 6)])  # replugged hub
+    assert registry.owner_of("A") == "adsb"
+    assert [d.serial for d in registry.devices_of("ais")] == ["B"]
+    assert registry.by_rtl_index(1).serial == "B"
+
+    registry.load([_info("B", 0, "1-2", 6)])
+    assert registry.get("A") is None
+    assert registry.devices_of("adsb") == []
+    assert registry.by_rtl_index(0).serial == "B"
+
+
+def test_duplicate_serials_stay_visible(caplog):
+    registry = SdrRegistry()
+    infos = [_info("00000001", 0, "1-1", 3), _info("00000001", 0, "1-2", 4), _info("00000001", 0, "", 9)]
+    with caplog.at_level(logging.WARNING, logger="sdrregistry"):
+        registry.load(infos)
+
+    assert [(d.serial, d.rtl_index) for d in registry.devices()] == [
+        ("00000001", 0), ("00000001@1-2", None), ("00000001@1-9", None),
+    ]
+    assert registry.get("00000001@1-2").port == "1-2"
+    assert registry.by_rtl_index(0).serial == "00000001"
+    assert sum("used by more than one device" in r.getMessage() for r in caplog.records) == 2
+
+    assert registry.claim("ais", ["00000001@1-2"], "AIS") == {}
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="sdrregistry"):
+        registry.load(infos)
+    assert registry.owner_of("00000001@1-2") == "ais"
+    assert registry.owner_of("00000001") is None
+    assert caplog.records == []  # warned once per change, not on every enumeration
+
+
+def test_index_collision_keeps_first(caplog):
+    registry = SdrRegistry()
+    with caplog.at_level(logging.WARNING, logger="sdrregistry"):
+        registry.load([_info("A", 0, "1-1", 3), _info("B", 0, "1-2", 4)])
+    assert registry.by_rtl_index(0).serial == "A"
+    assert [d.serial for d in registry.devices()] == ["A", "B"]
+    assert "both report RTL-SDR index 0" in caplog.text
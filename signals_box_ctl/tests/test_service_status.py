@@ -0,0 +1,88 @@
+"""Concurrent status collection in SignalsManager.get_all_service_statuses()."""
+import threading
+import time
+
+import pytest
+
+from conftest import SDR_IDS
+
+CONFIG = SDR_IDS + """\
+services:
+    adsb:
+        system_ctl_name: dump1090-fa.service
+        type: systemd
+        description: ADS-B
+    ais:
+        system_ctl_name: ais-catcher.service
+        type: systemd
+        description: AIS
+    sleeper:
+        type: cli
+        description: Sleeper
+        cmd_line: sleep 30
+"""
+
+
+@pytest.fixture
+def hung(make_manager, systemd):
+    """A manager whose systemd bulk query blocks until ``release`` is set."""
+    release = threading.Event()
+    calls = []
+    status_services = systemd.status_services
+
+    def blocking(names):
+        calls.append(list(names))
+        release.wait(5)
+        return status_services(names)
+
+    systemd.units["dump1090-fa.service"] = "active"
+    systemd.status_services = blocking
+    manager = make_manager(CONFIG)
+    manager.release, manager.calls = release, calls
+    yield manager
+    release.set()
+
+
+def test_slow_backend_is_reported_unknown(hung):
+    started = time.monotonic()
+    statuses = hung.get_all_service_statuses(timeout=0.2)
+    elapsed = time.monotonic() - started
+
+    assert statuses == {"adsb": "unknown", "ais": "unknown", "sleeper": "stopped"}
+    assert 0.2 <= elapsed < 1  # the batch waits for the timeout, not for the hung call
+    assert hung.calls == [["dump1090-fa.service", "ais-catcher.service"]]  # one bulk query
+    hung._publish_snapshot()
+    assert hung.get_service_statuses() == statuses  # the partial result is what readers see
+
+
+def test_hung_query_is_not_repeated(hung):
+    hung.get_all_service_statuses(timeout=0.1)
+    started = time.monotonic()
+    statuses = hung.get_all_service_statuses(timeout=0.1)
+    assert statuses["adsb"] == statuses["ais"] == "unknown"
+    assert len(hung.calls) == 1  # nothing new piled onto the hung backend
+    assert time.monotonic() - started < 0.1 + 0.5
+
+    hung.release.set()
+    deadline = time.monotonic() + 5
+    while hung._status_inflight["adsb"].running() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    statuses = hung.get_all_service_statuses(timeout=1)
+    assert statuses == {"adsb": "running", "ais": "stopped", "sleeper": "stopped"}
+    assert len(hung.calls) == 2
+
+
+def test_failing_backend_is_reported_unknown(make_manager, systemd):
+    def broken(_names):
+        raise RuntimeError("bus gone")
+
+    systemd.status_services = broken
+    manager = make_manager(CONFIG)
+    assert manager.get_all_service_statuses(timeout=1) == {"adsb": "unknown", "ais": "unknown", "sleeper": "stopped"}
+
+
+def test_single_systemd_service_uses_targeted_query(make_manager, systemd):
+    systemd.status_services = None  # must not be called for one unit
+    systemd.units["ais-catcher.service"] = "active"
+    manager = make_manager(CONFIG)
+    assert manager.get_all_service_statuses(service_ids=["ais"], timeout=1) == {"ais": "running"}
@@ -0,0 +1,114 @@
+"""Compiling and validating the services section of config.yml."""
+import logging
+
+import pytest
+
+from servicedefs import CliServiceDef, ConfigError, PipelineServiceDef, SystemdServiceDef, compile_services
+
+SYSTEMD = {"type": "systemd", "description": "ADS-B", "system_ctl_name": "dump1090-fa.service"}
+CLI = {"type": "cli", "description": "Sleeper", "cmd_line": "sleep 30"}
+
+
+def test_compiles_each_type():
+    services = compile_services({
+        "adsb": SYSTEMD,
+        "ais": {"type": "docker", "description": "AIS", "container_name": "ais-catcher"},
+        "sleeper": CLI,
+        "pager": {"type": "pipeline", "description": "Pager",
+                  "stages": [{"cmd_line": "rtl_fm"}, {"cmd_line": "multimon-ng"}]},
+    })
+    assert {svc_id: svc.type for svc_id, svc in services.items()} == {
+        "adsb": "systemd", "ais": "docker", "sleeper": "cli", "pager": "pipeline"}
+    assert services["adsb"].system_ctl_name == "dump1090-fa.service"
+    assert services["ais"].container_name == "ais-catcher"
+    assert services["sleeper"].PROCESS and services["sleeper"].restart == "never"
+    assert [stage["cmd_line"] for stage in services["pager"].stages] == ["rtl_fm", "multimon-ng"]
+
+
+@pytest.mark.parametrize("raw, message", [
+    (["not", "a", "mapping"], "is not a mapping"),
+    ({"description": "No type"}, "missing required field 'type'"),
+    ({"type": "kubernetes", "description": "Pod"}, "unknown type 'kubernetes'"),
+    ({"type": "systemd", "description": "No unit"}, "missing required field 'system_ctl_name'"),
+    (dict(CLI, restart="sometimes"), "invalid restart policy 'sometimes'"),
+])
+def test_invalid_entries_are_skipped(caplog, raw, message):
+    with caplog.at_level(logging.ERROR, logger="servicedefs"):
+        services = compile_services({"bad": raw, "adsb": SYSTEMD})
+    assert list(services) == ["adsb"]
+    assert message in caplog.text and "'bad'" in caplog.text
+
+
+def test_missing_section_compiles_to_nothing():
+    assert compile_services(None) == {}
+
+
+@pytest.mark.parametrize("extra, message", [
+    ({"sdr_count": 0}, "'sdr_count' must be a positive integer"),
+    ({"sdr_count": True}, "'sdr_count' must be a positive integer"),
+    ({"sdr_count": "2"}, "'sdr_count' must be a positive integer"),
+    ({"sdr_count": 2}, "'sdr_count' above 1 needs 'multi_sdr: true'"),
+    ({"freq_range": "lots"}, "invalid 'freq_range'"),
+])
+def test_invalid_sdr_needs(extra, message):
+    with pytest.raises(ConfigError, match=message):
+        SystemdServiceDef("adsb", dict(SYSTEMD, **extra))
+
+
+def test_sdr_needs():
+    svc = SystemdServiceDef("adsb", dict(SYSTEMD, multi_sdr=True, sdr_count=2, sdr_models="RTLSDRBlog v4"))
+    assert (svc.sdr_count, svc.sdr_models) == (2, ("RTLSDRBlog v4",))
+    assert SystemdServiceDef("adsb", SYSTEMD).sdr_models == ()
+
+
+def test_freq_range_defaults_to_freq_input():
+    assert SystemdServiceDef("adsb", dict(SYSTEMD, freq_input="1090M")).freq_range is not None
+    # freq_input that is not a plain frequency is left to the service
+    assert SystemdServiceDef("adsb", dict(SYSTEMD, freq_input="-f 1090M -g 40")).freq_range is None
+
+
+@pytest.mark.parametrize("key", ["restart_delay", "restart_max_delay", "start_interval", "start_limit",
+                                 "output_lines"])
+def test_cli_numbers(key):
+    assert CliServiceDef("sleeper", dict(CLI, **{key: 1.5})).raw[key] == 1.5
+    with pytest.raises(ConfigError, match=f"'{key}' must be a number"):
+        CliServiceDef("sleeper", dict(CLI, **{key: "soon"}))
+
+
+@pytest.mark.parametrize("stages, message", [
+    ([], "missing required field 'stages'"),
+    ("rtl_fm | multimon-ng", "missing required field 'stages'"),
+    ([{"cmd_line": "rtl_fm"}, {"args": "-a POCSAG512"}], "stage 1 has no 'cmd_line'"),
+    (["rtl_fm"], "stage 0 has no 'cmd_line'"),
+])
+def test_invalid_pipeline_stages(stages, message):
+    with pytest.raises(ConfigError, match=message):
+        PipelineServiceDef("pager", {"type": "pipeline", "description": "Pager", "stages": stages})
+
+
+def test_definitions_are_immutable():
+    raw = dict(CLI)
+    svc = CliServiceDef("sleeper", raw)
+    with pytest.raises(AttributeError):
+        svc.description = "Napper"
+    with pytest.raises(AttributeError):
+        del svc.cmd_line
+    with pytest.raises(TypeError):
+        svc.raw["cmd_line"] = "true"
+    raw["cmd_line"] = "true"  # the definition keeps its own copy
+    assert svc.cmd_line == "sleep 30" and svc.raw["cmd_line"] == "sleep 30"
+    assert svc.process_config() is not svc.process_config()
+
+
+def test_equality_and_changed_fields():
+    svc = CliServiceDef("sleeper", CLI)
+    assert svc == CliServiceDef("sleeper", dict(CLI))
+    assert svc != CliServiceDef("napper", CLI)
+    assert svc != CliServiceDef("sleeper", dict(CLI, description="Napper"))
+
+    assert svc.changed_fields(CliServiceDef("sleeper", dict(CLI))) == frozenset()
+    other = CliServiceDef("sleeper", dict(CLI, description="Napper", link="http://localhost:8080"))
+    assert svc.changed_fields(other) == {"description", "link"}
+    assert svc.changed_fields(other) <= svc.COSMETIC
+    assert not svc.changed_fields(CliServiceDef("sleeper", dict(CLI, cmd_line="sleep 31"))) <= svc.COSMETIC
+    assert svc.changed_fields(None) == set(CLI)
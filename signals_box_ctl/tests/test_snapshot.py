@@ -0,0 +1,89 @@
+"""StateSnapshot publishing and state versions in SignalsManager."""
+import threading
+import time
+
+import pytest
+
+from conftest import SDR_IDS
+
+CONFIG = SDR_IDS + """\
+services:
+    adsb:
+        system_ctl_name: dump1090-fa.service
+        type: systemd
+        description: ADS-B
+    ais:
+        system_ctl_name: ais-catcher.service
+        type: systemd
+        description: AIS
+"""
+
+
+@pytest.fixture
+def manager(make_manager, systemd):
+    systemd.calls = 0
+    status_services = systemd.status_services
+
+    def counted(names):
+        systemd.calls += 1
+        return status_services(names)
+
+    systemd.status_services = counted
+    mgr = make_manager(CONFIG)
+    mgr.refresh_services()
+    mgr._publish_snapshot()
+    return mgr
+
+
+def test_snapshot_is_read_only(manager):
+    snapshot = manager.snapshot
+    assert dict(snapshot.services) == {'adsb': 'stopped', 'ais': 'stopped'}
+    with pytest.raises(TypeError):
+        snapshot.services['adsb'] = 'running'
+    with pytest.raises(TypeError):
+        snapshot.versions['services'] = 0
+
+
+def test_unchanged_state_keeps_the_snapshot(manager):
+    snapshot = manager.snapshot
+    manager.refresh_services()
+    manager._publish_snapshot()
+    assert manager.snapshot is snapshot
+
+
+def test_status_change_bumps_only_its_versions(manager, systemd):
+    before = manager.snapshot
+    systemd.units['dump1090-fa.service'] = 'active'
+    manager.refresh_services('systemd')
+
+    assert manager.snapshot is before  # not visible until published
+    manager._publish_snapshot()
+    after = manager.snapshot
+    assert after.services['adsb'] == 'running' and before.services['adsb'] == 'stopped'
+    assert after.versions['service:adsb'] == before.versions.get('service:adsb', 0) + 1
+    assert after.versions['services'] == before.versions['services'] + 1
+    assert after.versions.get('service:ais') == before.versions.get('service:ais')
+    assert manager.state_etag('service:ais', snapshot=after) == manager.state_etag('service:ais', snapshot=before)
+    assert manager.state_etag('services', snapshot=after) != manager.state_etag('services', snapshot=before)
+
+
+def test_readers_do_not_query_backends(manager, systemd):
+    calls = systemd.calls
+    for _ in range(5):
+        assert manager.get_service_statuses() == {'adsb': 'stopped', 'ais': 'stopped'}
+    assert systemd.calls == calls
+
+
+def test_collector_refreshes_on_request(manager, systemd):
+    manager.collect_intervals['systemd'] = 3600
+    threading.Thread(target=manager._collect_loop, daemon=True,
+                     args=('systemd', lambda: manager.refresh_services('systemd'))).start()
+    deadline = time.monotonic() + 5
+    while systemd.calls < 2 and time.monotonic() < deadline:  # the loop's first pass
+        time.sleep(0.01)
+
+    systemd.units['ais-catcher.service'] = 'active'
+    manager.request_refresh('systemd')
+    while manager.snapshot.services['ais'] != 'running' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert manager.snapshot.services['ais'] == 'running'
@@ -0,0 +1,176 @@
+"""Reaping, restart backoff and process-group stops, with short-lived ``sh -c`` children."""
+import os
+import subprocess
+import threading
+import time
+
+import pytest
+
+from services import CliService
+from supervisor import ProcessSupervisor
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _alive(pid):
+    """True while *pid* runs; a zombie left for an absent init to reap counts as gone."""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii") as stat:
+            return stat.read().rsplit(")", 1)[1].split()[0] not in ("Z", "X")
+    except FileNotFoundError:
+        return False
+
+
+def _child_pid(path):
+    assert _wait_for(lambda: path.exists() and path.read_text().strip())
+    return int(path.read_text())
+
+
+def _watch_exit(supervisor, command):
+    exited = threading.Event()
+    codes = []
+    proc = subprocess.Popen(["sh", "-c", command])
+
+    def on_exit(returncode):
+        codes.append(returncode)
+        exited.set()
+
+    supervisor.watch(proc, on_exit)
+    return proc, exited, codes
+
+
+@pytest.mark.skipif(not hasattr(os, "pidfd_open"), reason="no pidfd support")
+def test_reaped_through_pidfd():
+    supervisor = ProcessSupervisor()
+    proc, exited, codes = _watch_exit(supervisor, "sleep 0.1; exit 3")
+    assert supervisor._watches[proc.pid].pidfd is not None
+    assert not supervisor._polled
+
+    assert exited.wait(5)
+    assert codes == [3]
+    assert proc.pid not in supervisor._watches
+
+
+def test_reaped_by_polling_without_pidfd(monkeypatch):
+    def no_pidfd(_pid):
+        raise OSError("pidfd_open not supported")
+
+    monkeypatch.setattr(os, "pidfd_open", no_pidfd, raising=False)
+    supervisor = ProcessSupervisor()
+    supervisor.POLL_INTERVAL = 0.05
+    proc, exited, codes = _watch_exit(supervisor, "exit 4")
+    assert exited.wait(5)
+    assert codes == [4]
+    assert not supervisor._polled and proc.pid not in supervisor._watches
+
+
+def test_call_later_runs_in_order_and_cancels():
+    supervisor = ProcessSupervisor()
+    calls = []
+    done = threading.Event()
+    supervisor.call_later(0.1, lambda: (calls.append("late"), done.set()))
+    cancelled = supervisor.call_later(0.02, lambda: calls.append("cancelled"))
+    supervisor.call_later(0.05, lambda: calls.append("early"))
+    supervisor.cancel(cancelled)
+    assert done.wait(5)
+    assert calls == ["early", "late"]
+
+
+@pytest.fixture
+def cli():
+    """Make CliServices running ``sh -c``; any left running are stopped afterwards."""
+    services = []
+
+    def make(command, **config):
+        config = dict({"type": "cli", "description": "test", "cmd_line": f"sh -c '{command}'",
+                       "restart_delay": 0.02}, **config)
+        services.append(CliService(f"test-{len(services)}", config))
+        return services[-1]
+
+    yield make
+    for service in services:
+        if service.is_running() or service.state in ("restarting", "failed"):
+            service.stop(timeout=1)
+
+
+def test_clean_exit_is_not_restarted_on_failure(cli):
+    service = cli("exit 0", restart="on-failure")
+    service.start()
+    assert _wait_for(lambda: service.state == "stopped")
+    assert (service.last_exit, len(service._starts)) == (0, 1)
+
+
+def test_always_restarts_a_clean_exit(cli):
+    service = cli("exit 0", restart="always", start_limit=10)
+    service.start()
+    assert _wait_for(lambda: len(service._starts) >= 3)
+
+
+def test_on_failure_backoff_until_start_limit(cli):
+    changes = []
+    service = cli("exit 2", restart="on-failure", start_limit=3, restart_max_delay=0.05)
+    service.on_change = lambda: changes.append(service.state)
+    service.start()
+
+    assert _wait_for(lambda: service.state == "failed")
+    assert service.last_exit == 2
+    assert len(service._starts) == 3
+    # 0.02 then 0.04, capped at restart_max_delay
+    assert service._delay == 0.05
+    assert changes[-1] == "failed"
+    assert "running" in changes  # each restart is reported
+
+    service.stop()  # giving up leaves it stoppable
+    assert service.state == "stopped"
+
+
+def test_manual_start_resets_backoff(cli):
+    service = cli("sleep 0.2; exit 1", restart="on-failure", start_limit=2)
+    service.start()
+    assert _wait_for(lambda: service.state == "failed")
+    assert service._delay == 0.04
+
+    service.start()
+    assert (service.state, len(service._starts), service._delay) == ("running", 1, 0.02)
+
+
+def test_stop_kills_the_process_group(cli, tmp_path):
+    pidfile = tmp_path / "child"
+    service = cli(f"sleep 30 & echo $! > {pidfile}; wait")
+    service.start()
+    child = _child_pid(pidfile)
+    assert _alive(child)
+
+    service.stop(timeout=2)
+    assert _wait_for(lambda: not _alive(child))
+    assert service.state == "stopped" and not service.is_running()
+    with pytest.raises(RuntimeError):
+        service.stop()
+
+
+def test_stop_escalates_to_sigkill(cli, tmp_path):
+    pidfile = tmp_path / "child"
+    service = cli(f"trap \"\" TERM; sleep 30 & echo $! > {pidfile}; wait")
+    service.start()
+    child = _child_pid(pidfile)
+
+    started = time.monotonic()
+    service.stop(timeout=0.2)
+    assert time.monotonic() - started < 2
+    assert _wait_for(lambda: not _alive(child))
+
+
+def test_unplanned_exit_kills_stragglers(cli, tmp_path):
+    pidfile = tmp_path / "child"
+    service = cli(f"sleep 30 & echo $! > {pidfile}; exit 1")
+    service.start()
+    child = _child_pid(pidfile)
+    assert _wait_for(lambda: service.state == "stopped")
+    assert _wait_for(lambda: not _alive(child))
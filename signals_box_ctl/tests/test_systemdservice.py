@@ -0,0 +1,266 @@
+"""SystemdServiceManager against a stub system bus."""
+import importlib
+import sys
+import threading
+import types
+
+import pytest
+
+UNITS = {
+    "dump1090-fa.service": ("loaded", "active", "running"),
+    "rtl_433.service": ("loaded", "inactive", "dead"),
+    "acarsdec.service": ("loaded", "deactivating", "stop-sigterm"),
+    "kismet.service": ("loaded", "failed", "failed"),
+}
+
+
+class StubBus:
+    """Answers the systemd Manager and unit Properties calls from ``UNITS`` and records each call."""
+
+    def __init__(self, dbus):
+        self.dbus = dbus
+        self.units = dict(UNITS)
+        self.calls = []
+        self.fail = False
+        self.receivers = {}
+        self.on_disconnect = None
+        self.opened = 0
+
+    def get_object(self, bus_name, path):
+        return types.SimpleNamespace(bus=self, bus_name=bus_name, path=path)
+
+    def add_signal_receiver(self, handler, signal_name, **_match):
+        self.receivers[signal_name] = handler
+
+    def call_on_disconnection(self, callback):
+        self.on_disconnect = callback
+
+    def close(self):
+        pass
+
+    def call(self, path, interface, method, args):
+        self.calls.append((method, args))
+        if self.fail:
+            raise self.dbus.exceptions.DBusException("org.freedesktop.DBus.Error.NoReply")
+        if (interface, method) == ("org.freedesktop.systemd1.Manager", "ListUnitsByNames"):
+            return [(name, "", *self.units[name], "", path, 0, "", "/") for name in args[0] if name in self.units]
+        if (interface, method) == ("org.freedesktop.systemd1.Manager", "Subscribe"):
+            return None
+        if (interface, method) == ("org.freedesktop.DBus.Properties", "Get"):
+            unit = next(name for name in self.units if self.dbus.unit_path(name) == path)
+            return self.units[unit][1]
+        raise AssertionError(f"unexpected call {interface}.{method}")
+
+
+def _stub_dbus():
+    class DBusException(Exception):
+        pass
+
+    class Interface:
+        def __init__(self, obj, interface):
+            self._obj, self._interface = obj, interface
+
+        def __getattr__(self, method):
+            return lambda *args: self._obj.bus.call(self._obj.path, self._interface, method, args)
+
+    dbus = types.ModuleType("dbus")
+    dbus.exceptions = types.ModuleType("dbus.exceptions")
+    dbus.exceptions.DBusException = DBusException
+    dbus.Interface = Interface
+    dbus.Bus = object
+    dbus.ByteArray = bytes
+    dbus.Byte = int
+    dbus.bus = StubBus(dbus)
+
+    def system_bus(**kwargs):
+        if kwargs.get("private"):
+            dbus.bus.opened += 1
+        return dbus.bus
+
+    dbus.SystemBus = system_bus
+    dbus.SessionBus = dbus.SystemBus
+    return dbus
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    dbus = _stub_dbus()
+    monkeypatch.setitem(sys.modules, "dbus", dbus)
+    monkeypatch.setitem(sys.modules, "dbus.exceptions", dbus.exceptions)
+    monkeypatch.delitem(sys.modules, "systemdservice", raising=False)
+    module = importlib.import_module("systemdservice")
+    dbus.unit_path = module.SystemdServiceManager.unit_object_path
+    dbus.bus.manager = module.SystemdServiceManager()
+    yield dbus.bus
+    sys.modules.pop("systemdservice", None)
+
+
+def test_status_services_is_one_bulk_call(bus):
+    states = bus.manager.status_services(list(UNITS))
+
+    assert bus.calls == [("ListUnitsByNames", (list(UNITS),))]
+    assert states["dump1090-fa.service"] == {"ActiveState": "active", "SubState": "running", "LoadState": "loaded"}
+    assert states["acarsdec.service"]["ActiveState"] == "deactivating"
+    assert set(states) == set(UNITS)
+
+
+def test_bulk_call_omits_unknown_units(bus):
+    states = bus.manager.status_services(["rtl_433.service", "missing.service"])
+    assert len(bus.calls) == 1
+    assert list(states) == ["rtl_433.service"]
+
+
+def test_no_units_makes_no_call(bus):
+    assert bus.manager.status_services([]) == {}
+    assert bus.calls == []
+
+
+def test_single_status_reads_one_property(bus):
+    assert bus.manager.status_service("kismet.service") == {"ActiveState": "failed"}
+    assert bus.calls == [("Get", ("org.freedesktop.systemd1.Unit", "ActiveState"))]
+
+
+def test_bus_failure_reports_nothing(bus):
+    bus.fail = True
+    assert bus.manager.status_services(list(UNITS)) == {}
+    assert bus.manager._manager is None  # proxy dropped so the next call reconnects
+
+
+def test_signal_table_answers_without_bus_calls(bus):
+    manager = bus.manager
+    manager._watched = set(UNITS)
+    manager._unit_paths = {manager.unit_object_path(name): name for name in UNITS}
+    manager.resync()
+    manager._signals_ok = True
+    bus.calls.clear()
+
+    manager._on_properties_changed("org.freedesktop.systemd1.Unit", {"ActiveState": "activating", "SubState": "start"},
+                                   [], path=manager.unit_object_path("rtl_433.service"))
+    states = manager.status_services(list(UNITS))
+
+    assert bus.calls == []
+    assert states["rtl_433.service"] == {"ActiveState": "activating", "SubState": "start", "LoadState": "loaded"}
+
+
+def test_unit_object_path_escaping(bus):
+    assert bus.manager.unit_object_path("dump1090-fa.service") == \
+        "/org/freedesktop/systemd1/unit/dump1090_2dfa_2eservice"
+
+
+class MainLoop:
+    def __init__(self):
+        self.stopped = threading.Event()
+
+    def run(self):
+        self.stopped.wait()
+
+    def quit(self):
+        self.stopped.set()
+
+
+@pytest.fixture
+def signals(monkeypatch, bus):
+    """A subscribed manager, with GLib stubbed and the clock under the test's control."""
+    glib = types.ModuleType("dbus.mainloop.glib")
+    glib.DBusGMainLoop = lambda: None
+    repository = types.ModuleType("gi.repository")
+    repository.GLib = types.SimpleNamespace(MainLoop=MainLoop)
+    for name, module in (("dbus.mainloop", types.ModuleType("dbus.mainloop")), ("dbus.mainloop.glib", glib),
+                         ("gi", types.ModuleType("gi")), ("gi.repository", repository)):
+        monkeypatch.setitem(sys.modules, name, module)
+    sys.modules.pop("systemdservice")
+    module = importlib.import_module("systemdservice")
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "time", lambda: now[0])
+
+    bus.manager = module.SystemdServiceManager()
+    bus.now = now
+    assert bus.manager.subscribe(UNITS)
+    yield bus
+    bus.manager.close()
+
+
+def _changed(bus, unit, active, sub=None, interface="org.freedesktop.systemd1.Unit"):
+    changed = {"ActiveState": active}
+    if sub is not None:
+        changed["SubState"] = sub
+    bus.receivers["PropertiesChanged"](interface, changed, [], path=bus.manager.unit_object_path(unit))
+
+
+def test_subscribe_resyncs_once_then_reads_the_table(signals):
+    assert [method for method, _ in signals.calls] == ["Subscribe", "ListUnitsByNames"]
+    signals.calls.clear()
+
+    states = signals.manager.status_services(list(UNITS))
+    assert states["dump1090-fa.service"] == {"ActiveState": "active", "SubState": "running", "LoadState": "loaded"}
+    assert signals.manager.status_service("kismet.service")["ActiveState"] == "failed"
+    assert signals.calls == []
+
+
+def test_properties_changed_updates_watched_units(signals):
+    signals.calls.clear()
+    _changed(signals, "dump1090-fa.service", "deactivating", "stop-sigterm")
+    _changed(signals, "other.service", "failed")  # not watched
+    _changed(signals, "rtl_433.service", "active", interface="org.freedesktop.systemd1.Service")
+    signals.receivers["PropertiesChanged"]("org.freedesktop.systemd1.Unit", {"SubState": "x"}, [],
+                                           path=signals.manager.unit_object_path("rtl_433.service"))
+
+    states = signals.manager.status_services(list(UNITS))
+    assert states["dump1090-fa.service"] == {"ActiveState": "deactivating", "SubState": "stop-sigterm",
+                                             "LoadState": "loaded"}
+    assert states["rtl_433.service"] == {"ActiveState": "inactive", "SubState": "dead", "LoadState": "loaded"}
+    assert "other.service" not in signals.manager._unit_states
+    assert signals.calls == []
+
+
+def test_resync_after_the_bus_drops(signals):
+    manager = signals.manager
+    signals.on_disconnect(None)
+    assert not manager._signals_ok
+
+    # Polled while the signals are gone
+    signals.units["rtl_433.service"] = ("loaded", "active", "running")
+    signals.calls.clear()
+    assert manager.status_services(["rtl_433.service"])["rtl_433.service"]["ActiveState"] == "active"
+    assert manager.status_service("rtl_433.service") == {"ActiveState": "active"}
+    assert [method for method, _ in signals.calls] == ["ListUnitsByNames", "Get"]
+
+    # After the retry interval a read reconnects and resyncs the whole table
+    signals.units["kismet.service"] = ("loaded", "inactive", "dead")
+    signals.now[0] += manager._RESUBSCRIBE_INTERVAL + 1
+    signals.calls.clear()
+    manager.status_service("rtl_433.service")
+    assert manager._signals_ok and signals.opened == 2
+    assert [method for method, _ in signals.calls] == ["Subscribe", "ListUnitsByNames", "Get"]
+
+    signals.calls.clear()
+    assert manager.status_services(list(UNITS))["kismet.service"]["ActiveState"] == "inactive"
+    assert signals.calls == []
+
+
+def test_resubscribe_is_rate_limited(signals):
+    signals.on_disconnect(None)
+    signals.now[0] += signals.manager._RESUBSCRIBE_INTERVAL - 1
+    signals.calls.clear()
+    signals.manager.status_service("rtl_433.service")
+    assert [method for method, _ in signals.calls] == ["Get"]
+    assert not signals.manager._signals_ok
+
+
+def test_failed_subscribe_falls_back_to_polling(signals):
+    signals.on_disconnect(None)
+    signals.fail = True
+    signals.now[0] += signals.manager._RESUBSCRIBE_INTERVAL + 1
+    assert signals.manager.status_service("rtl_433.service") is None
+    assert not signals.manager._signals_ok
+
+
+def test_systemd_restart_resubscribes(signals):
+    _changed(signals, "rtl_433.service", "activating")
+    signals.calls.clear()
+    signals.receivers["NameOwnerChanged"]("org.freedesktop.systemd1", ":1.1", "")  # gone, nothing to do
+    assert signals.calls == []
+
+    signals.receivers["NameOwnerChanged"]("org.freedesktop.systemd1", "", ":1.2")
+    assert [method for method, _ in signals.calls] == ["Subscribe", "ListUnitsByNames"]
+    assert signals.manager.status_service("rtl_433.service")["ActiveState"] == "inactive"
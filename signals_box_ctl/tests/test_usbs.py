@@ -0,0 +1,181 @@
+"""USB enumeration and hotplug parsing."""
+import struct
+import types
+
+import pytest
+
+import usbs
+from usbs import UsbDevices, UsbHotplugWatcher
+
+RTL_V4 = (0x0bda, 0x2838)
+
+_UEVENT_PROPS = [
+    "ACTION=add",
+    "DEVPATH=/devices/pci0000:00/0000:00:14.0/usb1/1-2",
+    "SUBSYSTEM=usb",
+    "DEVTYPE=usb_device",
+    "PRODUCT=bda/2838/100",
+    "SEQNUM=4711",
+]
+
+
+def _libudev_datagram(props):
+    """A datagram as libudev sends it: magic in network order, the rest in host order."""
+    payload = b"".join(p.encode() + b"\0" for p in props)
+    header_size = 40
+    header = b"libudev\0" + struct.pack(">I", UsbHotplugWatcher.UDEV_MAGIC)
+    header += struct.pack("=III", header_size, header_size, len(payload))
+    header += struct.pack("=IIII", 0, 0, 0, 0)  # subsystem/devtype hashes, tag bloom
+    assert len(header) == header_size
+    return header + payload
+
+
+def _watcher(events=None):
+    return UsbHotplugWatcher({RTL_V4: "RTLSDRBlog v4"},
+                             lambda *event: events.append(event) if events is not None else None)
+
+
+def test_parse_libudev_datagram():
+    props = _watcher()._parse_uevent(_libudev_datagram(_UEVENT_PROPS))
+    assert props["ACTION"] == "add"
+    assert props["PRODUCT"] == "bda/2838/100"
+    assert props["DEVPATH"].endswith("/1-2")
+
+
+def test_parse_libudev_rejects_bad_magic():
+    data = bytearray(_libudev_datagram(_UEVENT_PROPS))
+    data[8:12] = b"\0\0\0\0"
+    assert _watcher()._parse_uevent(bytes(data)) == {}
+
+
+def test_parse_kernel_add_and_remove():
+    watcher = _watcher()
+    for action in ("add", "remove"):
+        props = [f"ACTION={action}"] + _UEVENT_PROPS[1:]
+        data = f"{action}@/devices/pci0000:00/0000:00:14.0/usb1/1-2\0".encode()
+        data += b"".join(p.encode() + b"\0" for p in props)
+        parsed = watcher._parse_uevent(data)
+        assert parsed["ACTION"] == action
+        assert parsed["SUBSYSTEM"] == "usb"
+
+
+class _FakeSocket:
+    def __init__(self, watcher, datagrams):
+        self.watcher = watcher
+        self.datagrams = list(datagrams)
+
+    def recv(self, _size):
+        if not self.datagrams:
+            self.watcher._closing.set()
+            raise OSError("closed")
+        return self.datagrams.pop(0)
+
+
+def test_watch_netlink_dispatches_sdr_events():
+    events = []
+    watcher = _watcher(events)
+    removed = [p.replace("ACTION=add", "ACTION=remove") for p in _UEVENT_PROPS]
+    other = [p.replace("PRODUCT=bda/2838/100", "PRODUCT=46d/c52b/1200") for p in _UEVENT_PROPS]
+    watcher._sock = _FakeSocket(watcher, [_libudev_datagram(_UEVENT_PROPS),
+                                          _libudev_datagram(other),
+                                          _libudev_datagram(removed)])
+    watcher._watch_netlink()
+    assert [(action, vid_pid) for action, vid_pid, _path in events] == [("add", RTL_V4), ("remove", RTL_V4)]
+
+
+def _sysfs_device(root, name, attrs):
+    path = root / name
+    path.mkdir()
+    for attr, value in attrs.items():
+        (path / attr).write_text(f"{value}\n")
+    return path
+
+
+def _rtl_sysfs(root, name, serial, devnum):
+    return _sysfs_device(root, name, {
+        "idVendor": "0bda", "idProduct": "2838", "serial": serial,
+        "manufacturer": "RTLSDRBlog", "product": "Blog V4",
+        "busnum": 1, "devnum": devnum, "speed": 480,
+    })
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    _sysfs_device(tmp_path, "usb1", {"idVendor": "1d6b", "idProduct": "0002", "busnum": 1, "devnum": 1})
+    _rtl_sysfs(tmp_path, "1-2", "00000001", 7)
+    _rtl_sysfs(tmp_path, "1-1", "00000002", 3)
+    _sysfs_device(tmp_path, "1-1:1.0", {"bInterfaceClass": "ff"})  # interface, no ids
+    _sysfs_device(tmp_path, "2-1", {"idVendor": "046d", "idProduct": "c52b", "busnum": 2, "devnum": 2})
+    return tmp_path
+
+
+@pytest.fixture
+def serial_map(monkeypatch):
+    indexes = {"00000002": 0, "00000001": 1}
+    monkeypatch.setattr(UsbDevices, "get_rtlsdr_serial_map", staticmethod(lambda: indexes))
+    return indexes
+
+
+def test_sysfs_lists_sdrs_in_bus_order(sysfs, serial_map):
+    devices = UsbDevices({RTL_V4: "RTLSDRBlog v4"}, sysfs_root=str(sysfs)).list_rtlsdr_devices()
+
+    assert [(d["Serial"], d["Bus"], d["Address"], d["Rtl Id"]) for d in devices] == [
+        ("00000002", 1, 3, 0),
+        ("00000001", 1, 7, 1),
+    ]
+    assert devices[0] == {
+        "VID": "0x0bda", "PID": "0x2838", "Friendly": "RTLSDRBlog v4",
+        "Manufacturer": "RTLSDRBlog", "Product": "Blog V4", "Serial": "00000002",
+        "Bus": 1, "Address": 3, "Speed": "480", "Port": "1-1", "Rtl Id": 0, "status": "",
+    }
+
+
+def test_sysfs_device_without_serial(sysfs, serial_map):
+    (sysfs / "1-2" / "serial").unlink()
+    devices = UsbDevices({RTL_V4: "RTLSDRBlog v4"}, sysfs_root=str(sysfs)).list_rtlsdr_devices()
+    assert [(d["Serial"], d["Rtl Id"]) for d in devices] == [("00000002", 0), ("", "na")]
+
+
+class _FakePyusbDevice:
+    def __init__(self, vid_pid, serial, bus, address):
+        self.idVendor, self.idProduct = vid_pid
+        self.iManufacturer, self.iProduct, self.iSerialNumber = 1, 2, 3
+        self._strings = {1: "RTLSDRBlog", 2: "Blog V4", 3: serial}
+        self.bus, self.address = bus, address
+        self.port_numbers = [bus + 1, 4]
+
+
+def _fake_pyusb(devices):
+    class USBError(Exception):
+        pass
+
+    core = types.SimpleNamespace(USBError=USBError, find=lambda find_all: iter(devices))
+    util = types.SimpleNamespace(get_string=lambda dev, index: dev._strings[index])
+    return types.SimpleNamespace(core=core, util=util)
+
+
+def test_pyusb_fallback_without_sysfs(tmp_path, monkeypatch, serial_map):
+    fake = _fake_pyusb([_FakePyusbDevice(RTL_V4, "00000001", 1, 7),
+                        _FakePyusbDevice((0x046d, 0xc52b), "", 2, 2)])
+    monkeypatch.setattr(usbs, "usb", fake, raising=False)
+    monkeypatch.setattr(usbs, "_pyusb_available", True)
+
+    devices = UsbDevices({RTL_V4: "RTLSDRBlog v4"}, sysfs_root=str(tmp_path / "missing")).list_rtlsdr_devices()
+
+    assert devices == [{
+        "VID": "0x0bda", "PID": "0x2838", "Friendly": "RTLSDRBlog v4",
+        "Manufacturer": "RTLSDRBlog", "Product": "Blog V4", "Serial": "00000001",
+        "Bus": 1, "Address": 7, "Port": "1-2.4", "Rtl Id": 1, "status": "",
+    }]
+
+
+def test_no_sysfs_and_no_pyusb(tmp_path, monkeypatch):
+    monkeypatch.setattr(usbs, "_pyusb_available", False)
+    assert UsbDevices({RTL_V4: "RTLSDRBlog v4"}, sysfs_root=str(tmp_path / "missing")).list_rtlsdr_devices() == []
+
+
+def test_hotplug_sysfs_scan(sysfs):
+    watcher = UsbHotplugWatcher({RTL_V4: "RTLSDRBlog v4"}, lambda *event: None, sysfs_root=str(sysfs))
+    assert watcher._scan_sysfs() == {
+        "usb1": (0x1d6b, 0x0002), "1-1": RTL_V4, "1-2": RTL_V4, "2-1": (0x046d, 0xc52b),
+    }
@@ -4,24 +4,49 @@
 Handler methods for collecing SDR USB devices
 """
 
-from typing import Dict, Tuple, List
+from functools import lru_cache
+from typing import Callable, Dict, Tuple, List, Optional
 import logging
-import sys
+import os
+import socket
+import struct
+import threading
 
-try:
-    from rtlsdr import RtlSdr
-except ImportError:
-    print("pyrtlsdr is required: pip install pyrtlsdr", file=sys.stderr)
-    sys.exit(1)
+logger = logging.getLogger(__name__)
 
+_pyusb_available = False
 try:
     import usb.core
     import usb.util
+    _pyusb_available = True
 except ImportError:
-    print("pyusb is required: pip install pyusb", file=sys.stderr)
-    sys.exit(1)
+    logger.warning("pyusb not installed – USB enumeration limited to sysfs")
+
+SYSFS_USB_DEVICES = "/sys/bus/usb/devices"
+
+
+@lru_cache(maxsize=None)
+def _rtlsdr_class():
+    """
+    pyrtlsdr's RtlSdr class, imported on first use (loading it also loads
+    librtlsdr).  None, with one warning, if either is missing; SDRs are
+    then listed without an RTL-SDR index.
+    """
+    try:
+        from rtlsdr import RtlSdr  # pylint: disable=import-outside-toplevel
+        return RtlSdr
+    except (ImportError, OSError) as exc:
+        logger.warning("pyrtlsdr unavailable (%s) – SDR device indexes unknown; pip install pyrtlsdr", exc)
+        return None
 
-logger = logging.getLogger(__name__)
+
+def _read_sysfs_attr(dev_path: str, name: str) -> str:
+    """Read one sysfs attribute of a USB device, or '' if it is absent."""
+    try:
+        with open(os.path.join(dev_path, name), "r", encoding="utf-8", errors="replace") as attr:
+            return attr.read().strip()
+    except OSError:
+        return ""
 
 
 class UsbDevices:
@@ -29,11 +54,13 @@ class UsbDevices:
     A class to manage USB devices and their properties.
     """
 
-    def __init__(self, sdr_ids: Dict[Tuple[int, int], str]):
+    def __init__(self, sdr_ids: Dict[Tuple[int, int], str], sysfs_root: str = SYSFS_USB_DEVICES):
         self.sdr_ids = sdr_ids
+        self.sysfs_root = sysfs_root
+        self._serial_map = None
 
     @staticmethod
-    def get_string(dev: usb.core.Device, index: int) -> str:
+    def get_string(dev: "usb.core.Device", index: int) -> str:
         """
         Safely fetch a string descriptor from the USB device.
         If the string descriptor is missing or an error occurs, return an empty string.
@@ -49,11 +76,45 @@ class UsbDevices:
         return ""
 
     @staticmethod
-    def get_rtlsdr_device_number(serial_no):
+    def get_rtlsdr_serial_map() -> Dict[str, int]:
+        """
+        Map every librtlsdr device serial to its device index in a single pass
+        over rtlsdr_get_device_count()/rtlsdr_get_device_usb_strings().
+        If two dongles share a serial, the lowest index wins.
+        """
+        rtlsdr = _rtlsdr_class()
+        if rtlsdr is None:
+            return {}
+        try:
+            serials = rtlsdr.get_device_serial_addresses()
+        except Exception:
+            logger.error("Could not read RTL-SDR serial numbers from librtlsdr")
+            return {}
+
+        serial_map = {}
+        for index, serial in enumerate(serials):
+            serial_map.setdefault(serial, index)
+        return serial_map
+
+    @property
+    def serial_map(self) -> Dict[str, int]:
+        """Serial -> RTL-SDR index map, built once per UsbDevices instance."""
+        if self._serial_map is None:
+            self._serial_map = self.get_rtlsdr_serial_map()
+        return self._serial_map
+
+    def get_rtlsdr_device_number(self, serial_no):
         """ Get RTL-SDR Device number mapping from the device's serial number. """
-        return RtlSdr.get_device_index_by_serial(str(serial_no))
+        return self.serial_map.get(str(serial_no))
 
-    def describe_device(self, dev: usb.core.Device) -> Dict[str, str]:
+    def _rtl_id(self, serial_str: str):
+        rtl_id = self.get_rtlsdr_device_number(serial_str)
+        if rtl_id is None:
+            logger.error("Could not get RTL-SDR device number for serial %s", serial_str)
+            return "na"
+        return rtl_id
+
+    def describe_device(self, dev: "usb.core.Device") -> Dict[str, str]:
         """
         Return a dictionary with the most useful information about a device.
         """
@@ -63,11 +124,7 @@ class UsbDevices:
         product_str = self.get_string(dev, dev.iProduct)
         serial_str = self.get_string(dev, dev.iSerialNumber)
 
-        try:
-            rtl_id = RtlSdr.get_device_index_by_serial(serial_str)
-        except Exception:
-            logger.error("Could not get RTL-SDR device number for serial %s", serial_str)
-            rtl_id = "na"
+        rtl_id = self._rtl_id(serial_str)
 
         # Try to find a friendly name for the dongle
         friendly = self.sdr_ids.get((vid, pid), f"Unknown VID:PID 0x{vid:04x}:0x{pid:04x}")
@@ -81,15 +138,74 @@ class UsbDevices:
             "Serial": serial_str,
             "Bus": dev.bus,
             "Address": dev.address,
+            "Port": f"{dev.bus}-{'.'.join(str(p) for p in dev.port_numbers)}" if dev.port_numbers else "",
+            "Rtl Id": rtl_id,
+            "status": ""
+        }
+
+    def describe_sysfs_device(self, dev_path: str) -> Dict[str, str]:
+        """
+        Same as describe_device() but read from the device's sysfs directory,
+        which needs no privileges and works while the dongle is claimed.
+        """
+        vid = int(_read_sysfs_attr(dev_path, "idVendor"), 16)
+        pid = int(_read_sysfs_attr(dev_path, "idProduct"), 16)
+        serial_str = _read_sysfs_attr(dev_path, "serial")
+
+        rtl_id = self._rtl_id(serial_str)
+
+        friendly = self.sdr_ids.get((vid, pid), f"Unknown VID:PID 0x{vid:04x}:0x{pid:04x}")
+
+        return {
+            "VID": f"0x{vid:04x}",
+            "PID": f"0x{pid:04x}",
+            "Friendly": friendly,
+            "Manufacturer": _read_sysfs_attr(dev_path, "manufacturer"),
+            "Product": _read_sysfs_attr(dev_path, "product"),
+            "Serial": serial_str,
+            "Bus": int(_read_sysfs_attr(dev_path, "busnum") or 0),
+            "Address": int(_read_sysfs_attr(dev_path, "devnum") or 0),
+            "Speed": _read_sysfs_attr(dev_path, "speed"),
+            "Port": os.path.basename(dev_path),
             "Rtl Id": rtl_id,
             "status": ""
         }
 
+    def sysfs_device_paths(self) -> List[str]:
+        """
+        Return sysfs paths of the USB devices matching the known SDR IDs,
+        ordered by bus and address like libusb enumerates them.
+        Raises OSError if the sysfs tree is not available.
+        """
+        matches = []
+        for entry in os.listdir(self.sysfs_root):
+            dev_path = os.path.join(self.sysfs_root, entry)
+            try:
+                vid_pid = (int(_read_sysfs_attr(dev_path, "idVendor"), 16),
+                           int(_read_sysfs_attr(dev_path, "idProduct"), 16))
+            except ValueError:
+                continue  # interfaces have no ids
+            if vid_pid in self.sdr_ids:
+                bus_addr = (int(_read_sysfs_attr(dev_path, "busnum") or 0),
+                            int(_read_sysfs_attr(dev_path, "devnum") or 0))
+                matches.append((bus_addr, dev_path))
+
+        return [dev_path for _, dev_path in sorted(matches)]
+
     def list_rtlsdr_devices(self) -> List[Dict[str, str]]:
         """
         Enumerate all USB devices and return a list of dicts for those that match
-        the known RTL‑SDR IDs.
+        the known RTL‑SDR IDs.  Reads sysfs when available and falls back to
+        pyusb otherwise.
         """
+        try:
+            return [self.describe_sysfs_device(p) for p in self.sysfs_device_paths()]
+        except (OSError, ValueError) as exc:
+            if not _pyusb_available:
+                logger.error("Cannot enumerate USB devices from %s: %s", self.sysfs_root, exc)
+                return []
+            logger.warning("sysfs enumeration failed (%s), falling back to pyusb", exc)
+
         devices = usb.core.find(find_all=True)  # type: ignore
         rtlsdr_list = []
 
@@ -104,6 +220,10 @@ class UsbDevices:
         Enumerate all USB devices and return a list of dicts describing each one.
         Useful for debugging if your dongle isn’t showing up.
         """
+        if not _pyusb_available:
+            logger.error("pyusb is required to list all USB devices")
+            return []
+
         devices = usb.core.find(find_all=True)  # type: ignore
         all_list = []
 
@@ -111,3 +231,145 @@ class UsbDevices:
             all_list.append(self.describe_device(dev))
 
         return all_list
+
+
+class UsbHotplugWatcher:
+    """
+    Watch for SDR dongles being plugged in or removed.
+
+    Listens on the udev netlink socket (or the raw kernel uevent group when
+    udevd is not running) and calls ``callback(action, (vid, pid), devpath)``
+    for ``add``/``remove`` events of USB devices whose VID:PID is in
+    *sdr_ids*.  If a netlink socket cannot be opened, ``/sys/bus/usb/devices``
+    is polled instead.
+    """
+
+    NETLINK_KOBJECT_UEVENT = 15
+    KERNEL_GROUP = 1
+    UDEV_GROUP = 2
+    UDEV_MAGIC = 0xfeedcafe
+    POLL_INTERVAL = 2  # seconds between sysfs scans in fallback mode
+
+    def __init__(self, sdr_ids: Dict[Tuple[int, int], str],
+                 callback: Callable[[str, Tuple[int, int], str], None],
+                 sysfs_root: Optional[str] = None):
+        self.sdr_ids = sdr_ids
+        self.callback = callback
+        self.sysfs_root = sysfs_root or SYSFS_USB_DEVICES
+        self.mode = None
+        self._sock = None
+        self._closing = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        """True while the watcher thread is delivering events."""
+        return self.mode is not None and not self._closing.is_set()
+
+    def start(self) -> None:
+        """Open the netlink socket (or fall back to sysfs polling) and start watching."""
+        group = self.UDEV_GROUP if os.path.exists("/run/udev/control") else self.KERNEL_GROUP
+        try:
+            self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, self.NETLINK_KOBJECT_UEVENT)
+            self._sock.bind((0, group))
+            self._sock.settimeout(1.0)
+            self.mode = "udev" if group == self.UDEV_GROUP else "kernel"
+            target = self._watch_netlink
+        except (OSError, AttributeError) as exc:
+            logger.warning("USB netlink monitor unavailable (%s); polling %s", exc, self.sysfs_root)
+            self._sock = None
+            self.mode = "sysfs"
+            target = self._watch_sysfs
+
+        logger.info("Watching USB hotplug events via %s", self.mode)
+        threading.Thread(target=target, name="usb-hotplug", daemon=True).start()
+
+    def close(self) -> None:
+        """Stop watching."""
+        self._closing.set()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    # netlink
+    def _parse_uevent(self, data: bytes) -> Dict[str, str]:
+        """Decode a udev or kernel uevent datagram into its KEY=VALUE properties."""
+        if data.startswith(b"libudev\0"):
+            # struct udev_monitor_netlink_header: only the magic is in network order
+            (magic,) = struct.unpack_from(">I", data, 8)
+            if magic != self.UDEV_MAGIC:
+                return {}
+            _header_size, properties_off, properties_len = struct.unpack_from("=III", data, 12)
+            payload = data[properties_off:properties_off + properties_len]
+        else:
+            # kernel format: "action@devpath\0KEY=VALUE\0..."
+            payload = data.split(b"\0", 1)[-1]
+
+        props = {}
+        for field in payload.split(b"\0"):
+            key, sep, value = field.partition(b"=")
+            if sep:
+                props[key.decode(errors="replace")] = value.decode(errors="replace")
+        return props
+
+    def _watch_netlink(self) -> None:
+        while not self._closing.is_set():
+            try:
+                data = self._sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError as exc:
+                if not self._closing.is_set():
+                    logger.error("USB netlink monitor failed: %s", exc)
+                    self.mode = None
+                break
+
+            props = self._parse_uevent(data)
+            if props.get("SUBSYSTEM") != "usb" or props.get("DEVTYPE") != "usb_device":
+                continue
+            action = props.get("ACTION")
+            if action not in ("add", "remove"):
+                continue
+
+            # PRODUCT is "vid/pid/bcdDevice" in unpadded hex
+            try:
+                vid, pid = (int(x, 16) for x in props.get("PRODUCT", "").split("/")[:2])
+            except ValueError:
+                continue
+            self._dispatch(action, (vid, pid), props.get("DEVPATH", ""))
+
+    # sysfs fallback
+    def _scan_sysfs(self) -> Dict[str, Tuple[int, int]]:
+        """Return devpath -> (vid, pid) for every USB device in sysfs."""
+        found = {}
+        try:
+            entries = os.listdir(self.sysfs_root)
+        except OSError:
+            return found
+
+        for entry in entries:
+            path = os.path.join(self.sysfs_root, entry)
+            try:
+                found[entry] = (int(_read_sysfs_attr(path, "idVendor"), 16),
+                                int(_read_sysfs_attr(path, "idProduct"), 16))
+            except ValueError:
+                continue  # interfaces have no ids
+        return found
+
+    def _watch_sysfs(self) -> None:
+        known = self._scan_sysfs()
+        while not self._closing.wait(self.POLL_INTERVAL):
+            current = self._scan_sysfs()
+            for devpath in current.keys() - known.keys():
+                self._dispatch("add", current[devpath], devpath)
+            for devpath in known.keys() - current.keys():
+                self._dispatch("remove", known[devpath], devpath)
+            known = current
+
+    def _dispatch(self, action: str, vid_pid: Tuple[int, int], devpath: str) -> None:
+        if vid_pid not in self.sdr_ids:
+            return
+        logger.info("SDR %s: %04x:%04x at %s", action, vid_pid[0], vid_pid[1], devpath)
+        try:
+            self.callback(action, vid_pid, devpath)
+        except Exception:
+            logger.exception("USB hotplug callback failed")